@@ -6,11 +6,13 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 root_dir = os.path.dirname(current_dir)
 sys.path.append(root_dir)
 
-from src.services.mock import MockService
+from src.services.aggregation_service import AggregationService
+from src.data_processing.search_index import SearchIndex
 from app.views.home import view_home
 from app.views.aggregation import view_aggregation
 from app.views.clusters import view_clusters
 from app.views.predict_salary import view_salary_predictor
+from app.views.search import view_search
 
 st.set_page_config(
     page_title="DataTrack",
@@ -46,7 +48,7 @@ def render_top_nav():
             st.markdown("### 🗂️ DataTrack")
 
         with col_nav:
-            nav_home, nav_agg, nav_clus, nav_sal = st.columns(4)
+            nav_home, nav_agg, nav_clus, nav_sal, nav_search = st.columns(5)
 
             current_page = st.session_state.get('page', 'home')
 
@@ -70,27 +72,48 @@ def render_top_nav():
                 st.session_state['page'] = 'salary'
                 st.rerun()
 
+            if nav_search.button("🔎 Поиск", use_container_width=True,
+                                 type="primary" if current_page == 'search' else "secondary"):
+                st.session_state['page'] = 'search'
+                st.rerun()
+
         st.divider()
+@st.cache_resource
+def get_aggregation_service():
+    # агрегаты считаются при очистке данных, здесь они только читаются;
+    # индексы движка запросов строятся один раз на процесс
+    return AggregationService.open(engine=True)
+
+
+@st.cache_resource
+def get_search_index():
+    # индекс обновляется при очистке; здесь он открывается (или строится, если его нет) один раз
+    return SearchIndex.open()
+
+
 def main():
     if 'page' not in st.session_state:
         st.session_state['page'] = 'home'
-    mock_service = MockService()
+    aggregation_service = get_aggregation_service()
 
     render_top_nav()
 
     page = st.session_state['page']
 
     if page == 'home':
-        view_home(mock_service)
+        view_home(aggregation_service)
 
     elif page == 'aggregation':
-        view_aggregation(mock_service)
+        view_aggregation(aggregation_service)
 
     elif page == 'clusters':
         view_clusters()
 
     elif page == 'salary':
-        view_salary_predictor(mock_service)
+        view_salary_predictor()
+
+    elif page == 'search':
+        view_search(get_search_index())
 
 
 if __name__ == "__main__":
@@ -1,25 +1,48 @@
+import pandas as pd
 import streamlit as st
 
+ALL = None
+PERIODS = {"За все время": None, "За год": 365, "За месяц": 30}
+
+
+def _filter_box(column, label, options, all_label, key):
+    # options: id -> название; в состоянии виджета хранится id, None - без фильтра
+    return column.selectbox(label, [ALL] + list(options.index), key=key,
+                            format_func=lambda v: all_label if v is ALL else str(options[v]))
+
 
 def view_aggregation(service):
     st.markdown("<h1 style='text-align: center;'>АГРЕГАЦИЯ ВАКАНСИЙ</h1>", unsafe_allow_html=True)
     st.caption("Обзор рынка труда в реальном времени")
 
+    engine = service.engine
+    filters = {}
     with st.container(border=True):
-        c1, c2, c3 = st.columns(3)
-        c1.selectbox("Регион", ["Worldwide", "USA", "Europe"], key="agg_f1")
-        c2.selectbox("Период", ["За месяц", "За год", "За все время"], key="agg_f2")
-        c3.selectbox("Источник", ["LinkedIn", "Indeed", "Glassdoor"], key="agg_f3")
+        c1, c2, c3, c4 = st.columns(4)
+        if engine is None:
+            c1.selectbox("Регион", ["Все регионы"], disabled=True, key="agg_f1")
+            c2.selectbox("Период", list(PERIODS), disabled=True, key="agg_f2")
+            c3.selectbox("Опыт", ["Любой опыт"], disabled=True, key="agg_f3")
+            c4.selectbox("Работодатель", ["Все работодатели"], disabled=True, key="agg_f4")
+        else:
+            filters['area_id'] = _filter_box(c1, "Регион", engine.options('area_id', top=30), "Все регионы", "agg_f1")
+            period = c2.selectbox("Период", list(PERIODS), key="agg_f2",
+                                  help="Отсчитывается от последней публикации в данных")
+            filters['experience_id'] = _filter_box(c3, "Опыт", engine.options('experience_id'), "Любой опыт", "agg_f3")
+            filters['employer_id'] = _filter_box(c4, "Работодатель", engine.options('employer_id', top=50),
+                                                 "Все работодатели", "agg_f4")
+            if PERIODS[period] and engine.last_published is not None:
+                filters['published_from'] = engine.last_published - pd.Timedelta(days=PERIODS[period])
 
     st.write("")
 
-    stats = service.get_aggregation_stats()
+    stats = service.get_aggregation_stats(filters)
 
     k1, k2, k3 = st.columns(3)
 
     with k1:
         with st.container(border=True):
-            st.metric("Средняя зарплата", stats.avg_salary, delta="+5%")
+            st.metric("Средняя зарплата", stats.avg_salary)
     with k2:
         with st.container(border=True):
             st.metric("Количество вакансий", f"{stats.total_vacancies:,}")
@@ -29,7 +52,7 @@ def view_aggregation(service):
 
     st.write("")
 
-    charts = service.get_aggregation_charts()
+    charts = service.get_aggregation_charts(filters=filters)
 
     g1, g2 = st.columns(2)
     with g1:
@@ -39,4 +62,9 @@ def view_aggregation(service):
     with g2:
         with st.container(border=True):
             st.subheader("Ценные навыки")
-            st.bar_chart(charts.skills_chart, height=300)
\ No newline at end of file
+            st.bar_chart(charts.skills_chart, height=300)
+
+    with st.expander("💰 Зарплаты по ролям"):
+        st.dataframe(service.salary_summary("role").rename(columns={
+            "vacancies": "Вакансий", "with_salary": "С ЗП", "salary_mean": "Средняя", "salary_median": "Медиана"
+        }), use_container_width=True)
\ No newline at end of file
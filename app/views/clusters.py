@@ -1,12 +1,32 @@
+import os
+import time
+import pandas as pd
 import streamlit as st
 from src.utils.data_loader import load_vacancies_data
-from src.services.clustering_service import ClusteringService
+from src.data_processing.store import store_exists
+from src.services.clustering_service import ClusteringService, ResultCache
+from src.services.feature_store import DEFAULT_FEATURE_DIR
+from src.services.jobs import ClusteringJobRunner, DONE, FAILED, CANCELLED
+
+JOB_WORKERS = 2
 
 
 @st.cache_resource
 def get_service():
     df = load_vacancies_data()
-    return ClusteringService(df) if not df.empty else None
+    # значения k перебираются параллельно на всех ядрах, результаты хранятся на диске для всех сессий
+    if df.empty:
+        return None
+    return ClusteringService(df, n_jobs=-1, result_cache=ResultCache(), feature_dir=DEFAULT_FEATURE_DIR)
+
+
+@st.cache_resource
+def get_job_runner(_service):
+    # расчеты идут в отдельных процессах и не занимают поток скрипта Streamlit;
+    # результаты попадают в тот же ResultCache, что читает service.lookup
+    # ядра делятся между исполнителями, чтобы одновременные задачи не запускали по пулу на все ядра
+    return ClusteringJobRunner(_service.df, max_workers=JOB_WORKERS, result_cache_path=_service.result_cache.path,
+                               n_jobs=max(1, (os.cpu_count() or 1) // JOB_WORKERS), feature_dir=DEFAULT_FEATURE_DIR)
 
 
 def view_clusters(mock_service=None):
@@ -28,16 +48,42 @@ def view_clusters(mock_service=None):
             )
         with c2:
             k_range = st.slider("Диапазон кластеров:", 2, 20, (2, 12))
+            streaming = st.toggle("📚 Вся история (mini-batch)", value=False,
+                                  disabled=not store_exists(service.store_dir),
+                                  help="MiniBatch K-Means по всему хранилищу очищенных вакансий, а не только по последней выгрузке")
 
         run_btn = st.button("🚀 Запустить анализ", use_container_width=True, type="primary",
                             disabled=len(selected_features) == 0)
+    runner = get_job_runner(service)
+
     if run_btn:
-        with st.spinner("🧠 Анализируем рынок..."):
-            try:
-                res = service.perform_clustering(selected_features, range(k_range[0], k_range[1] + 1))
-                st.session_state['cluster_result'] = res
-            except Exception as e:
-                st.error(f"Ошибка: {e}")
+        k_values = range(k_range[0], k_range[1] + 1)
+        res = service.lookup(selected_features, k_values, streaming=streaming)
+        if res is not None:
+            st.session_state['cluster_result'] = res
+            st.session_state.pop('cluster_job', None)
+        else:
+            st.session_state['cluster_job'] = runner.submit(selected_features, k_values, streaming=streaming)
+
+    job_id = st.session_state.get('cluster_job')
+    job = runner.get(job_id) if job_id else None
+    if job_id and job is None:
+        st.session_state.pop('cluster_job', None)
+    elif job is not None and not job.finished:
+        st.progress(job.fraction, text=f"🧠 Анализируем рынок... k: {len(job.progress)} из {len(job.k_values)}")
+        if st.button("✖️ Отменить расчет"):
+            runner.cancel(job_id)
+        # опрашиваем задачу, пока она не завершится
+        time.sleep(1)
+        st.rerun()
+    elif job is not None:
+        st.session_state.pop('cluster_job', None)
+        if job.status == DONE:
+            st.session_state['cluster_result'] = job.result
+        elif job.status == FAILED:
+            st.error(f"Ошибка: {job.error}")
+        elif job.status == CANCELLED:
+            st.info("Расчет отменен")
 
     if 'cluster_result' in st.session_state:
         res = st.session_state['cluster_result']
@@ -47,6 +93,12 @@ def view_clusters(mock_service=None):
         m1.metric("Алгоритм", res.method_name)
         m2.metric("Кластеров", res.n_clusters)
         m3.metric("Silhouette Score", f"{res.silhouette_score:.3f}")
+
+        if res.k_timings:
+            with st.expander("⏱️ Время расчета по k"):
+                timings = pd.Series(res.k_timings, name="сек")
+                timings.index.name = "k"
+                st.bar_chart(timings)
         st.divider()
 
         clusters = res.clusters
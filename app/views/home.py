@@ -17,6 +17,7 @@ def view_home(service):
         1. 📊 **Агрегация вакансий** - сбор и визуализация
         2. 🧩 **Кластеризация** - группировка вакансий
         3. 💰 **Прогноз зарплат** - ML-оценка стоимости специалиста
+        4. 🔎 **Поиск** - полнотекстовый поиск по вакансиям
         """)
 
     with col2:
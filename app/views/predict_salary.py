@@ -1,8 +1,22 @@
 import streamlit as st
+from src.services.salary_service import get_salary_service
 
-def view_salary_predictor(service):
+
+@st.cache_resource
+def get_service():
+    # модель обучается при очистке (scripts/clean_data.py), приложение только загружает ее
+    return get_salary_service()
+
+
+def view_salary_predictor(mock_service=None):
     st.markdown("<h1 style='text-align: center;'>ПРЕДСКАЗАТЕЛЬ ЗАРПЛАТ</h1>", unsafe_allow_html=True)
 
+    try:
+        service = get_service()
+    except Exception as e:
+        st.error(f"❌ Не удалось загрузить модель зарплат: {e}")
+        return
+
     col_input, col_result = st.columns([1, 2], gap="large")
 
     with col_input:
@@ -17,9 +31,8 @@ def view_salary_predictor(service):
 
             st.write("Навыки")
 
-            skills = st.multiselect("Выберите стек",
-                                    ["Python", "SQL", "Tableau", "PowerBI", "Spark", "Docker"],
-                                    default=["Python", "SQL"])
+            skills = st.multiselect("Выберите стек", service.skills,
+                                    default=[s for s in ["Python", "SQL"] if s in service.skills])
 
             st.write("")
             calc_btn = st.button("РАССЧИТАТЬ ЗАРПЛАТУ", type="primary", use_container_width=True)
@@ -27,8 +40,7 @@ def view_salary_predictor(service):
     with col_result:
         with st.container(border=True):
             if calc_btn:
-                with st.spinner("Анализируем рынок..."):
-                    result = service.predict_salary(job_title, exp, skills)
+                result = service.predict_salary(job_title, exp, skills, location)
 
                 st.subheader("Результат оценки")
 
@@ -42,7 +54,7 @@ def view_salary_predictor(service):
                 st.write("**Позиция относительно рынка:**")
                 st.bar_chart(result.market_comparison_chart, height=250)
 
-                st.success(f"Вы можете претендовать на зарплату выше средней для {exp} лет опыта!")
+                st.caption(f"Модель обучена на {service.meta['n_train']} вакансиях с указанной зарплатой")
             else:
                 st.info("👈 Заполните параметры слева и нажмите кнопку расчета, чтобы увидеть график.")
                 for _ in range(8): st.write("")
\ No newline at end of file
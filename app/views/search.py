@@ -0,0 +1,36 @@
+import streamlit as st
+
+from src.services.aggregation_service import format_salary
+
+LIMITS = [20, 50, 100]
+
+
+def view_search(index):
+    st.markdown("<h1 style='text-align: center;'>ПОИСК ВАКАНСИЙ</h1>", unsafe_allow_html=True)
+    st.caption("Поиск по названию, требованиям и обязанностям с учетом словоформ")
+
+    with st.container(border=True):
+        c1, c2 = st.columns([4, 1])
+        query = c1.text_input("Запрос", placeholder="например, аналитик данных Power BI", key="search_query")
+        limit = c2.selectbox("Показать", LIMITS, key="search_limit")
+
+    if not query.strip():
+        st.info(f"В индексе {len(index):,} вакансий. Введите слова запроса.")
+        return
+
+    results = index.search(query, limit=limit)
+    if results.empty:
+        st.warning("Ничего не найдено")
+        return
+
+    st.write(f"Найдено: {len(results)}" + (f" (показаны первые {limit})" if len(results) == limit else ""))
+    for _, row in results.iterrows():
+        with st.container(border=True):
+            c1, c2 = st.columns([3, 1])
+            c1.markdown(f"**{row['name']}**")
+            c1.caption(" • ".join(str(v) for v in (row['employer_name'], row['area_name']) if v))
+            c2.metric("Зарплата", format_salary(row['salary_avg']))
+            if row['requirement']:
+                st.markdown(f"**Требования:** {row['requirement']}")
+            if row['responsibility']:
+                st.markdown(f"**Обязанности:** {row['responsibility']}")
@@ -0,0 +1,49 @@
+import sys
+import os
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data_processing.cleaner import DataCleaner
+from src.data_processing.store import DEFAULT_STORE_DIR, store_exists
+from src.services.salary_service import DEFAULT_MODEL_DIR, train_salary_model
+
+
+def clean_and_save(input_file, store_dir=None, full=False, model_dir=DEFAULT_MODEL_DIR):
+    """Последний этап конвейера: очищает выгрузку и сохраняет ее в хранилище Parquet.
+
+    Если хранилище уже есть, очищаются только новые и изменившиеся вакансии;
+    full=True (или пустое хранилище) - полная очистка с перезаписью затронутых месяцев.
+    Затем по обновленному хранилищу переобучается модель зарплат (model_dir=None - пропустить),
+    чтобы приложение только загружало ее.
+    """
+    store_dir = store_dir or DEFAULT_STORE_DIR
+    cleaner = DataCleaner()
+
+    print(f"Читаю данные из: {input_file}")
+    if full or not store_exists(store_dir):
+        print("Полная очистка данных")
+        df = cleaner.run_full_clean(input_file, output_file=store_dir)
+    else:
+        print("Инкрементальная очистка: только новые и измененные вакансии")
+        df = cleaner.run_incremental_clean(input_file, store_dir)
+
+    print(f"\nОбработано: {len(df)} вакансий")
+    print(f"Хранилище: {store_dir}")
+
+    if model_dir is not None:
+        try:
+            service = train_salary_model(model_dir, store_dir)
+            print(f"Модель зарплат: {model_dir} ({service.meta['n_train']} вакансий с зарплатой)")
+        except ValueError as e:
+            print(f"Модель зарплат не обучена: {e}")
+
+    return df, store_dir
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--full"]
+    if not args:
+        print("Использование: python scripts/clean_data.py data/processed/deduped_vacancies_<дата>.jsonl [--full]")
+    else:
+        clean_and_save(args[0], full="--full" in sys.argv[1:])
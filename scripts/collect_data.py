@@ -1,17 +1,24 @@
 import sys
 import os
-import time
-import json
+from concurrent.futures import ThreadPoolExecutor
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 from datetime import datetime
-from src.data_collection.hh_parser import HHParser
+from src.data_collection.hh_parser import HHParser, RateLimiter
+from src.data_collection.http_cache import ResponseCache
+from src.data_collection.sink import JsonlSink
 
-def collect_raw_data(pages_per_role=3, total_pages_limit=200):
+def collect_raw_data(pages_per_role=3, total_pages_limit=200, max_workers=4, requests_per_second=None,
+                     use_cache=True, cache_ttl=3600, offline=False, output_file=None, compression=None,
+                     record_filter=None, resume=True):
 
-    parser = HHParser(delay=0.3)
+    # один лимитер на все роли: страницы разных ролей качаются параллельно, но в пределах лимита API
+    rate_limiter = RateLimiter(rate=requests_per_second) if requests_per_second else None
+    # offline=True воспроизводит ранее собранную сессию только из кэша
+    cache = ResponseCache(ttl=cache_ttl, offline=offline) if use_cache or offline else None
+    parser = HHParser(delay=0.3, max_workers=max_workers, rate_limiter=rate_limiter, cache=cache)
     
     ANALYTIC_ROLES = [
         ("156", "BI-аналитик, аналитик данных", "аналитик данных"),
@@ -23,55 +30,70 @@ def collect_raw_data(pages_per_role=3, total_pages_limit=200):
         ("163", "Маркетолог-аналитик", "маркетинг аналитик"),
         ("157", "Руководитель отдела аналитики", "руководитель аналитики"),
     ]
+
+    # контрольная точка не отличает завершенный сбор от прерванного, поэтому продолжается только
+    # явно переданный output_file (resume=False перезаписывает его); без него - новый файл
+    if output_file is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = {"gzip": ".gz", "zstd": ".zst"}.get(compression, "")
+        output_file = f"data/raw/raw_dataset_{timestamp}.jsonl{extension}"
+        resume = False
+
+    sink = JsonlSink(output_file, compression=compression, resume=resume)
     
-    all_vacancies = []
+    tasks = []
     total_requests = 0
     
     for role_id, role_name, query in ANALYTIC_ROLES:
+        pages_to_fetch = min(pages_per_role, total_pages_limit - total_requests)
+        if pages_to_fetch <= 0:
+            break
+        tasks.append((role_id, role_name, query, pages_to_fetch))
+        total_requests += pages_to_fetch
+
+    def fetch_role(task):
+        role_id, role_name, query, pages_to_fetch = task
         print(f"Роль: {role_name} (ID: {role_id})")
-        pages_to_fetch = min(pages_per_role, total_pages_limit)
-        
-        if total_requests + pages_to_fetch > total_pages_limit:
-            pages_to_fetch = total_pages_limit - total_requests
-        
+        new_count = 0
+
+        def on_page(page, items):
+            nonlocal new_count
+            # record_filter (например, VacancyFilter) отсеивает вакансии прямо при сборе
+            if record_filter is not None:
+                items = list(record_filter(items))
+            new_count += sink.write(items, key=role_id, page=page)
+
         try:
-            role_vacancies = parser.fetch_vacancies(
+            parser.fetch_vacancies(
                 query=query,
                 pages=pages_to_fetch,
                 professional_role=role_id, 
-                only_with_salary=False
+                only_with_salary=False,
+                on_page=on_page,
+                skip_pages=sink.done_pages(role_id)
             )
-            
-            existing_ids = {v['id'] for v in all_vacancies}
-            new_vacancies = [v for v in role_vacancies if v['id'] not in existing_ids]
-            
-            all_vacancies.extend(new_vacancies)
-            total_requests += pages_to_fetch
-            
-            print(f"Собрано {len(new_vacancies)} вакансий")
-
-            if len(ANALYTIC_ROLES) > 1:
-                time.sleep(1)
-            
         except Exception as e:
             print(f"Ошибка для роли {role_id}: {e}")
-            continue
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"data/raw/raw_dataset_{timestamp}.json"
-    
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(all_vacancies, f, ensure_ascii=False, indent=2)
-    
-    print(f"Собрано уникальных вакансий: {len(all_vacancies)}")
-    print(f"Файл c данными {filename}")
+        print(f"{role_name}: собрано {new_count} вакансий")
 
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(len(tasks), max_workers))) as pool:
+            list(pool.map(fetch_role, tasks))
+    finally:
+        sink.close()
+        parser.close()
+        if cache is not None:
+            cache.close()
     
-    return all_vacancies, filename
+    print(f"Собрано уникальных вакансий: {len(sink)}")
+    print(f"Файл c данными {output_file}")
+    print(f"Если сбор прервался, продолжите его: python scripts/collect_data.py {output_file}")
+
+    # sink поддерживает len() и потоковый обход сохраненных вакансий
+    return sink, output_file
 
 
 if __name__ == "__main__":
-    vacancies, filename = collect_raw_data(pages_per_role=5, total_pages_limit=30)
-    
\ No newline at end of file
+    # python scripts/collect_data.py [data/raw/raw_dataset_<дата>.jsonl] - продолжить сбор в указанный файл
+    output_file = sys.argv[1] if len(sys.argv) > 1 else None
+    vacancies, filename = collect_raw_data(pages_per_role=5, total_pages_limit=30, output_file=output_file)
@@ -0,0 +1,75 @@
+import sys
+import os
+from datetime import datetime
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data_collection.near_duplicates import SIGNATURES_FILE, NearDuplicateDetector
+from src.data_collection.sink import JsonlSink
+from src.data_processing.reader import iter_records
+from src.data_processing.store import DEFAULT_STORE_DIR
+
+
+def dedupe_and_save(input_file, output_file=None, keep_duplicates=False, store_dir=None):
+    """Этап между фильтрацией и очисткой: схлопывает перепубликации одной вакансии.
+
+    Первый проход считает подписи MinHash и группы дубликатов, второй переписывает вакансии:
+    каждая получает duplicate_group (id первой вакансии группы) и duplicate_count (размер группы).
+    Без keep_duplicates из группы остается только первая вакансия.
+
+    Сравнение идет и с прошлыми выгрузками: подписи оставленных вакансий хранятся в
+    store_dir/_minhash.npz, поэтому перепубликация в другой день получает duplicate_group
+    уже сохраненной вакансии и отбрасывается.
+    """
+    print("Поиск почти дубликатов")
+    print(f"Читаю данные из: {input_file}")
+
+    signatures_file = os.path.join(store_dir or DEFAULT_STORE_DIR, SIGNATURES_FILE)
+    detector = NearDuplicateDetector()
+    known = detector.load(signatures_file)
+    detector.extend(iter_records(input_file))
+    groups = detector.groups()
+    sizes = np.bincount(groups, minlength=len(groups))
+    # в файл подписей попадают прошлые вакансии (кроме замененных новыми версиями) и оставленные новые
+    keep = ~detector.replaced()
+
+    if output_file is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = f"data/processed/deduped_vacancies_{timestamp}.jsonl"
+
+    with JsonlSink(output_file, resume=False) as deduped:
+        batch = []
+        for pos, vac in enumerate(iter_records(input_file), start=known):
+            canonical = int(groups[pos])
+            if canonical != pos:
+                keep[pos] = False
+                if not keep_duplicates:
+                    continue
+            vac['duplicate_group'] = str(detector.ids[canonical])
+            vac['duplicate_count'] = int(sizes[canonical])
+            batch.append(vac)
+            if len(batch) >= 1000:
+                deduped.write(batch)
+                batch = []
+        deduped.write(batch)
+
+    detector.save(signatures_file, keep)
+
+    print(f"\nРезультаты поиска дубликатов:")
+    print(f"  Было: {len(groups) - known} вакансий")
+    print(f"  Перепубликаций уже сохраненных вакансий: {int((groups[known:] < known).sum())}")
+    print(f"  Групп с перепубликациями: {int((sizes > 1).sum())}")
+    print(f"  Стало: {len(deduped)} вакансий")
+    print(f"\nСохранено в: {output_file}")
+
+    return deduped, output_file
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python scripts/dedupe_data.py data/processed/analyst_vacancies_<дата>.jsonl")
+    else:
+        dedupe_and_save(sys.argv[1])
@@ -1,38 +1,45 @@
 import sys
 import os
-import json
 from datetime import datetime
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-from src.data_collection.filters import filter_data_analyst_vacancies, remove_duplicates
+from src.data_collection.filters import VacancyFilter
+from src.data_collection.sink import JsonlSink
+from src.data_processing.reader import iter_records
 
-def load_vacancies(filename):
-  
-    with open(filename, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def analyst_filter():
+    return VacancyFilter().analyst_names().unique()
 
 def filter_and_save(input_file):
 
     print("Фильтрация данных аналитиков")
-    print(f"Загружаю данные из: {input_file}")
-    vacancies = load_vacancies(input_file)
-    print(f"Загружено вакансий: {len(vacancies)}")
-    
-
-    filtered = filter_data_analyst_vacancies(vacancies)
+    print(f"Читаю данные из: {input_file}")
 
-    filtered = remove_duplicates(filtered)
-    
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f"data/processed/analyst_vacancies_{timestamp}.json"
-    
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(filtered, f, ensure_ascii=False, indent=2)
+    output_file = f"data/processed/analyst_vacancies_{timestamp}.jsonl"
+
+    # вакансии читаются, фильтруются и пишутся потоком, не загружая файл целиком
+    total = 0
+
+    def counted(records):
+        nonlocal total
+        for record in records:
+            total += 1
+            yield record
+
+    with JsonlSink(output_file, resume=False) as filtered:
+        batch = []
+        for vac in analyst_filter()(counted(iter_records(input_file))):
+            batch.append(vac)
+            if len(batch) >= 1000:
+                filtered.write(batch)
+                batch = []
+        filtered.write(batch)
   
     print(f"\nРезультаты фильтрации:")
-    print(f"  Было: {len(vacancies)} вакансий")
+    print(f"  Было: {total} вакансий")
     print(f"  Стало: {len(filtered)} аналитических вакансий")
     print(f"\nСохранено в: {output_file}")
     
@@ -0,0 +1,72 @@
+import sys
+import os
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.services.salary_service import DEFAULT_MODEL_DIR, SalaryPredictionService, train_salary_model
+
+# типы колонок профиля фиксированы: иначе пустая в чанке колонка читается как float64
+PROFILE_DTYPES = {'job_title': str, 'exp': float, 'skills': str, 'location': str}
+
+
+def iter_profiles(input_file, batch_size):
+    if input_file.endswith('.parquet'):
+        for batch in pq.ParquetFile(input_file).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_file, chunksize=batch_size, dtype=PROFILE_DTYPES)
+
+
+def predict_file(input_file, output_file, batch_size=100000, model_dir=DEFAULT_MODEL_DIR):
+    """Оценивает профили из CSV/Parquet пачками и пишет их вместе с прогнозом и интервалом"""
+    if os.path.exists(os.path.join(model_dir, 'meta.json')):
+        service = SalaryPredictionService.load(model_dir)
+    else:
+        service = train_salary_model(model_dir)
+
+    print(f"Читаю профили из: {input_file}")
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+
+    total = 0
+    writer = None
+    try:
+        for profiles in iter_profiles(input_file, batch_size):
+            result = pd.concat([profiles, service.predict_batch(profiles, batch_size)], axis=1)
+            if output_file.endswith('.parquet'):
+                table = pa.Table.from_pandas(result, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, table.schema)
+                else:
+                    # схема файла задается первым чанком, остальные приводятся к ней
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
+            else:
+                result.to_csv(output_file, mode='w' if total == 0 else 'a', header=total == 0, index=False)
+            total += len(result)
+            print(f"  Оценено профилей: {total}")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"\nСохранено в: {output_file}")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пакетный прогноз зарплат по профилям")
+    parser.add_argument("input_file", help="CSV или Parquet с колонками job_title, exp, skills и необязательной location")
+    parser.add_argument("output_file", help="Куда сохранить результат (.csv или .parquet)")
+    parser.add_argument("--batch-size", type=int, default=100000)
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input_file):
+        print(f"Файл не найден: {args.input_file}")
+    else:
+        predict_file(args.input_file, args.output_file, args.batch_size, args.model_dir)
@@ -1,156 +1,179 @@
+import re
+
+INCLUDE_PHRASES = [
+    "аналитик данных",
+    "data analyst",
+    "дата аналитик",
+    "bi аналитик",
+    "bi-аналитик",
+    "bi analyst",
+    "бизнес-аналитик",
+    "системный аналитик",
+    "product analyst",
+    "web analyst",
+    "маркетинг-аналитик",
+    "финансовый аналитик",
+    "продуктовый аналитик"
+]
+
+EXCLUDE_WORDS = [
+    "юрист", "менеджер", "водитель", "оператор",
+    "продавец", "кассир", "бухгалтер", "экономист",
+    "консультант", "администратор", "hr", "рекрутер"
+]
+
+
+def compile_phrases(phrases):
+    """Один регэксп на весь список: поиск подстроки за один проход по строке"""
+    phrases = sorted({p.lower() for p in phrases}, key=len, reverse=True)
+    return re.compile("|".join(re.escape(p) for p in phrases))
+
+
+def _nested_id(vac, field):
+    return (vac.get(field) or {}).get('id')
+
+
+class VacancyFilter:
+    """Ленивый конвейер фильтров: все условия проверяются за один проход по потоку вакансий.
+
+    Условия добавляются цепочкой, списки фраз компилируются один раз при добавлении:
+
+        pipeline = VacancyFilter().analyst_names().experience(["between1And3"]).unique()
+        for vac in pipeline(iter_records(path)):
+            ...
+    """
+
+    def __init__(self):
+        self.predicates = []
+        self.dedupe = False
+
+    def where(self, predicate):
+        """Произвольное условие predicate(vac) -> bool"""
+        self.predicates.append(predicate)
+        return self
+
+    def analyst_names(self, include_phrases=INCLUDE_PHRASES, exclude_words=EXCLUDE_WORDS):
+        include = compile_phrases(include_phrases)
+        exclude = compile_phrases(exclude_words)
+
+        def predicate(vac):
+            name = (vac.get("name") or "").lower()
+            return include.search(name) is not None and exclude.search(name) is None
+
+        return self.where(predicate)
+
+    def salary(self, min_salary=None, max_salary=None, currency="RUR"):
+        if min_salary is None and max_salary is None:
+            return self
+
+        def predicate(vac):
+            salary = vac.get('salary')
+            if not salary or salary.get('currency') != currency:
+                return False
+
+            salary_from = salary.get('from')
+            effective_salary = salary_from if salary_from is not None else salary.get('to')
+            if effective_salary is None:
+                return False
+            if min_salary is not None and effective_salary < min_salary:
+                return False
+            if max_salary is not None and effective_salary > max_salary:
+                return False
+            return True
+
+        return self.where(predicate)
+
+    def _id_in(self, field, values):
+        if not values:
+            return self
+        values = set(values)
+        return self.where(lambda vac: _nested_id(vac, field) in values)
+
+    def experience(self, experience_levels=None):
+        return self._id_in('experience', experience_levels)
+
+    def employment(self, employment_types=None):
+        return self._id_in('employment', employment_types)
+
+    def schedule(self, schedule_types=None):
+        return self._id_in('schedule', schedule_types)
+
+    def skills(self, required_skills=None, excluded_skills=None):
+        if not required_skills and not excluded_skills:
+            return self
+
+        required = tuple({skill.lower() for skill in required_skills or ()})
+        excluded = compile_phrases(excluded_skills) if excluded_skills else None
+
+        def predicate(vac):
+            requirement = ((vac.get('snippet') or {}).get('requirement') or '').lower()
+            if not all(skill in requirement for skill in required):
+                return False
+            return excluded is None or excluded.search(requirement) is None
+
+        return self.where(predicate)
+
+    def unique(self):
+        """Пропускать повторы по id (и вакансии без id)"""
+        self.dedupe = True
+        return self
+
+    def matches(self, vac) -> bool:
+        return all(predicate(vac) for predicate in self.predicates)
+
+    def filter(self, vacancies):
+        predicates = self.predicates
+        seen_ids = set() if self.dedupe else None
+
+        for vac in vacancies:
+            if not all(predicate(vac) for predicate in predicates):
+                continue
+            if seen_ids is not None:
+                vac_id = vac.get('id')
+                if not vac_id or vac_id in seen_ids:
+                    continue
+                seen_ids.add(vac_id)
+            yield vac
+
+    __call__ = filter
+
+
 def filter_data_analyst_vacancies(vacancies):
-    
-    filtered = []
-    
-    for vac in vacancies:
-        name = vac.get("name", "").lower()
-
-        include_phrases = [
-            "аналитик данных",
-            "data analyst", 
-            "дата аналитик",
-            "bi аналитик",
-            "bi-аналитик",
-            "bi analyst",
-            "бизнес-аналитик",
-            "системный аналитик",
-            "product analyst",
-            "web analyst",
-            "маркетинг-аналитик",
-            "финансовый аналитик",
-            "продуктовый аналитик"
-        ]
-        
-        exclude_words = [
-            "юрист", "менеджер", "водитель", "оператор",
-            "продавец", "кассир", "бухгалтер", "экономист",
-            "консультант", "администратор", "hr", "рекрутер"
-        ]
-        
-        has_include_phrase = any(phrase in name for phrase in include_phrases)
-        has_exclude_word = any(word in name for word in exclude_words)
-        
-
-        if has_include_phrase and not has_exclude_word:
-            filtered.append(vac) 
-    
-    return filtered
+    return list(VacancyFilter().analyst_names().filter(vacancies))
 
 
 def filter_by_salary(vacancies, min_salary=None, max_salary=None, currency="RUR"):
 
     if min_salary is None and max_salary is None:
         return vacancies
-    
-    filtered = []
-    
-    for vac in vacancies:
-        salary = vac.get('salary')
-        if not salary:
-            continue
-
-        if salary.get('currency') != currency:
-            continue
-            
-        salary_from = salary.get('from')
-        salary_to = salary.get('to')
-        
-        if salary_from is None and salary_to is None:
-            continue
-            
-        effective_salary = salary_from if salary_from is not None else salary_to
-        
-        if min_salary is not None:
-            if effective_salary is not None and effective_salary < min_salary:
-                continue
-                
-        if max_salary is not None:
-            if effective_salary is not None and effective_salary > max_salary:
-                continue
-                
-        filtered.append(vac)
-    
-    return filtered
+
+    return list(VacancyFilter().salary(min_salary, max_salary, currency).filter(vacancies))
 
 def filter_by_experience(vacancies, experience_levels=None):
     if not experience_levels:
         return vacancies
-    
-    filtered = []
-    
-    for vac in vacancies:
-        exp = vac.get('experience', {}).get('id')
-        if exp in experience_levels:
-            filtered.append(vac)
-    
-    return filtered
+
+    return list(VacancyFilter().experience(experience_levels).filter(vacancies))
 
 def filter_by_employment_type(vacancies, employment_types=None):
 
     if not employment_types:
         return vacancies
-    
-    filtered = []
-    
-    for vac in vacancies:
-        employment = vac.get('employment', {}).get('id')
-        if employment in employment_types:
-            filtered.append(vac)
-    
-    return filtered
+
+    return list(VacancyFilter().employment(employment_types).filter(vacancies))
 
 def filter_by_schedule(vacancies, schedule_types=None):
 
     if not schedule_types:
         return vacancies
-    
-    filtered = []
-    
-    for vac in vacancies:
-        schedule = vac.get('schedule', {}).get('id')
-        if schedule in schedule_types:
-            filtered.append(vac)
-    
-    return filtered
+
+    return list(VacancyFilter().schedule(schedule_types).filter(vacancies))
 
 def remove_duplicates(vacancies):
-    seen_ids = set()
-    unique_vacancies = []
-    
-    for vac in vacancies:
-        vac_id = vac.get('id')
-        if vac_id and vac_id not in seen_ids:
-            seen_ids.add(vac_id)
-            unique_vacancies.append(vac)
-    
-    return unique_vacancies
+    return list(VacancyFilter().unique().filter(vacancies))
 
 def filter_by_skills(vacancies, required_skills=None, excluded_skills=None):
     if not required_skills and not excluded_skills:
         return vacancies
-    
-    filtered = []
-    
-    for vac in vacancies:
-        snippet = vac.get('snippet', {})
-        requirement = snippet.get('requirement', '').lower()
-        
-        if required_skills:
-            has_all_skills = all(
-                skill.lower() in requirement 
-                for skill in required_skills
-            )
-            if not has_all_skills:
-                continue
 
-        if excluded_skills:
-            has_excluded = any(
-                skill.lower() in requirement 
-                for skill in excluded_skills
-            )
-            if has_excluded:
-                continue
-        
-        filtered.append(vac)
-    
-    return filtered
\ No newline at end of file
+    return list(VacancyFilter().skills(required_skills, excluded_skills).filter(vacancies))
@@ -1,68 +1,222 @@
 import requests
 import time
+import threading
 import pandas as pd
 import logging
 import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from src.data_collection.http_cache import CacheMiss, ResponseCache
+from src.data_collection.sink import JsonlSink
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Token bucket: не больше rate запросов в секунду, общий для всех потоков"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
 class HHParser:
     base_url = "https://api.hh.ru/vacancies"
-    
-    def __init__(self, delay: float = 0.5):
+
+    def __init__(self, delay: float = 0.5,
+                 max_workers: int = 1,
+                 rate_limiter: RateLimiter = None,
+                 max_retries: int = 3,
+                 backoff: float = 1.0,
+                 timeout: float = 30,
+                 base_url: str = None,
+                 cache: ResponseCache = None):
         self.delay = delay
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        if base_url:
+            self.base_url = base_url
+
+        # по умолчанию темп запросов тот же, что давала пауза delay между страницами
+        self.rate_limiter = rate_limiter or RateLimiter(rate=1 / delay if delay > 0 else 0)
+
         self.session = requests.Session()
-        
-    def fetch_vacancies(self, 
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max(max_workers, 10))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = None
+        # парсер общий для потоков ролей: пул создается один раз, иначе лимит потоков удвоится
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hh-fetch")
+            return self._executor
+
+    def close(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.session.close()
+
+    def _request_page(self, params: dict) -> dict:
+        cached = self.cache.get(self.base_url, params) if self.cache is not None else None
+        if cached is not None and self.cache.is_fresh(cached):
+            return json.loads(cached.body)
+        if cached is None and self.cache is not None and self.cache.offline:
+            raise CacheMiss(f"Нет ответа в кэше: {self.cache.make_key(self.base_url, params)}")
+
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(self.base_url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = self.backoff * 2 ** attempt
+                logger.warning(f"Ошибка соединения ({e}), повтор через {wait:.1f} сек")
+                time.sleep(wait)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                retry_after = response.headers.get("Retry-After")
+                wait = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2 ** attempt
+                logger.warning(f"Ответ {response.status_code}, повтор через {wait:.1f} сек")
+                time.sleep(wait)
+                continue
+
+            if response.status_code == 304 and cached is not None:
+                self.cache.touch(self.base_url, params)
+                return json.loads(cached.body)
+
+            response.raise_for_status()
+            if self.cache is not None:
+                self.cache.put(self.base_url, params, response.content,
+                               etag=response.headers.get("ETag"),
+                               last_modified=response.headers.get("Last-Modified"))
+            return response.json()
+
+    def _fetch_page(self, params: dict, page: int, on_page=None):
+        params = dict(params, page=page)
+        try:
+            data = self._request_page(params)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Ошибка при запросе страницы {page}: {e}")
+            return None
+
+        if "items" not in data or not data["items"]:
+            logger.info(f"На странице {page} нет вакансий")
+            filtered_items, found = [], 0
+        else:
+            filtered_items = [item for item in data["items"] if self.is_analyst_by_role(item)]
+            found = len(data["items"])
+            logger.info(f"На странице {page} собрано {len(filtered_items)} аналитических вакансий")
+
+        if on_page is not None:
+            on_page(page, filtered_items)
+            filtered_items = []
+        return filtered_items, found, data.get("pages")
+
+    def fetch_vacancies(self,
                        query: str = "аналитик",
                        area: int = 113,
                        experience: str = None,
                        pages: int = 20,
                        only_with_salary: bool = True,
-                       professional_role: str = None) -> list: 
-        
+                       professional_role: str = None,
+                       on_page=None,
+                       skip_pages=None) -> list:
+        """Собирает вакансии по запросу.
+
+        Если передан on_page(page, items), страницы отдаются в него по мере загрузки и не накапливаются
+        в возвращаемом списке. Страницы из skip_pages (кроме нулевой) не запрашиваются.
+        """
+
+        params = {
+            "text": query,
+            "area": area,
+            "per_page": 100,
+            "experience": experience,
+            "only_with_salary": only_with_salary
+        }
+
+        if professional_role:
+            params["professional_role"] = professional_role
+
         vacancies = []
-        
-        for page in range(pages):
-            params = {
-                "text": query,
-                "area": area,
-                "page": page,
-                "per_page": 100,
-                "experience": experience,
-                "only_with_salary": only_with_salary
-            }
-
-            if professional_role:
-                params["professional_role"] = professional_role
+        skip_pages = set(skip_pages or ())
+        if pages <= 0:
+            return vacancies
 
-            try:
-                response = self.session.get(self.base_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                if "items" not in data or not data['items']:
-                    logger.info(f"На странице {page} нет вакансий")
+        # первая страница сообщает, сколько страниц есть в выдаче
+        first = self._fetch_page(params, 0, None if 0 in skip_pages else on_page)
+        if first is None:
+            return vacancies
+
+        items, found, total_pages = first
+        if not found:
+            return vacancies
+        vacancies.extend(items)
+
+        if total_pages is not None:
+            remaining = [page for page in range(1, min(pages, total_pages)) if page not in skip_pages]
+            if self.max_workers > 1:
+                results = self._get_executor().map(lambda page: self._fetch_page(params, page, on_page), remaining)
+            else:
+                results = (self._fetch_page(params, page, on_page) for page in remaining)
+
+            for result in results:
+                if result is not None:
+                    vacancies.extend(result[0])
+        else:
+            for page in range(1, pages):
+                if page in skip_pages:
+                    continue
+                result = self._fetch_page(params, page, on_page)
+                if result is None or not result[1]:
                     break
-                
-                filtered_items = []
-                for item in data["items"]:
-                    if self.is_analyst_by_role(item):
-                        filtered_items.append(item)
-                
-                vacancies.extend(filtered_items)
-                logger.info(f"На странице {page} собрано {len(filtered_items)} аналитических вакансий")
-                
-                time.sleep(self.delay)
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Ошибка при запросе страницы {page}: {e}")
-                break
-        
-        logger.info(f"Всего собрано {len(vacancies)} аналитических вакансий")
+                vacancies.extend(result[0])
+
+        if on_page is None:
+            logger.info(f"Всего собрано {len(vacancies)} аналитических вакансий")
         return vacancies
-    
+
     def is_analyst_by_role(self, vacancy: dict) -> bool:
         if "professional_roles" not in vacancy:
             return False
@@ -78,7 +232,7 @@ class HHParser:
         
         return has_analyst_role
     
-    def save_raw_data(self, vacancies: list, filename: str = "data/raw/vacancies.json"):
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(vacancies, f, ensure_ascii=False, indent=2)
-        logger.info(f"Сырые данные сохранены в {filename}")
\ No newline at end of file
+    def save_raw_data(self, vacancies, filename: str = "data/raw/vacancies.jsonl"):
+        with JsonlSink(filename, resume=False) as sink:
+            sink.write(vacancies)
+        logger.info(f"Сырые данные сохранены в {filename}")
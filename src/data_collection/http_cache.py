@@ -0,0 +1,132 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlencode
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join('data', 'cache', 'hh_responses.sqlite')
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    pass
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+class ResponseCache:
+    """Кэш ответов API в SQLite: ключ - URL с параметрами, TTL, ревалидация по ETag и вытеснение по размеру.
+
+    HHParser работает с любым объектом с методами get/is_fresh/put/touch, так что кэш можно заменить.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: Optional[float] = 3600,
+                 max_size_mb: float = 500, offline: bool = False):
+        self.path = path
+        # ttl=None - записи не устаревают (воспроизведение собранной сессии)
+        self.ttl = ttl
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.offline = offline
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(url: str, params: dict = None) -> str:
+        # None-параметры requests не отправляет, поэтому и в ключ их не включаем
+        items = sorted((k, str(v)) for k, v in (params or {}).items() if v is not None)
+        return f"{url}?{urlencode(items)}"
+
+    def get(self, url: str, params: dict = None) -> Optional[CachedResponse]:
+        key = self.make_key(url, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return CachedResponse(*row)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        if self.offline or self.ttl is None:
+            return True
+        return time.time() - entry.fetched_at < self.ttl
+
+    def put(self, url: str, params: dict, body: bytes, etag: str = None, last_modified: str = None):
+        key = self.make_key(url, params)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, now, now, len(body))
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url: str, params: dict = None):
+        """Продлевает запись после ответа 304 Not Modified"""
+        key = self.make_key(url, params)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key)
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        # удаляем давно не использованные записи, пока кэш не станет меньше 90% лимита
+        target = total - int(self.max_size * 0.9)
+        freed = 0
+        keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            keys.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+        logger.info(f"Кэш: вытеснено {len(keys)} ответов")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
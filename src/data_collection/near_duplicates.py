@@ -0,0 +1,241 @@
+import os
+import re
+import zlib
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+logger = logging.getLogger(__name__)
+
+_TAG = re.compile(r'<[^>]+>')
+_PUNCTUATION = re.compile(r'[^\w\s]+')
+_MASK32 = np.uint64(0xFFFFFFFF)
+# сколько шинглов хэшируется за раз: матрица шинглы x перестановки держится в пределах ~25 МБ
+_CHUNK_SHINGLES = 50000
+# подписи уже сохраненных вакансий лежат рядом с хранилищем; файл с '_' не входит в store_fingerprint
+SIGNATURES_FILE = '_minhash.npz'
+
+
+def document_text(vac) -> str:
+    """Текст вакансии для сравнения: название и сниппет без разметки hh.ru"""
+    snippet = vac.get('snippet') or {}
+    parts = [vac.get('name'), snippet.get('requirement'), snippet.get('responsibility')]
+    text = _TAG.sub(' ', ' '.join(part for part in parts if isinstance(part, str)))
+    return _PUNCTUATION.sub(' ', text.lower().replace('ё', 'е'))
+
+
+class _TokenHashes(dict):
+    # словарь слово -> crc32, хэш считается при первом обращении
+    def __missing__(self, token):
+        value = self[token] = zlib.crc32(token.encode('utf-8'))
+        return value
+
+
+def _employer_key(vac) -> int:
+    employer_id = (vac.get('employer') or {}).get('id')
+    return zlib.crc32(str(employer_id or '').encode('utf-8'))
+
+
+class NearDuplicateDetector:
+    """Поиск почти одинаковых вакансий: MinHash по шинглам текста и LSH с разбиением на полосы.
+
+    Работодатели перепубликуют вакансию под новым id в других городах и в другие дни. Такие
+    вакансии совпадают по работодателю, названию и сниппету почти дословно. Для каждой вакансии
+    считается подпись MinHash по словесным шинглам. Кандидатами считаются вакансии одного
+    работодателя, у которых совпала хотя бы одна полоса подписи. Кандидат проверяется
+    по доле совпавших значений подписи (оценка меры Жаккара). Группы дубликатов - компоненты
+    связности графа подтвержденных пар, поэтому время работы растет почти линейно.
+
+    add можно вызывать порциями, в памяти остаются только подписи (num_perm x 4 байта на вакансию).
+    Подписи прошлых выгрузок загружаются load до add: они идут первыми, поэтому перепубликация
+    уже сохраненной вакансии под новым id попадает в ее группу, а не становится первой в своей.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.7, shingle_size: int = 3,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # перестановки - хэши multiply-shift: старшие 32 бита (a * h + b) mod 2^64, a нечетное
+        self._a = rng.integers(0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self._b = rng.integers(0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True)
+        self._tokens = _TokenHashes()
+        self._signatures = []
+        self._employers = []
+        self._empty = []
+        self.ids = []
+        self.known = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _params(self) -> np.ndarray:
+        return np.array([self.num_perm, self.bands, self.shingle_size, self.seed], dtype=np.int64)
+
+    def load(self, path: str) -> int:
+        """Добавляет подписи, сохраненные save; возвращает их число (0, если файла нет или параметры другие)"""
+        if self.ids:
+            raise ValueError("Сохраненные подписи загружаются до add")
+        if not os.path.exists(path):
+            return 0
+        with np.load(path, allow_pickle=False) as data:
+            if not np.array_equal(data['params'], self._params()):
+                logger.warning(f"Подписи {path} посчитаны с другими параметрами MinHash и не используются")
+                return 0
+            self._signatures.append(data['signatures'])
+            self._employers.append(data['employers'])
+            self._empty.append(data['empty'])
+            self.ids.extend(data['ids'].tolist())
+        self.known = len(self.ids)
+        return self.known
+
+    def save(self, path: str, keep: np.ndarray = None):
+        """Сохраняет подписи вакансий (только позиций keep, если маска задана)"""
+        if self.ids:
+            signatures = np.concatenate(self._signatures)
+            employers = np.concatenate(self._employers)
+            empty = np.concatenate(self._empty)
+        else:
+            signatures = np.empty((0, self.num_perm), dtype=np.uint32)
+            employers = np.empty(0, dtype=np.uint64)
+            empty = np.empty(0, dtype=bool)
+        keep = np.ones(len(self.ids), dtype=bool) if keep is None else np.asarray(keep, dtype=bool)
+        ids = np.array([str(vac_id) for vac_id in self.ids], dtype=str)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, params=self._params(), ids=ids[keep], signatures=signatures[keep],
+                     employers=employers[keep], empty=empty[keep])
+        os.replace(tmp_path, path)
+
+    def replaced(self) -> np.ndarray:
+        """Маска загруженных вакансий, которые снова пришли в новых данных под тем же id"""
+        mask = np.zeros(len(self.ids), dtype=bool)
+        if self.known:
+            new_ids = {str(vac_id) for vac_id in self.ids[self.known:]}
+            mask[:self.known] = [str(vac_id) in new_ids for vac_id in self.ids[:self.known]]
+        return mask
+
+    def _shingles(self, texts):
+        """Хэши шинглов всех текстов подряд и номер текста для каждого хэша"""
+        token_lists = [list(map(self._tokens.__getitem__, text.split())) for text in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        tokens = np.fromiter((h for hashes in token_lists for h in hashes), dtype=np.uint64, count=int(lengths.sum()))
+        doc_of = np.repeat(np.arange(len(texts)), lengths)
+
+        k = self.shingle_size
+        if len(tokens) >= k:
+            # шингл - k слов подряд внутри одного текста; хэш - полином от хэшей слов
+            starts = np.arange(len(tokens) - k + 1)
+            inside = doc_of[starts] == doc_of[starts + k - 1]
+            hashes = np.zeros(len(starts), dtype=np.uint64)
+            for offset in range(k):
+                hashes = (hashes * np.uint64(1000003) + tokens[starts + offset]) & _MASK32
+            hashes, shingle_doc = hashes[inside], doc_of[starts][inside]
+        else:
+            hashes, shingle_doc = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+
+        # короткие тексты (меньше k слов) сравниваются по отдельным словам
+        short = (lengths > 0) & (lengths < k)
+        if short.any():
+            words = short[doc_of]
+            hashes = np.concatenate([hashes, tokens[words]])
+            shingle_doc = np.concatenate([shingle_doc, doc_of[words]])
+            order = np.argsort(shingle_doc, kind='stable')
+            hashes, shingle_doc = hashes[order], shingle_doc[order]
+        return hashes, shingle_doc
+
+    def _minhash(self, hashes, shingle_doc, n_docs) -> np.ndarray:
+        signatures = np.full((n_docs, self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        for start in range(0, len(hashes), _CHUNK_SHINGLES):
+            chunk = hashes[start:start + _CHUNK_SHINGLES]
+            docs = shingle_doc[start:start + _CHUNK_SHINGLES]
+            values = np.multiply.outer(self._a, chunk)
+            values += self._b[:, None]
+            values >>= np.uint64(32)
+            # шинглы отсортированы по тексту: минимум по каждому тексту - reduceat по границам
+            bounds = np.flatnonzero(np.r_[True, docs[1:] != docs[:-1]])
+            minima = np.minimum.reduceat(values.astype(np.uint32), bounds, axis=1)
+            np.minimum.at(signatures, docs[bounds], minima.T)
+        return signatures
+
+    def add(self, vacancies):
+        """Добавляет порцию сырых вакансий"""
+        vacancies = list(vacancies)
+        texts = [document_text(vac) for vac in vacancies]
+        hashes, shingle_doc = self._shingles(texts)
+        signatures = self._minhash(hashes, shingle_doc, len(vacancies))
+
+        has_text = np.zeros(len(vacancies), dtype=bool)
+        has_text[shingle_doc] = True
+        self._signatures.append(signatures)
+        self._employers.append(np.array([_employer_key(vac) for vac in vacancies], dtype=np.uint64))
+        self._empty.append(~has_text)
+        self.ids.extend(vac.get('id') for vac in vacancies)
+
+    def extend(self, vacancies, batch_size: int = 5000):
+        """Добавляет вакансии из итератора порциями по batch_size"""
+        batch = []
+        for vac in vacancies:
+            batch.append(vac)
+            if len(batch) >= batch_size:
+                self.add(batch)
+                batch = []
+        if batch:
+            self.add(batch)
+
+    def groups(self) -> np.ndarray:
+        """Для каждой добавленной вакансии - позиция первой вакансии ее группы дубликатов"""
+        n = len(self.ids)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        signatures = np.concatenate(self._signatures)
+        employers = np.concatenate(self._employers)
+        # сохраненная вакансия с тем же id - прежняя версия новой записи, а не ее дубликат
+        candidates = np.flatnonzero(~(np.concatenate(self._empty) | self.replaced()))
+
+        rows = self.num_perm // self.bands
+        pairs = []
+        for band in range(self.bands):
+            # ключ корзины - работодатель и значения подписи в полосе
+            keys = employers[candidates].copy()
+            for col in range(band * rows, (band + 1) * rows):
+                keys = keys * np.uint64(0x100000001B3) + signatures[candidates, col]
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            run_start = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+            # каждая вакансия корзины сравнивается с первой вакансией корзины
+            first = candidates[order[np.flatnonzero(run_start)[np.cumsum(run_start) - 1]]]
+            members = candidates[order]
+            same = ~run_start
+            pairs.append(np.stack([first[same], members[same]]))
+
+        pairs = np.unique(np.concatenate(pairs, axis=1), axis=1)
+        if pairs.shape[1]:
+            similarity = (signatures[pairs[0]] == signatures[pairs[1]]).mean(axis=1)
+            pairs = pairs[:, similarity >= self.threshold]
+
+        graph = sp.coo_matrix((np.ones(pairs.shape[1], dtype=np.int8), (pairs[0], pairs[1])), shape=(n, n))
+        _, labels = connected_components(graph, directed=False)
+        canonical = np.full(labels.max() + 1, n, dtype=np.int64)
+        np.minimum.at(canonical, labels, np.arange(n))
+        groups = canonical[labels]
+        logger.info(f"Почти дубликатов: {int((groups != np.arange(n)).sum())} из {n} вакансий")
+        return groups
+
+
+def find_near_duplicates(vacancies, batch_size: int = 5000, **kwargs) -> np.ndarray:
+    """Позиция первой вакансии группы дубликатов для каждой вакансии (своя позиция - если дубликатов нет)"""
+    detector = NearDuplicateDetector(**kwargs)
+    detector.extend(vacancies, batch_size)
+    return detector.groups()
@@ -0,0 +1,125 @@
+import os
+import gzip
+import json
+import logging
+import threading
+
+from src.data_processing.reader import compression_of, iter_records, zstandard
+
+logger = logging.getLogger(__name__)
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == 'gzip':
+        return gzip.compress(data)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("Для сжатия zstd нужен пакет zstandard")
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+class JsonlSink:
+    """Потоковая запись сырых вакансий в JSON Lines с дедупликацией по id и возобновлением после сбоя.
+
+    Каждая страница дописывается отдельным блоком (для gzip/zstd - отдельным сжатым кадром),
+    после чего в файл <path>.progress.json сохраняются смещение и список готовых страниц.
+    При возобновлении файл обрезается до последнего сохраненного смещения.
+    """
+
+    def __init__(self, path: str, compression: str = None, resume: bool = True):
+        self.path = path
+        self.compression = compression or compression_of(path)
+        self.checkpoint_path = f"{path}.progress.json"
+        self._lock = threading.Lock()
+        self._ids = set()
+        self._done = {}
+        self._offset = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(path):
+            self._restore()
+        else:
+            open(path, 'wb').close()
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+
+        self._file = open(path, 'ab')
+
+    def _restore(self):
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            self._offset = checkpoint['offset']
+            self._done = {key: set(pages) for key, pages in checkpoint['done'].items()}
+        elif self.compression is None:
+            # без контрольной точки отбрасываем недописанную последнюю строку
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            self._offset = data.rfind(b'\n') + 1
+        else:
+            self._offset = os.path.getsize(self.path)
+
+        with open(self.path, 'r+b') as f:
+            f.truncate(self._offset)
+
+        for record in iter_records(self.path):
+            self._ids.add(record.get('id'))
+
+        logger.info(f"Возобновление записи {self.path}: уже сохранено {len(self._ids)} вакансий")
+
+    def _save_checkpoint(self):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'offset': self._offset,
+                'done': {key: sorted(pages) for key, pages in self._done.items()}
+            }, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def done_pages(self, key: str) -> set:
+        with self._lock:
+            return set(self._done.get(key, ()))
+
+    def write(self, records, key: str = None, page: int = None) -> int:
+        """Дописывает новые вакансии и отмечает страницу key/page готовой"""
+        with self._lock:
+            lines = []
+            for record in records:
+                vac_id = record.get('id')
+                if vac_id in self._ids:
+                    continue
+                self._ids.add(vac_id)
+                lines.append(json.dumps(record, ensure_ascii=False))
+
+            if lines:
+                data = ('\n'.join(lines) + '\n').encode('utf-8')
+                self._file.write(_compress(data, self.compression))
+                self._file.flush()
+                self._offset = self._file.tell()
+
+            if key is not None:
+                self._done.setdefault(key, set()).add(page)
+                self._save_checkpoint()
+
+            return len(lines)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter_records(self.path)
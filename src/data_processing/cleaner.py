@@ -2,23 +2,72 @@ import pandas as pd
 import os
 import numpy as np
 import logging
-import json
 from datetime import datetime
-import ast
+
+from src.data_processing.flattener import FIELD_SPEC, extract_field, flatten_records, parse_serialized
+from src.data_processing.reader import iter_records, iter_record_batches
+from src.data_processing.rollups import refresh_rollups
+from src.data_processing.search_index import SEARCH_FILE, SOURCE_COLUMNS as SEARCH_COLUMNS, SearchIndex
+from src.data_processing.skill_index import SkillIndex, refresh_skill_index
+from src.data_processing.skill_matcher import get_skill_matcher
+from src.data_processing.store import (
+    DEFAULT_STORE_DIR,
+    PARTITION_COLUMN,
+    content_hash,
+    drop_partition,
+    load_cleaned_dataset,
+    load_index,
+    load_partitions,
+    save_cleaned_dataset,
+    save_index,
+    store_exists
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# корзины опыта hh.ru: минимальный стаж и середина диапазона в годах
+EXPERIENCE_MIN_YEARS = {
+    'noExperience': 0,
+    'between1And3': 1,
+    'between3And6': 3,
+    'moreThan6': 6
+}
+EXPERIENCE_AVG_YEARS = {
+    'noExperience': 0,
+    'between1And3': 2,
+    'between3And6': 4,
+    'moreThan6': 8
+}
+
 class DataCleaner:
     def __init__(self):
         pass
     
+    def load_records(self, filepath: str) -> list:
+        return list(iter_records(filepath))
+
+    def load_flat_data(self, filepath: str, batch_size: int = 5000, keep_nested: bool = False,
+                       record_filter=None) -> pd.DataFrame:
+        """Потоковая загрузка: вакансии читаются пачками и сразу разворачиваются"""
+        frames = []
+        for batch in iter_record_batches(filepath, batch_size=batch_size):
+            if record_filter is not None:
+                batch = [record for record in batch if record_filter(record)]
+                if not batch:
+                    continue
+            frames.append(flatten_records(batch, keep_nested=keep_nested))
+
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat(frames, ignore_index=True)
+        logger.info(f"Загружено {len(df)} вакансий аналитиков")
+        return df
+
     def load_data(self, filepath: str) -> pd.DataFrame:
         """Загрузка JSON данных в DataFrame"""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(self.load_records(filepath))
         logger.info(f"Загружено {len(df)} вакансий аналитиков")
         df = self._convert_string_dicts(df)
 
@@ -26,71 +75,41 @@ class DataCleaner:
     
     def _convert_string_dicts(self, df: pd.DataFrame) -> pd.DataFrame:
         df = df.copy()
-        
-        def safe_convert(value):
-            if value is None:
-                return value
 
-            if isinstance(value, (list, dict)) and len(value) == 0:
-                return value
-            
-            try:
-                if isinstance(value, float) and np.isnan(value):
-                    return value
-            except:
-                pass
-            
-            try:
-                if pd.isna(value):
-                    return value
-            except (ValueError, TypeError):
-                pass
-            
-            if isinstance(value, (dict, list)):
-                return value
-            
-            if isinstance(value, str):
-                value = value.strip()
-                
-                if (value.startswith('{') and value.endswith('}')) or \
-                (value.startswith('[') and value.endswith(']')):
-                    try:
-                        return ast.literal_eval(value)
-                    except:
-                        try:
-                            value = value.replace("'", '"')
-                            value = value.replace('None', 'null')
-                            value = value.replace('True', 'true').replace('False', 'false')
-                            return json.loads(value)
-                        except:
-                            return value
-            return value
-        
         for column in df.columns:
+            if df[column].dtype != object:
+                continue
+            if pd.api.types.infer_dtype(df[column], skipna=True) not in ('string', 'mixed'):
+                continue
             try:
-                df[column] = df[column].apply(safe_convert)
+                # разбираем только ячейки, похожие на сериализованный dict/list
+                mask = df[column].map(lambda x: isinstance(x, str) and x.lstrip()[:1] in ('{', '['))
+                if mask.any():
+                    df.loc[mask, column] = df.loc[mask, column].apply(parse_serialized)
             except Exception as e:
                 logger.warning(f"Ошибка при обработке колонки {column}: {e}")
         
         return df
     
+    def _extract_fields(self, df: pd.DataFrame, sources: list) -> pd.DataFrame:
+        df = df.copy()
+
+        for source in sources:
+            if source in df.columns:
+                for column, values in extract_field(df[source].tolist(), source).items():
+                    df[column] = values
+
+        return df
 
-    
     def clean_salary(self, df: pd.DataFrame) -> pd.DataFrame:
         
-        df = df.copy()
-        
-        if 'salary' in df.columns:
-            df['salary_from'] = df['salary'].apply(
-                lambda x: x.get('from') if isinstance(x, dict) else None
-            )
-            df['salary_to'] = df['salary'].apply(
-                lambda x: x.get('to') if isinstance(x, dict) else None
-            )
-            df['salary_currency'] = df['salary'].apply(
-                lambda x: x.get('currency') if isinstance(x, dict) else None
-            )
-        
+        df = self._extract_fields(df, ['salary'])
+        return self._add_salary_features(df)
+    
+    def _add_salary_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        if 'salary_from' not in df.columns:
+            return df
+
         # df = df[df['salary_currency'] == 'RUR'] 
         
         df['salary_from'] = pd.to_numeric(df['salary_from'], errors='coerce')
@@ -99,14 +118,13 @@ class DataCleaner:
         
         df['has_salary'] = (~df['salary_from'].isna()) | (~df['salary_to'].isna())
         
-        df['salary_avg'] = df.apply(
-            lambda row: self._calculate_avg_salary(row['salary_from'], row['salary_to']),
-            axis=1
-        )
+        # среднее по непустым границам, совпадает с _calculate_avg_salary
+        df['salary_avg'] = df[['salary_from', 'salary_to']].mean(axis=1)
        
         total = len(df)
         with_salary = df['has_salary'].sum()
-        logger.info(f"Зарплата: {with_salary} вакансий с ЗП из {total} ({with_salary/total*100:.1f}%)")
+        if total:
+            logger.info(f"Зарплата: {with_salary} вакансий с ЗП из {total} ({with_salary/total*100:.1f}%)")
         
         return df
     
@@ -122,44 +140,13 @@ class DataCleaner:
             return (salary_from + salary_to) / 2
     
     def clean_experience(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'experience' in df.columns:
-            df['experience_id'] = df['experience'].apply(
-                lambda x: x.get('id') if isinstance(x, dict) else None
-            )
-            df['experience_name'] = df['experience'].apply(
-                lambda x: x.get('name') if isinstance(x, dict) else None
-            )
-
-            def extract_min_experience(exp_dict):
-                if not isinstance(exp_dict, dict):
-                    return None
-
-                exp_id = exp_dict.get('id')
-                min_mapping = {
-                    'noExperience': 0,
-                    'between1And3': 1,
-                    'between3And6': 3,
-                    'moreThan6': 6
-                }
-                return min_mapping.get(exp_id, None)
-
-            df['min_experience_years'] = df['experience'].apply(extract_min_experience)
-
-            def extract_avg_experience(exp_dict):
-                if not isinstance(exp_dict, dict):
-                    return None
-                exp_id = exp_dict.get('id')
-                avg_mapping = {
-                    'noExperience': 0,
-                    'between1And3': 2,
-                    'between3And6': 4,
-                    'moreThan6': 8
-                }
-                return avg_mapping.get(exp_id, None)
-
-            df['avg_experience_years'] = df['experience'].apply(extract_avg_experience)
+        df = self._extract_fields(df, ['experience'])
+        return self._add_experience_features(df)
+
+    def _add_experience_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        if 'experience_id' in df.columns:
+            df['min_experience_years'] = df['experience_id'].map(EXPERIENCE_MIN_YEARS)
+            df['avg_experience_years'] = df['experience_id'].map(EXPERIENCE_AVG_YEARS)
 
         if 'experience_name' in df.columns:
             exp_counts = df['experience_name'].value_counts()
@@ -175,154 +162,40 @@ class DataCleaner:
     def extract_skills_from_text(self, df: pd.DataFrame) -> pd.DataFrame:
         df = df.copy()
 
-        skill_keywords = {
-            'SQL': ['sql', 'SQL', 'баз данных', 'запросы', 'postgresql', 'mysql', 'microsoft sql', 'ms sql', ' tsql ',
-                    'pl/sql', 'no sql'],
-            'Python': ['python', 'питон', 'pandas', 'numpy', 'scikit-learn', 'scikit', 'sklearn', 'matplotlib',
-                       'seaborn', 'jupyter'],
-            'R': [' r ', 'r язык', 'r,', 'r.', 'rstudio', 'shiny', 'tidyverse'],
-
-            'PostgreSQL': ['postgresql', 'postgres'],
-            'MySQL': ['mysql'],
-            'MongoDB': ['mongodb', 'mongo'],
-            'ClickHouse': ['clickhouse'],
-            'Greenplum': ['greenplum'],
-            'Oracle': ['oracle database', 'oracle db'],
-            'MS SQL Server': ['microsoft sql server', 'mssql', 'sql server'],
-            'SQLite': ['sqlite'],
-            'Redis': ['redis'],
-            'Cassandra': ['cassandra'],
-
-            'Power BI': ['power bi', 'powerbi', 'power bi,', 'power bi.', 'microsoft power bi'],
-            'Tableau': ['tableau'],
-            'DataLens': ['datalens', 'yandex datalens'],
-            'Qlik': ['qlik', 'qlikview', 'qliksense'],
-            'Looker': ['looker'],
-            'Metabase': ['metabase'],
-            'Superset': ['superset', 'apache superset'],
-            'Redash': ['redash'],
-
-            'Apache Airflow': ['airflow', 'apache airflow'],
-            'dbt': ['dbt', 'data build tool'],
-            'Apache Spark': ['spark', 'apache spark', 'pyspark', 'spark sql'],
-            'Hadoop': ['hadoop', 'hdfs', 'mapreduce'],
-            'Kafka': ['kafka', 'apache kafka'],
-            'Apache NiFi': ['nifi', 'apache nifi'],
-
-            'AWS': ['aws', 'amazon web services', ' s3 ', 'redshift', 'athena', 'glue', 'quicksight'],
-            'Google Cloud': ['gcp', 'google cloud', 'bigquery', 'looker studio', 'data studio'],
-            'Azure': ['azure', 'microsoft azure', 'synapse', 'azure data factory'],
-            'Yandex Cloud': ['yandex cloud', 'yandex.cloud'],
-
-            'Excel': ['excel', 'ms excel', 'microsoft excel', 'таблиц', 'формул', 'vlookup', 'сводные таблицы',
-                      'макросы'],
-            'Google Sheets': ['google sheets', 'google таблиц'],
-            'PowerPoint': ['powerpoint', 'презентац', 'слайд'],
-            'Google Slides': ['google slides'],
-
-            'Статистика': ['статистик', 'a/b тест', 'математик', 'вероятност', 'дисперсия', 'регрессия', 'корреляция'],
-            'Машинное обучение': ['машинн', 'ml', 'machine learning', 'нейронные сети', 'классификация',
-                                  'кластеризация'],
-            'Прогнозное моделирование': ['прогноз', 'forecast', 'временные ряды', 'time series'],
-            'A/B тестирование': ['a/b тест', 'ab тест', 'сплит тест'],
-            'Построение дашбордов': ['дашборд', 'dashboard', 'панель', 'мониторинг'],
-
-            'Git': ['git', 'github', 'gitlab', 'bitbucket'],
-            'Docker': ['docker', 'контейнер'],
-            'Linux': ['linux', 'unix', 'bash', 'shell'],
-            'Jira': ['jira', 'confluence'],
-
-            'Java': ['java'],
-            'Scala': ['scala'],
-            'JavaScript': ['javascript', ' js ', 'node.js', 'nodejs'],
-            'TypeScript': ['typescript', ' ts '],
-            'C++': ['c++', 'с++'],
-            'C#': ['c#', 'c sharp'],
-
-            'SAS': ['sas'],
-            'SPSS': ['spss'],
-            'MATLAB': ['matlab'],
-            'KNIME': ['knime'],
-            'Alteryx': ['alteryx'],
-
-            'Аналитическое мышление': ['аналитическ', 'логическ', 'критическ мышлен'],
-            'Коммуникация': ['коммуникац', 'общен', 'презентац', 'переговоры'],
-            'Управление проектами': ['управлен проект', 'project management', 'agile', 'scrum', 'kanban'],
-            'Работа в команде': ['команд', 'teamwork', 'коллектив'],
-            'Решение проблем': ['решен проблем', 'problem solving'],
-
-            'Финансовая аналитика': ['финанс', 'бухгалтер', 'экономическ', 'kpi', 'roi', 'cac', 'ltv'],
-            'Маркетинговая аналитика': ['маркетинг', 'конверсия', 'трафик', 'cpc', 'cpm', 'ctr'],
-            'Продуктовая аналитика': ['продукт', 'юнит-экономика', 'retention', 'churn'],
-            'Веб-аналитика': ['веб-аналитик', 'google analytics', ' ga ', 'yandex metrika', 'метрика'],
-            'Мобильная аналитика': ['mobile analytics', 'appsflyer', 'adjust', 'firebase'],
-
-            'API': ['api', 'rest api', 'graphql'],
-            'JSON': ['json'],
-            'XML': ['xml'],
-            'CSV': ['csv'],
-            'Excel VBA': ['vba', 'excel vba', 'макросы'],
-            'Power Query': ['power query', 'powerquery'],
-            'DAX': ['dax'],
-            'MDX': ['mdx'],
-        }
-
-        def find_skills(text):
-            if pd.isna(text):
-                return []
-            text_lower = str(text).lower()
-            found = []
-            for skill, keywords in skill_keywords.items():
-                if any(keyword in text_lower for keyword in keywords):
-                    found.append(skill)
-            return found
-
-        if 'requirement' in df.columns:
-            for idx, row in df.iterrows():
-                current_skills = row['skills_list'] if 'skills_list' in df.columns else []
-                new_skills = find_skills(row.get('requirement'))
-                all_skills = list(set(current_skills + new_skills))
-                df.at[idx, 'skills_list'] = all_skills
-
-        if 'responsibility' in df.columns:
-            for idx, row in df.iterrows():
-                current_skills = row.get('skills_list', [])
-                new_skills = find_skills(row.get('responsibility'))
-                all_skills = list(set(current_skills + new_skills))
-                df.at[idx, 'skills_list'] = all_skills
+        text_columns = [c for c in ['requirement', 'responsibility'] if c in df.columns]
+        if not text_columns:
+            return df
+
+        # оба сниппета склеиваются и сканируются автоматом один раз
+        texts = [
+            "\n".join(part for part in parts if isinstance(part, str))
+            for parts in zip(*(df[c].tolist() for c in text_columns))
+        ]
+        found = get_skill_matcher().find_many(texts)
+
+        if 'skills_list' in df.columns:
+            current = df['skills_list'].tolist()
+        else:
+            current = [[] for _ in range(len(df))]
+
+        df['skills_list'] = [
+            list(dict.fromkeys((skills if isinstance(skills, list) else []) + new_skills))
+            for skills, new_skills in zip(current, found)
+        ]
 
         return df
     
     def extract_skills(self, df: pd.DataFrame) -> pd.DataFrame:
         
-        df = df.copy()
-        
-        if 'key_skills' in df.columns:
-            df['skills_list'] = df['key_skills'].apply(
-                lambda x: [skill.get('name') for skill in x] 
-                if isinstance(x, list) 
-                else []
-            )
-            
-            df['skills_count'] = df['skills_list'].apply(len)
-           
-            if df['skills_list'].notna().sum() > 10:
-                top_skills = self._get_top_skills(df, top_n=15)
-                for skill in top_skills:
-                    col_name = f'skill_{skill.replace(" ", "_").replace("/", "_").lower()}'
-                    df[col_name] = df['skills_list'].apply(
-                        lambda x: 1 if skill in x else 0
-                    )
+        df = self._extract_fields(df, ['key_skills'])
+        return self._add_skill_features(df)
+
+    def _add_skill_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        # признаки по отдельным навыкам - multi-hot матрица SkillIndex, она строится при сохранении
+        if 'skills_list' in df.columns:
+            df['skills_count'] = df['skills_list'].str.len()
         return df
     
-    def _get_top_skills(self, df, top_n=15):
-        all_skills = []
-        for skills in df['skills_list'].dropna():
-            all_skills.extend(skills)
-        
-        from collections import Counter
-        return [skill for skill, count in Counter(all_skills).most_common(top_n)]
-    
     def clean_dates(self, df: pd.DataFrame) -> pd.DataFrame:
         df = df.copy()
     
@@ -337,151 +210,37 @@ class DataCleaner:
         return df
     
     def clean_type_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'type' in df.columns:
-            df['type_id'] = df['type'].apply(
-                lambda x: x.get('id') if isinstance(x, dict) else None
-            )
-            df['type_name'] = df['type'].apply(
-                lambda x: x.get('name') if isinstance(x, dict) else None
-            )
-        
-        return df
-    
+        return self._extract_fields(df, ['type'])
+
     def clean_department_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'department' in df.columns:
-            df['department_id'] = df['department'].apply(
-                lambda x: x.get('id') if isinstance(x, dict) else None
-            )
-            df['department_name'] = df['department'].apply(
-                lambda x: x.get('name') if isinstance(x, dict) else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['department'])
 
     def clean_schedule_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'schedule' in df.columns:
-            df['schedule_id'] = df['schedule'].apply(
-                lambda x: x.get('id') if isinstance(x, dict) else None
-            )
-            df['schedule_name'] = df['schedule'].apply(
-                lambda x: x.get('name') if isinstance(x, dict) else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['schedule'])
 
     def clean_employment_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'employment' in df.columns:
-            df['employment_id'] = df['employment'].apply(
-                lambda x: x.get('id') if isinstance(x, dict) else None
-            )
-            df['employment_name'] = df['employment'].apply(
-                lambda x: x.get('name') if isinstance(x, dict) else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['employment'])
 
     def clean_professional_roles(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'professional_roles' in df.columns:
-            df['main_role_id'] = df['professional_roles'].apply(
-                lambda x: x[0].get('id') if isinstance(x, list) and len(x) > 0 else None
-            )
-            df['main_role_name'] = df['professional_roles'].apply(
-                lambda x: x[0].get('name') if isinstance(x, list) and len(x) > 0 else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['professional_roles'])
 
     def clean_address_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        
-        df = df.copy()
-        
-        if 'address' in df.columns:
-            df['address_city'] = df['address'].apply(
-                lambda x: x.get('city') if isinstance(x, dict) else None
-            )
-            df['address_street'] = df['address'].apply(
-                lambda x: x.get('street') if isinstance(x, dict) else None
-            )
-            df['address_building'] = df['address'].apply(
-                lambda x: x.get('building') if isinstance(x, dict) else None
-            )
-            df['address_raw'] = df['address'].apply(
-                lambda x: x.get('raw') if isinstance(x, dict) else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['address'])
 
     def clean_snippet_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        
-        df = df.copy()
-        
-        if 'snippet' in df.columns:
-            df['requirement'] = df['snippet'].apply(
-                lambda x: x.get('requirement') if isinstance(x, dict) else None
-            )
-            df['responsibility'] = df['snippet'].apply(
-                lambda x: x.get('responsibility') if isinstance(x, dict) else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['snippet'])
 
     def clean_work_format_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        
-        df = df.copy()
-        
-        if 'work_format' in df.columns:
-            df['work_format_name'] = df['work_format'].apply(
-                lambda x: x[0].get('name') if isinstance(x, list) and len(x) > 0 else None
-            )
-            df['work_format_id'] = df['work_format'].apply(
-                lambda x: x[0].get('id') if isinstance(x, list) and len(x) > 0 else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['work_format'])
 
     def clean_working_hours_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'working_hours' in df.columns:
-            df['working_hours_name'] = df['working_hours'].apply(
-                lambda x: x[0].get('name') if isinstance(x, list) and len(x) > 0 else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['working_hours'])
 
     def clean_work_schedule_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'work_schedule_by_days' in df.columns:
-            df['work_schedule_name'] = df['work_schedule_by_days'].apply(
-                lambda x: x[0].get('name') if isinstance(x, list) and len(x) > 0 else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['work_schedule_by_days'])
 
     def clean_employment_form_field(self, df: pd.DataFrame) -> pd.DataFrame:
-        
-        df = df.copy()
-        
-        if 'employment_form' in df.columns:
-            df['employment_form_id'] = df['employment_form'].apply(
-                lambda x: x.get('id') if isinstance(x, dict) else None
-            )
-            df['employment_form_name'] = df['employment_form'].apply(
-                lambda x: x.get('name') if isinstance(x, dict) else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['employment_form'])
 
     def clean_salary_range_field(self, df: pd.DataFrame) -> pd.DataFrame:
         df = df.copy()
@@ -492,30 +251,10 @@ class DataCleaner:
         return df       
     
     def clean_employer(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'employer' in df.columns:
-            df['employer_name'] = df['employer'].apply(
-                lambda x: x.get('name') if isinstance(x, dict) else None
-            )
-            df['employer_id'] = df['employer'].apply(
-                lambda x: x.get('id') if isinstance(x, dict) else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['employer'])
     
     def clean_area(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
-        if 'area' in df.columns:
-            df['area_name'] = df['area'].apply(
-                lambda x: x.get('name') if isinstance(x, dict) else None
-            )
-            df['area_id'] = df['area'].apply(
-                lambda x: x.get('id') if isinstance(x, dict) else None
-            )
-        
-        return df
+        return self._extract_fields(df, ['area'])
     
     def remove_outliers_optional(self, df: pd.DataFrame, remove_outliers: bool = False) -> pd.DataFrame:
 
@@ -545,8 +284,6 @@ class DataCleaner:
         return df
     
     def remove_json_fields(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        
         fields_to_remove = []
         
         service_fields = [
@@ -561,25 +298,8 @@ class DataCleaner:
             'internship', 'accept_temporary', 'created_at', 'archived'
         ]
         
-        field_mappings = {
-            'salary': ['salary_from', 'salary_to', 'salary_currency'],
-            'experience': ['experience_id', 'experience_name'],
-            'employer': ['employer_name', 'employer_id'],
-            'area': ['area_name', 'area_id'],
-            'type': ['type_id', 'type_name'],
-            'schedule': ['schedule_id', 'schedule_name'],
-            'employment': ['employment_id', 'employment_name'],
-            'professional_roles': ['main_role_id', 'main_role_name'],
-            'address': ['address_city', 'address_street', 'address_building', 'address_raw'],
-            'key_skills': ['skills_list', 'skills_count'],
-            'salary_range': [],
-            'snippet': ['requirement', 'responsibility'],
-            'work_format': ['work_format_name', 'work_format_id'],
-            'working_hours': ['working_hours_name'],
-            'work_schedule_by_days': ['work_schedule_name'],
-            'employment_form': ['employment_form_id', 'employment_form_name'],
-            'department': ['department_id', 'department_name']
-        }
+        field_mappings = {source: list(columns) for source, (_, columns) in FIELD_SPEC.items()}
+        field_mappings['key_skills'].append('skills_count')
         
         for original_field, extracted_fields in field_mappings.items():
             if original_field in df.columns:
@@ -598,51 +318,149 @@ class DataCleaner:
         
         return df
     
-    def run_full_clean(self, input_file: str, output_file: str = None, remove_outliers: bool = False, remove_json: bool = True):
+    def _clean_frame(self, df: pd.DataFrame, remove_json: bool = True, extract_text_skills: bool = False) -> pd.DataFrame:
+        df = self._add_salary_features(df)
+        df = self._add_experience_features(df)
+        df = self.clean_dates(df)
+        if extract_text_skills:
+            df = self.extract_skills_from_text(df)
+        df = self._add_skill_features(df)
+
+        if remove_json:
+            df = self.remove_json_fields(df)
+
+        return df
+
+    def run_full_clean(self, input_file: str, output_file: str = None, remove_outliers: bool = False, remove_json: bool = True,
+                       batch_size: int = 5000, extract_text_skills: bool = False, output_format: str = 'parquet'):
         
         logger.info(f"Начало очистки: {input_file}")
-        
-        df = self.load_data(input_file)
 
-        df = self.clean_salary(df)
-        df = self.clean_experience(df)
+        hashes = {}
 
-        df = self.clean_dates(df)
-        df = self.clean_employer(df)
-        df = self.clean_area(df)
-        df = self.clean_type_field(df)
-        df = self.clean_schedule_field(df)
-        df = self.clean_employment_field(df)
-        df = self.clean_professional_roles(df)
-        df = self.clean_address_field(df) 
-
-        df = self.clean_snippet_field(df)
-        df = self.extract_skills(df)
-
-        df = self.clean_work_format_field(df)
-        df = self.clean_working_hours_field(df)
-        df = self.clean_work_schedule_field(df)
-        df = self.clean_employment_form_field(df)
-        df = self.clean_salary_range_field(df)
-        df = self.clean_department_field(df)
+        def remember_hash(record):
+            hashes[str(record.get('id'))] = content_hash(record)
+            return True
 
-        if remove_json:
-            df = self.remove_json_fields(df)   
+        # вакансии читаются потоково, вложенные поля разворачиваются за один проход
+        df = self.load_flat_data(input_file, batch_size=batch_size, keep_nested=not remove_json,
+                                 record_filter=remember_hash if output_format == 'parquet' else None)
+
+        df = self._clean_frame(df, remove_json, extract_text_skills)
     
         df = self.remove_outliers_optional(df, remove_outliers)
+        skills = SkillIndex.from_frame(df)
+
+        if output_format == 'parquet':
+            output_file = output_file or DEFAULT_STORE_DIR
+            save_cleaned_dataset(df, output_file)
+            months = set(df[PARTITION_COLUMN].dropna())
+            self._update_index(output_file, df, hashes, replaced_months=months)
+            refresh_rollups(output_file, df, months)
+            refresh_skill_index(output_file, skills, months)
+            self._update_search_index(output_file, df, replaced_months=months)
+        elif output_format == 'csv':
+            if output_file is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                output_file = f"data/processed/new_cleaned_vacancies_{timestamp}.csv"
+            df.to_csv(output_file, index=False, encoding='utf-8')
+        else:
+            raise ValueError(f"Неизвестный формат вывода: {output_format}")
 
-        if output_file is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = f"data/processed/new_cleaned_vacancies_{timestamp}.csv"
-        
-        df.to_csv(output_file, index=False, encoding='utf-8')
         logger.info(f"Очищенные данные сохранены: {output_file}")
         
-        self._print_statistics(df, input_file, output_file)
+        self._print_statistics(df, input_file, output_file, skills)
         
         return df
-    
-    def _print_statistics(self, df, input_file, output_file):
+
+    def run_incremental_clean(self, input_file: str, store_dir: str = None, remove_json: bool = True,
+                              batch_size: int = 5000, extract_text_skills: bool = False) -> pd.DataFrame:
+        """Очищает только новые и изменившиеся вакансии и дописывает их в хранилище"""
+        store_dir = store_dir or DEFAULT_STORE_DIR
+        logger.info(f"Инкрементальная очистка: {input_file} -> {store_dir}")
+
+        index = load_index(store_dir)
+        known = dict(zip(index['id'], index['content_hash']))
+        hashes = {}
+
+        def is_new_or_changed(record):
+            vac_id = str(record.get('id'))
+            if vac_id in hashes:
+                return False
+            record_hash = content_hash(record)
+            if known.get(vac_id) == record_hash:
+                return False
+            hashes[vac_id] = record_hash
+            return True
+
+        df = self.load_flat_data(input_file, batch_size=batch_size, keep_nested=not remove_json,
+                                 record_filter=is_new_or_changed)
+        if df.empty:
+            logger.info("Новых или измененных вакансий нет")
+            return df
+
+        df = self._clean_frame(df, remove_json, extract_text_skills)
+        df['id'] = df['id'].astype(str)
+
+        changed = index[index['id'].isin(set(df['id']))]
+        logger.info(f"Новых вакансий: {len(df) - len(changed)}, измененных: {len(changed)}")
+
+        months = set(df[PARTITION_COLUMN].dropna()) | set(changed[PARTITION_COLUMN].dropna())
+        existing = load_partitions(store_dir, months)
+        if not existing.empty:
+            existing = existing[~existing['id'].astype(str).isin(set(df['id']))]
+
+        merged = pd.concat([existing, df], ignore_index=True)
+        merged = self._refresh_derived(merged)
+
+        for month in months - set(merged[PARTITION_COLUMN].dropna()):
+            drop_partition(store_dir, month)
+        save_cleaned_dataset(merged, store_dir)
+        self._update_index(store_dir, df, hashes)
+        refresh_rollups(store_dir, merged, months)
+        refresh_skill_index(store_dir, SkillIndex.from_frame(merged), months)
+        self._update_search_index(store_dir, df)
+
+        logger.info(f"Хранилище обновлено: {len(df)} вакансий, {len(months)} партиций")
+        return df
+
+    def _refresh_derived(self, df: pd.DataFrame) -> pd.DataFrame:
+        if 'published_at' in df.columns:
+            published_at = pd.to_datetime(df['published_at'], utc=True)
+            df['days_since_publication'] = (pd.Timestamp.now(tz='UTC') - published_at).dt.days
+
+        # колонки skill_* из прежних версий очистки устаревают при изменении вакансий; навыки - в SkillIndex
+        df = df.drop(columns=[c for c in df.columns if c.startswith('skill_')])
+
+        return df
+
+    def _update_search_index(self, store_dir: str, df: pd.DataFrame, replaced_months: set = None):
+        # пишутся только очищенные сейчас вакансии; пустой индекс сначала заполняется всем хранилищем
+        index = SearchIndex(os.path.join(store_dir, SEARCH_FILE))
+        try:
+            if len(index) == 0:
+                index.update(load_cleaned_dataset(store_dir, columns=SEARCH_COLUMNS))
+            else:
+                index.update(df, replaced_months=replaced_months)
+        finally:
+            index.close()
+
+    def _update_index(self, store_dir: str, df: pd.DataFrame, hashes: dict, replaced_months: set = None):
+        index = load_index(store_dir)
+        ids = df['id'].astype(str)
+
+        stale = index['id'].isin(set(ids))
+        if replaced_months:
+            stale |= index[PARTITION_COLUMN].isin(replaced_months)
+
+        new_rows = pd.DataFrame({
+            'id': ids.values,
+            'content_hash': [hashes.get(vac_id) for vac_id in ids],
+            PARTITION_COLUMN: df[PARTITION_COLUMN].astype(str).values
+        })
+        save_index(pd.concat([index[~stale], new_rows], ignore_index=True), store_dir)
+
+    def _print_statistics(self, df, input_file, output_file, skills: SkillIndex = None):
     
         if 'has_salary' in df.columns:
             with_salary = df['has_salary'].sum()
@@ -667,15 +485,11 @@ class DataCleaner:
             print(f"\nСреднее количество навыков: {avg_skills:.1f}")
         
         if 'skills_list' in df.columns:
-            all_skills = []
-            for skills in df['skills_list'].dropna():
-                all_skills.extend(skills)
-            
-            if all_skills:
-                from collections import Counter
-                top_skills = Counter(all_skills).most_common(10)
+            skills = skills if skills is not None else SkillIndex.from_lists(df['skills_list'])
+            top_skills = skills.top(10)
+            if len(top_skills):
                 print(f"\nТоп-10 навыков:")
-                for skill, count in top_skills:
+                for skill, count in top_skills.items():
                     percentage = count / len(df) * 100
                     print(f"  {skill}: {count} ({percentage:.1f}%)")
         
@@ -689,5 +503,9 @@ if __name__ == "__main__":
     if not os.path.exists(input_file):
         print(f"Файл не найден: {input_file}")
     else:
-        df_cleaned = cleaner.run_full_clean(input_file, remove_outliers=False)
+        # при существующем хранилище очищаются только новые и изменившиеся вакансии
+        if store_exists(DEFAULT_STORE_DIR):
+            df_cleaned = cleaner.run_incremental_clean(input_file)
+        else:
+            df_cleaned = cleaner.run_full_clean(input_file, remove_outliers=False)
         print("\nОчистка завершена")
\ No newline at end of file
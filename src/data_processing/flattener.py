@@ -0,0 +1,139 @@
+import ast
+import json
+
+import numpy as np
+import pandas as pd
+
+# Описание вложенных полей вакансии hh.ru: исходное поле -> (режим, {колонка: ключ})
+#   dict  - поле является словарем, берем значения по ключам
+#   first - поле является списком словарей, берем первый элемент
+#   each  - поле является списком словарей, собираем значения ключа у всех элементов
+FIELD_SPEC = {
+    'salary': ('dict', {'salary_from': 'from', 'salary_to': 'to', 'salary_currency': 'currency'}),
+    'experience': ('dict', {'experience_id': 'id', 'experience_name': 'name'}),
+    'employer': ('dict', {'employer_name': 'name', 'employer_id': 'id'}),
+    'area': ('dict', {'area_name': 'name', 'area_id': 'id'}),
+    'type': ('dict', {'type_id': 'id', 'type_name': 'name'}),
+    'schedule': ('dict', {'schedule_id': 'id', 'schedule_name': 'name'}),
+    'employment': ('dict', {'employment_id': 'id', 'employment_name': 'name'}),
+    'professional_roles': ('first', {'main_role_id': 'id', 'main_role_name': 'name'}),
+    'address': ('dict', {
+        'address_city': 'city',
+        'address_street': 'street',
+        'address_building': 'building',
+        'address_raw': 'raw'
+    }),
+    'snippet': ('dict', {'requirement': 'requirement', 'responsibility': 'responsibility'}),
+    'key_skills': ('each', {'skills_list': 'name'}),
+    'work_format': ('first', {'work_format_name': 'name', 'work_format_id': 'id'}),
+    'working_hours': ('first', {'working_hours_name': 'name'}),
+    'work_schedule_by_days': ('first', {'work_schedule_name': 'name'}),
+    'employment_form': ('dict', {'employment_form_id': 'id', 'employment_form_name': 'name'}),
+    'department': ('dict', {'department_id': 'id', 'department_name': 'name'}),
+    'salary_range': ('dict', {}),
+}
+
+
+def parse_serialized(value):
+    """Восстанавливает dict/list, сохраненный строкой (например, после CSV)"""
+    if not isinstance(value, str):
+        return value
+
+    value = value.strip()
+
+    if (value.startswith('{') and value.endswith('}')) or \
+            (value.startswith('[') and value.endswith(']')):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            try:
+                value = value.replace("'", '"')
+                value = value.replace('None', 'null')
+                value = value.replace('True', 'true').replace('False', 'false')
+                return json.loads(value)
+            except ValueError:
+                return value
+    return value
+
+
+def parse_list(value) -> list:
+    """Список из значения, хранящегося списком (Parquet) или строкой (CSV); иначе пустой список"""
+    value = parse_serialized(value)
+    return list(value) if isinstance(value, (list, tuple, np.ndarray)) else []
+
+
+def _compile(spec):
+    return [(source, mode, list(columns.items())) for source, (mode, columns) in spec.items()]
+
+
+def _extract(value, mode, pairs, out):
+    if isinstance(value, str):
+        value = parse_serialized(value)
+
+    if mode == 'each':
+        for column, key in pairs:
+            if isinstance(value, list):
+                out[column].append([item.get(key) for item in value if isinstance(item, dict)])
+            else:
+                out[column].append([])
+        return
+
+    if mode == 'first':
+        value = value[0] if isinstance(value, list) and len(value) > 0 else None
+
+    if isinstance(value, dict):
+        for column, key in pairs:
+            out[column].append(value.get(key))
+    else:
+        for column, _ in pairs:
+            out[column].append(None)
+
+
+def extract_field(values, source, spec=FIELD_SPEC) -> dict:
+    """Извлекает подполя одного вложенного поля в словарь колонок"""
+    mode, columns = spec[source]
+    pairs = list(columns.items())
+    out = {column: [] for column, _ in pairs}
+    for value in values:
+        _extract(value, mode, pairs, out)
+    return out
+
+
+def flatten_records(records, spec=FIELD_SPEC, keep_nested: bool = False) -> pd.DataFrame:
+    """Разворачивает сырые вакансии в плоский DataFrame за один проход по записям"""
+    plan = _compile(spec)
+    extracted = {column: [] for _, _, pairs in plan for column, _ in pairs}
+    passthrough = {}
+    seen_sources = set()
+    n = 0
+
+    for record in records:
+        for source, mode, pairs in plan:
+            value = record.get(source)
+            if source not in seen_sources and source in record:
+                seen_sources.add(source)
+            _extract(value, mode, pairs, extracted)
+
+        appended = 0
+        for key, value in record.items():
+            if key in spec and not keep_nested:
+                continue
+            column = passthrough.get(key)
+            if column is None:
+                column = passthrough[key] = [None] * n
+            column.append(value)
+            appended += 1
+
+        n += 1
+        if appended < len(passthrough):
+            for column in passthrough.values():
+                if len(column) < n:
+                    column.append(None)
+
+    data = dict(passthrough)
+    for source, _, pairs in plan:
+        if source in seen_sources:
+            for column, _ in pairs:
+                data[column] = extracted[column]
+
+    return pd.DataFrame(data, index=pd.RangeIndex(n))
@@ -0,0 +1,122 @@
+import io
+import gzip
+import json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_SEPARATORS = _WHITESPACE + ','
+
+
+def compression_of(filepath: str):
+    if filepath.endswith('.gz'):
+        return 'gzip'
+    if filepath.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def open_text(filepath: str):
+    """Открывает JSON/JSON Lines файл на чтение, в том числе сжатый gzip или zstd"""
+    compression = compression_of(filepath)
+    if compression == 'gzip':
+        return gzip.open(filepath, 'rt', encoding='utf-8')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("Для чтения .zst нужен пакет zstandard")
+        raw = open(filepath, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(filepath, 'r', encoding='utf-8')
+
+
+def _is_json_lines(filepath: str, head: str) -> bool:
+    if compression_of(filepath):
+        filepath = filepath.rsplit('.', 1)[0]
+    if filepath.endswith('.jsonl') or filepath.endswith('.ndjson'):
+        return True
+    return not head.lstrip(_WHITESPACE).startswith('[')
+
+
+def _iter_json_lines(f, head: str, chunk_size: int):
+    buffer = head
+    while True:
+        lines = buffer.split('\n')
+        buffer = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+def _iter_json_array(f, head: str, chunk_size: int):
+    buffer = head.lstrip(_WHITESPACE)[1:]
+    pos = 0
+    eof = False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        if pos >= len(buffer) and eof:
+            raise ValueError("Незавершенный JSON-массив")
+
+        try:
+            if pos >= len(buffer):
+                raise json.JSONDecodeError("Нет данных", buffer, pos)
+            record, end = _decoder.raw_decode(buffer, pos)
+            # запись вплотную к концу буфера может быть обрезана (например, число)
+            if end == len(buffer) and not eof:
+                raise json.JSONDecodeError("Обрезанная запись", buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield record
+        pos = end
+
+        if pos > chunk_size:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def iter_records(filepath: str, chunk_size: int = 1 << 20):
+    """Потоково читает вакансии из JSON-массива или JSON Lines файла"""
+    with open_text(filepath) as f:
+        head = f.read(chunk_size)
+        if _is_json_lines(filepath, head):
+            yield from _iter_json_lines(f, head, chunk_size)
+        else:
+            yield from _iter_json_array(f, head, chunk_size)
+
+
+def iter_record_batches(filepath: str, batch_size: int = 5000, chunk_size: int = 1 << 20):
+    batch = []
+    for record in iter_records(filepath, chunk_size=chunk_size):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,162 @@
+import os
+import json
+import shutil
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.data_processing.flattener import parse_serialized
+from src.data_processing.store import DEFAULT_STORE_DIR, PARTITION_COLUMN, load_cleaned_dataset, store_exists
+from src.utils.data_loader import simplify_job_name
+
+logger = logging.getLogger(__name__)
+
+# каталог с '_' не читается pyarrow как часть датасета и не входит в store_fingerprint
+ROLLUP_DIR = '_rollups'
+ROLLUP_META = 'meta.json'
+ROLLUP_TABLES = ('groups', 'salary_hist', 'skills', 'daily')
+
+GROUP_COLUMNS = [PARTITION_COLUMN, 'experience_id', 'experience_name', 'area_id', 'area_name', 'role']
+# колонки очищенных вакансий, из которых строятся агрегаты
+SOURCE_COLUMNS = ['published_at', PARTITION_COLUMN, 'experience_id', 'experience_name', 'area_id', 'area_name',
+                  'name', 'salary_avg', 'skills_list']
+# ширина корзины гистограммы зарплат: квантили по любому срезу считаются по ней с точностью до корзины
+SALARY_BIN = 5000
+MISSING = 'Не указано'
+
+
+@dataclass
+class Rollups:
+    """Предагрегированные вакансии.
+
+    groups - число вакансий и статистики зарплат по месяцу x опыту x региону x роли;
+    salary_hist - гистограмма зарплат по тем же группам (суммируется для квантилей любого среза);
+    skills - спрос на навыки по тем же группам; daily - число вакансий по дням публикации.
+    """
+    groups: pd.DataFrame
+    salary_hist: pd.DataFrame
+    skills: pd.DataFrame
+    daily: pd.DataFrame
+    built_at: str = None
+
+
+def id_strings(values: pd.Series) -> pd.Series:
+    """Идентификаторы строками; в CSV id с пропусками читаются как float: 1234.0 -> '1234'"""
+    if pd.api.types.is_float_dtype(values):
+        values = values.astype('Int64')
+    return values.astype('string')
+
+
+def _dimensions(df: pd.DataFrame) -> pd.DataFrame:
+    dims = pd.DataFrame(index=df.index)
+    for col in GROUP_COLUMNS:
+        if col == 'role':
+            values = df['name'].map(simplify_job_name) if 'name' in df.columns else None
+        else:
+            values = df[col] if col in df.columns else None
+            if values is not None and col.endswith('_id'):
+                values = id_strings(values)
+        if values is None:
+            dims[col] = MISSING
+        else:
+            dims[col] = values.astype('string').fillna(MISSING).astype(str)
+    if 'published_at' in df.columns and (dims[PARTITION_COLUMN] == MISSING).any():
+        # в CSV без колонки месяца он восстанавливается по дате публикации
+        months = pd.to_datetime(df['published_at'], utc=True, errors='coerce').dt.strftime('%Y-%m')
+        dims[PARTITION_COLUMN] = dims[PARTITION_COLUMN].mask(dims[PARTITION_COLUMN] == MISSING, months)
+        dims[PARTITION_COLUMN] = dims[PARTITION_COLUMN].fillna(MISSING)
+    return dims
+
+
+def build_rollups(df: pd.DataFrame) -> Rollups:
+    """Строит агрегаты по очищенным вакансиям за один проход группировок"""
+    dims = _dimensions(df)
+    salary = pd.to_numeric(df['salary_avg'], errors='coerce') if 'salary_avg' in df.columns \
+        else pd.Series(np.nan, index=df.index)
+    frame = dims.assign(salary=salary.to_numpy())
+
+    grouped = frame.groupby(GROUP_COLUMNS, sort=True)['salary']
+    groups = grouped.agg(vacancies='size', with_salary='count', salary_sum='sum',
+                         salary_min='min', salary_max='max')
+    quantiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    quantiles.columns = ['salary_p25', 'salary_median', 'salary_p75']
+    groups = groups.join(quantiles).reset_index()
+
+    paid = frame[frame['salary'].notna()]
+    bins = (paid['salary'] // SALARY_BIN * SALARY_BIN).astype(np.int64)
+    salary_hist = paid[GROUP_COLUMNS].assign(salary_bin=bins.to_numpy()) \
+        .groupby(GROUP_COLUMNS + ['salary_bin'], sort=True).size().reset_index(name='vacancies')
+
+    if 'skills_list' in df.columns:
+        skills = dims.assign(skill=df['skills_list'].map(parse_serialized).to_numpy()).explode('skill')
+        skills = skills[skills['skill'].map(lambda s: isinstance(s, str) and s != '')]
+        skills = skills.groupby(GROUP_COLUMNS + ['skill'], sort=True).size().reset_index(name='vacancies')
+    else:
+        skills = pd.DataFrame(columns=GROUP_COLUMNS + ['skill', 'vacancies'])
+
+    if 'published_at' in df.columns:
+        dates = pd.to_datetime(df['published_at'], utc=True, errors='coerce').dt.strftime('%Y-%m-%d')
+        daily = pd.DataFrame({PARTITION_COLUMN: dims[PARTITION_COLUMN].to_numpy(), 'published_date': dates.to_numpy()})
+        daily = daily.dropna().groupby([PARTITION_COLUMN, 'published_date'], sort=True).size() \
+            .reset_index(name='vacancies')
+    else:
+        daily = pd.DataFrame(columns=[PARTITION_COLUMN, 'published_date', 'vacancies'])
+
+    return Rollups(groups, salary_hist, skills, daily, built_at=datetime.now().isoformat(timespec='seconds'))
+
+
+def save_rollups(rollups: Rollups, store_dir: str = DEFAULT_STORE_DIR, months=None):
+    """Сохраняет агрегаты рядом с хранилищем.
+
+    Если переданы months, заменяются только агрегаты этих месяцев, остальные остаются как были.
+    """
+    directory = os.path.join(store_dir, ROLLUP_DIR)
+    if months is not None:
+        existing = load_rollups(store_dir)
+        if existing is not None:
+            months = set(months)
+            merged = {}
+            for name in ROLLUP_TABLES:
+                old, new = getattr(existing, name), getattr(rollups, name)
+                merged[name] = pd.concat([old[~old[PARTITION_COLUMN].isin(months)], new], ignore_index=True)
+            rollups = Rollups(built_at=rollups.built_at, **merged)
+
+    tmp_dir = f"{directory}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name in ROLLUP_TABLES:
+        table = pa.Table.from_pandas(getattr(rollups, name).reset_index(drop=True), preserve_index=False)
+        pq.write_table(table, os.path.join(tmp_dir, f"{name}.parquet"))
+    with open(os.path.join(tmp_dir, ROLLUP_META), 'w', encoding='utf-8') as f:
+        json.dump({'built_at': rollups.built_at}, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    logger.info(f"Агрегаты сохранены: {len(rollups.groups)} групп в {directory}")
+
+
+def load_rollups(store_dir: str = DEFAULT_STORE_DIR):
+    directory = os.path.join(store_dir, ROLLUP_DIR)
+    if not os.path.exists(os.path.join(directory, ROLLUP_META)):
+        return None
+    with open(os.path.join(directory, ROLLUP_META), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    tables = {name: pq.read_table(os.path.join(directory, f"{name}.parquet")).to_pandas() for name in ROLLUP_TABLES}
+    return Rollups(built_at=meta.get('built_at'), **tables)
+
+
+def refresh_rollups(store_dir: str, df: pd.DataFrame, months) -> Rollups:
+    """Пересчитывает агрегаты перезаписанных месяцев; без сохраненных агрегатов строит их по всему хранилищу"""
+    if load_rollups(store_dir) is None:
+        if store_exists(store_dir):
+            df = load_cleaned_dataset(store_dir, columns=SOURCE_COLUMNS)
+        rollups = build_rollups(df)
+        save_rollups(rollups, store_dir)
+        return rollups
+    rollups = build_rollups(df)
+    save_rollups(rollups, store_dir, months=months)
+    return rollups
@@ -0,0 +1,233 @@
+import os
+import re
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+
+import pandas as pd
+
+from src.data_processing.store import DEFAULT_STORE_DIR, PARTITION_COLUMN, load_cleaned_dataset, store_exists
+from src.utils.data_loader import load_vacancies_data
+
+logger = logging.getLogger(__name__)
+
+# файл с '_' лежит рядом с партициями, но не читается pyarrow и не входит в store_fingerprint
+SEARCH_FILE = '_search.sqlite'
+# текстовые поля в полнотекстовом индексе и их веса в bm25
+TEXT_COLUMNS = {'name': 3.0, 'requirement': 1.0, 'responsibility': 1.0}
+RESULT_COLUMNS = ['id', 'name', 'employer_name', 'area_name', 'salary_avg', 'published_at',
+                  'requirement', 'responsibility']
+SOURCE_COLUMNS = RESULT_COLUMNS + [PARTITION_COLUMN]
+
+_TAG = re.compile(r'<[^>]+>')
+_WORD = re.compile(r'\w+')
+_VOWELS = set('аеиоуыэюя')
+# окончания в порядке шагов упрощенного стеммера Портера для русского языка;
+# внутри шага отбрасывается самое длинное совпавшее окончание
+_PERFECTIVE = {'ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв'}
+# эти окончания деепричастий отбрасываются только после «а» или «я»: сделав, стремясь
+_PERFECTIVE_AFTER_A = {'вшись', 'вши', 'в'}
+_REFLEXIVE = {'ся', 'сь'}
+_ENDINGS = {
+    # прилагательные и причастия
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему',
+    'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    # глаголы
+    'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'уй', 'ил', 'ыл', 'ен', 'ило', 'ыло', 'ено',
+    'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ла', 'на', 'ете', 'йте', 'ли', 'л', 'ло',
+    'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    # существительные
+    'а', 'ев', 'ов', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'й', 'иям', 'ям', 'ием', 'ам',
+    'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+}
+
+
+def _strip(word: str, suffixes: set) -> tuple:
+    for size in range(min(len(word), 6), 0, -1):
+        if word[-size:] in suffixes:
+            return word[:-size], True
+    return word, False
+
+
+@lru_cache(maxsize=100000)
+def stem(word: str) -> str:
+    """Основа слова: окончания отбрасываются только после первой гласной (область RV).
+
+    Латиница и числа не меняются, поэтому названия технологий ищутся как есть.
+    """
+    word = word.lower().replace('ё', 'е')
+    pos = next((i for i, ch in enumerate(word) if ch in _VOWELS), None)
+    if pos is None:
+        return word
+    head, rv = word[:pos + 1], word[pos + 1:]
+    rv, found = _strip(rv, _PERFECTIVE)
+    if not found:
+        stripped, found = _strip(rv, _PERFECTIVE_AFTER_A)
+        if found and stripped[-1:] in ('а', 'я'):
+            rv = stripped
+        else:
+            found = False
+    if not found:
+        rv, _ = _strip(rv, _REFLEXIVE)
+        rv, _ = _strip(rv, _ENDINGS)
+    rv, _ = _strip(rv, {'и'})
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    rv, _ = _strip(rv, {'ь'})
+    return head + rv
+
+
+def clean_text(value) -> str:
+    """Текст сниппета без разметки hh.ru (<highlighttext>)"""
+    if not isinstance(value, str):
+        return ''
+    return _TAG.sub('', value).strip()
+
+
+def stem_text(value) -> str:
+    return ' '.join(stem(word.lower()) for word in _WORD.findall(clean_text(value)))
+
+
+def _match_expression(query: str) -> str:
+    # все слова запроса обязательны; каждое ищется как префикс основы
+    terms = [stem(word) for word in _WORD.findall(query) if len(word) > 1]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+class SearchIndex:
+    """Полнотекстовый поиск вакансий по названию, требованиям и обязанностям (SQLite FTS5).
+
+    В индекс попадают основы слов, поэтому запрос «аналитика данных» находит «аналитик данные».
+    Результаты ранжируются по bm25, совпадение в названии весит больше, чем в сниппетах.
+    Индекс обновляется порциями очищенных вакансий: записи с теми же id заменяются.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path) if path != ':memory:' else ''
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vacancies (
+                rowid INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                month TEXT,
+                name TEXT,
+                employer_name TEXT,
+                area_name TEXT,
+                salary_avg REAL,
+                published_at TEXT,
+                requirement TEXT,
+                responsibility TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_month ON vacancies (month)")
+        columns = ', '.join(TEXT_COLUMNS)
+        self._conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS vacancy_text USING fts5({columns})")
+        self._conn.commit()
+
+    @classmethod
+    def open(cls, store_dir: str = DEFAULT_STORE_DIR) -> "SearchIndex":
+        """Индекс хранилища; если его еще нет, строится по очищенным вакансиям"""
+        if not store_exists(store_dir):
+            index = cls()
+            index.update(load_vacancies_data(columns=SOURCE_COLUMNS, simplify_names=False))
+            return index
+
+        index = cls(os.path.join(store_dir, SEARCH_FILE))
+        if len(index) == 0:
+            index.update(load_cleaned_dataset(store_dir, columns=SOURCE_COLUMNS))
+        return index
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vacancies").fetchone()[0]
+
+    def _delete(self, where: str, params):
+        self._conn.execute(f"DELETE FROM vacancy_text WHERE rowid IN (SELECT rowid FROM vacancies WHERE {where})",
+                           params)
+        self._conn.execute(f"DELETE FROM vacancies WHERE {where}", params)
+
+    def update(self, df: pd.DataFrame, replaced_months=None):
+        """Добавляет или заменяет вакансии df; записи месяцев replaced_months удаляются заранее"""
+        if df.empty and not replaced_months:
+            return
+        ids = df['id'].astype(str).tolist()
+
+        def column(name):
+            return df[name].tolist() if name in df.columns else [None] * len(df)
+
+        partitions = df[PARTITION_COLUMN].astype('string').tolist() if PARTITION_COLUMN in df.columns \
+            else [None] * len(df)
+        published = pd.to_datetime(df['published_at'], utc=True, errors='coerce') if 'published_at' in df.columns \
+            else pd.Series(pd.NaT, index=df.index)
+        salary = pd.to_numeric(df['salary_avg'], errors='coerce') if 'salary_avg' in df.columns \
+            else pd.Series(float('nan'), index=df.index)
+        texts = {name: [clean_text(v) for v in column(name)] for name in TEXT_COLUMNS}
+        rows = [
+            (vac_id, None if pd.isna(month) else month, texts['name'][i], _text_or_none(employer),
+             _text_or_none(area), None if pd.isna(pay) else float(pay),
+             None if pd.isna(date) else date.isoformat(), texts['requirement'][i], texts['responsibility'][i])
+            for i, (vac_id, month, employer, area, pay, date) in enumerate(zip(
+                ids, partitions, column('employer_name'), column('area_name'), salary, published))
+        ]
+
+        with self._lock:
+            with self._conn:
+                if replaced_months:
+                    months = sorted(map(str, replaced_months))
+                    self._delete(f"month IN ({', '.join('?' * len(months))})", months)
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    self._delete(f"id IN ({', '.join('?' * len(chunk))})", chunk)
+                self._conn.executemany("""
+                    INSERT INTO vacancies (id, month, name, employer_name, area_name, salary_avg, published_at,
+                                           requirement, responsibility)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                self._conn.executemany(
+                    f"INSERT INTO vacancy_text (rowid, {', '.join(TEXT_COLUMNS)}) "
+                    f"SELECT rowid, ?, ?, ? FROM vacancies WHERE id = ?",
+                    [tuple(stem_text(texts[name][i]) for name in TEXT_COLUMNS) + (vac_id,)
+                     for i, vac_id in enumerate(ids)]
+                )
+        logger.info(f"Поисковый индекс обновлен: {len(ids)} вакансий")
+
+    def search(self, query: str, limit: int = 20, area_name: str = None) -> pd.DataFrame:
+        """Вакансии, содержащие все слова запроса, по убыванию релевантности"""
+        expression = _match_expression(query)
+        if not expression:
+            return pd.DataFrame(columns=RESULT_COLUMNS + ['score'])
+        weights = ', '.join(map(str, TEXT_COLUMNS.values()))
+        sql = f"""
+            SELECT v.id, v.name, v.employer_name, v.area_name, v.salary_avg, v.published_at,
+                   v.requirement, v.responsibility, bm25(vacancy_text, {weights}) AS score
+            FROM vacancy_text JOIN vacancies v ON v.rowid = vacancy_text.rowid
+            WHERE vacancy_text MATCH ?
+        """
+        params = [expression]
+        if area_name is not None:
+            sql += " AND v.area_name = ?"
+            params.append(area_name)
+        # bm25 в SQLite отрицательный: чем меньше, тем релевантнее
+        sql += " ORDER BY score LIMIT ?"
+        params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        result = pd.DataFrame(rows, columns=RESULT_COLUMNS + ['score'])
+        result['score'] = -result['score']
+        return result
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _text_or_none(value):
+    return None if value is None or pd.isna(value) else str(value)
@@ -0,0 +1,366 @@
+import os
+import json
+import logging
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src.domain.models import VacancyStats
+from src.data_processing.flattener import parse_serialized
+from src.data_processing.rollups import MISSING, id_strings
+from src.data_processing.store import DEFAULT_STORE_DIR, PARTITION_COLUMN, load_cleaned_dataset, store_exists
+
+logger = logging.getLogger(__name__)
+
+# каталог с '_' не читается pyarrow как часть датасета и не входит в store_fingerprint
+SKILL_INDEX_DIR = '_skill_index'
+SKILL_INDEX_META = 'meta.json'
+# атрибуты вакансий, по которым можно сузить запрос (where)
+ATTRIBUTE_COLUMNS = [PARTITION_COLUMN, 'area_id', 'area_name', 'experience_id']
+SOURCE_COLUMNS = ['id', 'skills_list', 'salary_avg'] + ATTRIBUTE_COLUMNS
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return value
+    value = parse_serialized(value)
+    return value if isinstance(value, (list, tuple, np.ndarray)) else ()
+
+
+def _member(values: np.ndarray, sorted_set: np.ndarray) -> np.ndarray:
+    """Маска values, входящих в отсортированный массив: бинарный поиск, O(len(values) log len(set))"""
+    if len(sorted_set) == 0:
+        return np.zeros(len(values), dtype=bool)
+    pos = np.searchsorted(sorted_set, values)
+    pos[pos == len(sorted_set)] = 0
+    return sorted_set[pos] == values
+
+
+class SkillIndex:
+    """Инвертированный индекс навыков: навык -> отсортированный массив позиций вакансий.
+
+    Списки позиций лежат подряд в postings, границы навыка i - offsets[i]:offsets[i + 1]
+    (как в CSR-матрице). Для вакансий хранятся id, зарплата и атрибуты для фильтров,
+    поэтому спрос, совместная встречаемость и зарплаты считаются пересечением списков
+    без обращения к исходной таблице.
+    """
+
+    def __init__(self, skills, offsets, postings, ids=None, salary=None, attrs=None):
+        self.skills = list(skills)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.postings = np.asarray(postings, dtype=np.int32)
+        self.salary = np.asarray(salary, dtype=np.float64)
+        self.n_docs = len(self.salary)
+        self.ids = np.asarray(ids, dtype=str) if ids is not None else None
+        self.attrs = {name: np.asarray(values, dtype=str) for name, values in (attrs or {}).items()}
+        self._positions = {skill: i for i, skill in enumerate(self.skills)}
+        # номер навыка для каждого элемента postings
+        self._skill_of = np.repeat(np.arange(len(self.skills), dtype=np.int64), np.diff(self.offsets))
+
+    @classmethod
+    def from_lists(cls, skills_lists, ids=None, salary=None, attrs=None) -> "SkillIndex":
+        """Строит индекс за один векторный проход; навыки нумеруются в порядке первого появления"""
+        lists = [_as_list(value) for value in skills_lists]
+        lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+        rows = np.repeat(np.arange(len(lists), dtype=np.int32), lengths)
+        codes, skills = pd.factorize(pd.Series(list(chain.from_iterable(lists)), dtype=object))
+        # пустые и нестроковые значения в индекс не попадают
+        bad = np.flatnonzero([not (isinstance(skill, str) and skill) for skill in skills])
+        if len(bad):
+            remap = np.full(len(skills) + 1, -1, dtype=np.int64)
+            keep = np.setdiff1d(np.arange(len(skills)), bad)
+            remap[keep] = np.arange(len(keep))
+            codes, skills = remap[codes], skills[keep]
+
+        valid = codes >= 0
+        codes, rows = codes[valid], rows[valid]
+        # стабильная сортировка по навыку оставляет строки внутри навыка по возрастанию
+        order = np.argsort(codes, kind='stable')
+        codes, rows = codes[order], rows[order]
+        if len(rows):
+            # повтор навыка в одной вакансии учитывается один раз
+            keep = np.r_[True, (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])]
+            codes, rows = codes[keep], rows[keep]
+        offsets = np.searchsorted(codes, np.arange(len(skills) + 1))
+
+        if salary is None:
+            salary = np.full(len(lists), np.nan)
+        return cls(list(skills), offsets, rows, ids=ids, salary=salary, attrs=attrs)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SkillIndex":
+        attrs = {}
+        for col in ATTRIBUTE_COLUMNS:
+            if col in df.columns:
+                values = id_strings(df[col]) if col.endswith('_id') else df[col].astype('string')
+                attrs[col] = values.fillna(MISSING).to_numpy(dtype=str)
+            else:
+                attrs[col] = np.full(len(df), MISSING)
+        salary = pd.to_numeric(df['salary_avg'], errors='coerce') if 'salary_avg' in df.columns \
+            else pd.Series(np.nan, index=df.index)
+        ids = df['id'].astype(str).to_numpy() if 'id' in df.columns else None
+        skills = df['skills_list'] if 'skills_list' in df.columns else [[]] * len(df)
+        return cls.from_lists(skills, ids=ids, salary=salary.to_numpy(dtype=np.float64), attrs=attrs)
+
+    @classmethod
+    def concat(cls, parts: list) -> "SkillIndex":
+        """Склеивает индексы частей (например, месяцев) с общим словарем навыков"""
+        skills = list(dict.fromkeys(chain.from_iterable(part.skills for part in parts)))
+        positions = {skill: i for i, skill in enumerate(skills)}
+        codes, rows, base = [], [], 0
+        for part in parts:
+            mapping = np.array([positions[s] for s in part.skills], dtype=np.int64)
+            codes.append(np.repeat(mapping, np.diff(part.offsets)))
+            rows.append(part.postings.astype(np.int64) + base)
+            base += part.n_docs
+        codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        # части идут по порядку, поэтому после стабильной сортировки строки навыка возрастают
+        order = np.argsort(codes, kind='stable')
+        offsets = np.searchsorted(codes[order], np.arange(len(skills) + 1))
+
+        def joined(get):
+            values = [get(part) for part in parts]
+            return np.concatenate(values) if all(v is not None for v in values) else None
+
+        attrs = {name: joined(lambda p, name=name: p.attrs.get(name)) for name in (parts[0].attrs if parts else {})}
+        salary = joined(lambda p: p.salary) if parts else np.empty(0)
+        return cls(skills, offsets, rows[order], ids=joined(lambda p: p.ids) if parts else None, salary=salary,
+                   attrs={name: values for name, values in attrs.items() if values is not None})
+
+    def save(self, path: str):
+        arrays = {'offsets': self.offsets, 'postings': self.postings,
+                  'skills': np.asarray(self.skills, dtype=str)}
+        if self.ids is not None:
+            arrays['ids'] = self.ids
+        arrays['salary'] = self.salary
+        for name, values in self.attrs.items():
+            arrays[f'attr_{name}'] = values
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "SkillIndex":
+        with np.load(path, allow_pickle=False) as data:
+            attrs = {name[5:]: data[name] for name in data.files if name.startswith('attr_')}
+            return cls(data['skills'].tolist(), data['offsets'], data['postings'],
+                       ids=data['ids'] if 'ids' in data.files else None,
+                       salary=data['salary'], attrs=attrs)
+
+    def postings_of(self, skill: str) -> np.ndarray:
+        i = self._positions.get(skill)
+        if i is None:
+            return np.empty(0, dtype=np.int32)
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def rows(self, all_of=(), any_of=(), none_of=(), within=None) -> np.ndarray:
+        """Позиции вакансий со всеми навыками all_of, хотя бы одним из any_of и без none_of.
+
+        within - отсортированные позиции, которыми ограничивается ответ (например, результат where).
+        Пересечение начинается с самого короткого списка, остальные проверяются бинарным поиском.
+        """
+        lists = sorted((self.postings_of(skill) for skill in all_of), key=len)
+        if any_of:
+            lists.append(np.unique(np.concatenate([self.postings_of(skill) for skill in any_of])))
+        if within is not None:
+            lists.append(np.asarray(within))
+        if not lists:
+            result = np.arange(self.n_docs, dtype=np.int32)
+        else:
+            lists.sort(key=len)
+            result = lists[0]
+            for other in lists[1:]:
+                if len(result) == 0:
+                    break
+                result = result[_member(result, other)]
+        for skill in none_of:
+            if len(result) == 0:
+                break
+            result = result[~_member(result, self.postings_of(skill))]
+        return result
+
+    def where(self, **attrs) -> np.ndarray:
+        """Позиции вакансий с заданными значениями атрибутов (значение или список значений)"""
+        mask = np.ones(self.n_docs, dtype=bool)
+        for name, value in attrs.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= np.isin(self.attrs[name], [str(v) for v in values])
+        return np.flatnonzero(mask).astype(np.int32)
+
+    def counts(self, rows=None) -> np.ndarray:
+        """Число вакансий с каждым навыком (по всем или по позициям rows)"""
+        if rows is None:
+            return np.diff(self.offsets)
+        mask = np.zeros(self.n_docs, dtype=bool)
+        mask[rows] = True
+        return np.bincount(self._skill_of[mask[self.postings]], minlength=len(self.skills))
+
+    def top(self, n: int = 10, rows=None) -> pd.Series:
+        """Самые востребованные навыки: навык -> число вакансий; при равенстве - по первому появлению"""
+        counts = self.counts(rows)
+        order = np.argsort(-counts, kind='stable')[:n]
+        order = order[counts[order] > 0]
+        return pd.Series(counts[order], index=[self.skills[i] for i in order], dtype=np.int64)
+
+    def counts_by_group(self, labels) -> pd.DataFrame:
+        """Число вакансий с навыком в каждой группе: group, skill, count.
+
+        labels - номер группы для каждой вакансии (-1 - не учитывать). Строки идут по группам,
+        внутри группы - в порядке первого появления навыка (по позиции вакансии, затем по названию),
+        поэтому результаты по частям данных склеиваются в тот же порядок, что и по всем сразу.
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        group = labels[self.postings]
+        valid = group >= 0
+        frame = pd.DataFrame({'group': group[valid], 'skill': self._skill_of[valid], 'row': self.postings[valid]})
+        counts = frame.groupby(['group', 'skill'], sort=False).agg(count=('row', 'size'), first=('row', 'min'))
+        counts = counts.reset_index()
+        counts['skill'] = np.asarray(self.skills, dtype=object)[counts['skill'].to_numpy()] if len(counts) else []
+        counts = counts.sort_values(['group', 'first', 'skill'], kind='stable')
+        return counts[['group', 'skill', 'count']].reset_index(drop=True)
+
+    def cooccurrence(self, skills=None, top: int = 15, rows=None) -> pd.DataFrame:
+        """Матрица совместной встречаемости: число вакансий, где есть оба навыка (на диагонали - каждый)"""
+        skills = list(skills) if skills is not None else self.top(top, rows).index.tolist()
+        lists = [self.postings_of(skill) for skill in skills]
+        if rows is not None:
+            rows = np.sort(np.asarray(rows))
+            lists = [p[_member(p, rows)] for p in lists]
+        matrix = np.zeros((len(skills), len(skills)), dtype=np.int64)
+        for i, a in enumerate(lists):
+            matrix[i, i] = len(a)
+            for j in range(i + 1, len(lists)):
+                b = lists[j]
+                small, large = (a, b) if len(a) <= len(b) else (b, a)
+                matrix[i, j] = matrix[j, i] = int(_member(small, large).sum())
+        return pd.DataFrame(matrix, index=skills, columns=skills)
+
+    def salary_stats(self, rows=None) -> VacancyStats:
+        salary = self.salary if rows is None else self.salary[rows]
+        paid = salary[~np.isnan(salary)]
+        p25 = median = p75 = mean = None
+        if len(paid):
+            p25, median, p75 = (float(v) for v in np.percentile(paid, [25, 50, 75]))
+            mean = float(paid.mean())
+        return VacancyStats(
+            vacancies=len(salary),
+            with_salary=len(paid),
+            salary_mean=mean,
+            salary_median=median,
+            salary_p25=p25,
+            salary_p75=p75
+        )
+
+    def salary_by_skill(self, top: int = 20, rows=None) -> pd.DataFrame:
+        """Число вакансий и медианная зарплата для самых востребованных навыков"""
+        records = {}
+        for skill in self.top(top, rows).index:
+            stats = self.salary_stats(self.rows(all_of=[skill], within=rows))
+            records[skill] = {'vacancies': stats.vacancies, 'with_salary': stats.with_salary,
+                              'salary_median': stats.salary_median}
+        return pd.DataFrame.from_dict(records, orient='index', columns=['vacancies', 'with_salary', 'salary_median'])
+
+    def vocabulary(self, top: int = None, min_count: int = 1, rows=None) -> list:
+        """Навыки по убыванию спроса, встречающиеся хотя бы в min_count вакансиях"""
+        counts = self.top(len(self.skills) if top is None else top, rows)
+        return counts[counts >= min_count].index.tolist()
+
+    def matrix(self, vocabulary=None, dtype=np.float32) -> sp.csr_matrix:
+        """Multi-hot матрица вакансии x навыки словаря (по умолчанию - все навыки индекса).
+
+        Индекс хранит ту же матрицу по столбцам, поэтому она собирается без прохода по спискам;
+        навыки словаря, которых нет в индексе, дают пустые столбцы.
+        """
+        vocabulary = self.skills if vocabulary is None else list(vocabulary)
+        lists = [self.postings_of(skill) for skill in vocabulary]
+        indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in lists], out=indptr[1:])
+        indices = np.concatenate(lists) if lists else np.empty(0, dtype=np.int32)
+        data = np.ones(len(indices), dtype=dtype)
+        return sp.csc_matrix((data, indices, indptr), shape=(self.n_docs, len(vocabulary))).tocsr()
+
+    def subset(self, rows) -> "SkillIndex":
+        """Индекс по части вакансий; позиция i нового индекса - вакансия rows[i]"""
+        rows = np.asarray(rows, dtype=np.int64)
+        lookup = np.full(self.n_docs, -1, dtype=np.int64)
+        lookup[rows] = np.arange(len(rows))
+        new_rows = lookup[self.postings]
+        valid = new_rows >= 0
+        skill_of, new_rows = self._skill_of[valid], new_rows[valid]
+        order = np.lexsort((new_rows, skill_of))
+        offsets = np.searchsorted(skill_of[order], np.arange(len(self.skills) + 1))
+        return SkillIndex(self.skills, offsets, new_rows[order],
+                          ids=self.ids[rows] if self.ids is not None else None,
+                          salary=self.salary[rows],
+                          attrs={name: values[rows] for name, values in self.attrs.items()})
+
+    def align(self, ids):
+        """Индекс в порядке ids (строк таблицы из хранилища); None, если id нет в индексе или они повторяются"""
+        if self.ids is None:
+            return None
+        index = pd.Index(self.ids)
+        if not index.is_unique:
+            return None
+        rows = index.get_indexer(pd.Index(ids).astype(str))
+        if (rows < 0).any() or len(np.unique(rows)) != len(rows):
+            return None
+        return self.subset(rows)
+
+
+def save_skill_index(index: SkillIndex, store_dir: str = DEFAULT_STORE_DIR, months=None):
+    """Сохраняет индекс по месяцам публикации; при months перезаписываются только эти месяцы"""
+    directory = os.path.join(store_dir, SKILL_INDEX_DIR)
+    os.makedirs(directory, exist_ok=True)
+    if months is None:
+        for name in os.listdir(directory):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(directory, name))
+        months = set(index.attrs[PARTITION_COLUMN])
+
+    for month in set(months):
+        path = os.path.join(directory, f"{month}.npz")
+        rows = index.where(**{PARTITION_COLUMN: month})
+        if len(rows) == 0:
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+        tmp_path = os.path.join(directory, f"{month}.tmp.npz")
+        index.subset(rows).save(tmp_path)
+        os.replace(tmp_path, path)
+
+    saved = sorted(name[:-4] for name in os.listdir(directory)
+                   if name.endswith('.npz') and not name.endswith('.tmp.npz'))
+    with open(os.path.join(directory, SKILL_INDEX_META), 'w', encoding='utf-8') as f:
+        json.dump({'months': saved}, f)
+    logger.info(f"Индекс навыков сохранен: {len(saved)} месяцев в {directory}")
+
+
+def skill_index_for(df: pd.DataFrame, stored: SkillIndex = None) -> SkillIndex:
+    """Индекс навыков строк df: сохраненный при очистке stored, выровненный по id,
+    или - для данных из CSV и строк, которых нет в индексе, - построенный по skills_list"""
+    if stored is not None and 'id' in df.columns:
+        aligned = stored.align(df['id'])
+        if aligned is not None:
+            return aligned
+    return SkillIndex.from_lists(df['skills_list'] if 'skills_list' in df.columns else [[]] * len(df))
+
+
+def load_skill_index(store_dir: str = DEFAULT_STORE_DIR):
+    directory = os.path.join(store_dir, SKILL_INDEX_DIR)
+    meta_path = os.path.join(directory, SKILL_INDEX_META)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        months = json.load(f)['months']
+    return SkillIndex.concat([SkillIndex.load(os.path.join(directory, f"{month}.npz")) for month in months])
+
+
+def refresh_skill_index(store_dir: str, index: SkillIndex, months):
+    """Перестраивает индекс перезаписанных месяцев; без сохраненного индекса строит его по всему хранилищу"""
+    if not os.path.exists(os.path.join(store_dir, SKILL_INDEX_DIR, SKILL_INDEX_META)):
+        if store_exists(store_dir):
+            index = SkillIndex.from_frame(load_cleaned_dataset(store_dir, columns=SOURCE_COLUMNS))
+        save_skill_index(index, store_dir)
+    else:
+        save_skill_index(index, store_dir, months=months)
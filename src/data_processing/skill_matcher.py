@@ -0,0 +1,200 @@
+from functools import lru_cache
+
+SKILL_KEYWORDS = {
+    'SQL': ['sql', 'SQL', 'баз данных', 'запросы', 'postgresql', 'mysql', 'microsoft sql', 'ms sql', ' tsql ',
+            'pl/sql', 'no sql'],
+    'Python': ['python', 'питон', 'pandas', 'numpy', 'scikit-learn', 'scikit', 'sklearn', 'matplotlib',
+               'seaborn', 'jupyter'],
+    'R': [' r ', 'r язык', 'r,', 'r.', 'rstudio', 'shiny', 'tidyverse'],
+
+    'PostgreSQL': ['postgresql', 'postgres'],
+    'MySQL': ['mysql'],
+    'MongoDB': ['mongodb', 'mongo'],
+    'ClickHouse': ['clickhouse'],
+    'Greenplum': ['greenplum'],
+    'Oracle': ['oracle database', 'oracle db'],
+    'MS SQL Server': ['microsoft sql server', 'mssql', 'sql server'],
+    'SQLite': ['sqlite'],
+    'Redis': ['redis'],
+    'Cassandra': ['cassandra'],
+
+    'Power BI': ['power bi', 'powerbi', 'power bi,', 'power bi.', 'microsoft power bi'],
+    'Tableau': ['tableau'],
+    'DataLens': ['datalens', 'yandex datalens'],
+    'Qlik': ['qlik', 'qlikview', 'qliksense'],
+    'Looker': ['looker'],
+    'Metabase': ['metabase'],
+    'Superset': ['superset', 'apache superset'],
+    'Redash': ['redash'],
+
+    'Apache Airflow': ['airflow', 'apache airflow'],
+    'dbt': ['dbt', 'data build tool'],
+    'Apache Spark': ['spark', 'apache spark', 'pyspark', 'spark sql'],
+    'Hadoop': ['hadoop', 'hdfs', 'mapreduce'],
+    'Kafka': ['kafka', 'apache kafka'],
+    'Apache NiFi': ['nifi', 'apache nifi'],
+
+    'AWS': ['aws', 'amazon web services', ' s3 ', 'redshift', 'athena', 'glue', 'quicksight'],
+    'Google Cloud': ['gcp', 'google cloud', 'bigquery', 'looker studio', 'data studio'],
+    'Azure': ['azure', 'microsoft azure', 'synapse', 'azure data factory'],
+    'Yandex Cloud': ['yandex cloud', 'yandex.cloud'],
+
+    'Excel': ['excel', 'ms excel', 'microsoft excel', 'таблиц', 'формул', 'vlookup', 'сводные таблицы',
+              'макросы'],
+    'Google Sheets': ['google sheets', 'google таблиц'],
+    'PowerPoint': ['powerpoint', 'презентац', 'слайд'],
+    'Google Slides': ['google slides'],
+
+    'Статистика': ['статистик', 'a/b тест', 'математик', 'вероятност', 'дисперсия', 'регрессия', 'корреляция'],
+    'Машинное обучение': ['машинн', 'ml', 'machine learning', 'нейронные сети', 'классификация',
+                          'кластеризация'],
+    'Прогнозное моделирование': ['прогноз', 'forecast', 'временные ряды', 'time series'],
+    'A/B тестирование': ['a/b тест', 'ab тест', 'сплит тест'],
+    'Построение дашбордов': ['дашборд', 'dashboard', 'панель', 'мониторинг'],
+
+    'Git': ['git', 'github', 'gitlab', 'bitbucket'],
+    'Docker': ['docker', 'контейнер'],
+    'Linux': ['linux', 'unix', 'bash', 'shell'],
+    'Jira': ['jira', 'confluence'],
+
+    'Java': ['java'],
+    'Scala': ['scala'],
+    'JavaScript': ['javascript', ' js ', 'node.js', 'nodejs'],
+    'TypeScript': ['typescript', ' ts '],
+    'C++': ['c++', 'с++'],
+    'C#': ['c#', 'c sharp'],
+
+    'SAS': ['sas'],
+    'SPSS': ['spss'],
+    'MATLAB': ['matlab'],
+    'KNIME': ['knime'],
+    'Alteryx': ['alteryx'],
+
+    'Аналитическое мышление': ['аналитическ', 'логическ', 'критическ мышлен'],
+    'Коммуникация': ['коммуникац', 'общен', 'презентац', 'переговоры'],
+    'Управление проектами': ['управлен проект', 'project management', 'agile', 'scrum', 'kanban'],
+    'Работа в команде': ['команд', 'teamwork', 'коллектив'],
+    'Решение проблем': ['решен проблем', 'problem solving'],
+
+    'Финансовая аналитика': ['финанс', 'бухгалтер', 'экономическ', 'kpi', 'roi', 'cac', 'ltv'],
+    'Маркетинговая аналитика': ['маркетинг', 'конверсия', 'трафик', 'cpc', 'cpm', 'ctr'],
+    'Продуктовая аналитика': ['продукт', 'юнит-экономика', 'retention', 'churn'],
+    'Веб-аналитика': ['веб-аналитик', 'google analytics', ' ga ', 'yandex metrika', 'метрика'],
+    'Мобильная аналитика': ['mobile analytics', 'appsflyer', 'adjust', 'firebase'],
+
+    'API': ['api', 'rest api', 'graphql'],
+    'JSON': ['json'],
+    'XML': ['xml'],
+    'CSV': ['csv'],
+    'Excel VBA': ['vba', 'excel vba', 'макросы'],
+    'Power Query': ['power query', 'powerquery'],
+    'DAX': ['dax'],
+    'MDX': ['mdx'],
+}
+
+
+def _edge_boundary(keyword: str, core: str, from_end: bool, short_token_len: int) -> bool:
+    if (keyword[-1] if from_end else keyword[0]).isspace():
+        return True
+
+    chars = reversed(core) if from_end else iter(core)
+    run = 0
+    for ch in chars:
+        if not ch.isalnum():
+            break
+        run += 1
+    # короткие токены (r, ml, git, dbt) ищем только как отдельные слова
+    return 0 < run <= short_token_len
+
+
+class SkillMatcher:
+    """Автомат Ахо-Корасик по ключевым словам навыков: один проход по тексту находит все навыки"""
+
+    def __init__(self, skill_keywords: dict = SKILL_KEYWORDS, short_token_len: int = 3):
+        self.skills = list(skill_keywords)
+
+        patterns = {}
+        for skill_id, keywords in enumerate(skill_keywords.values()):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                core = keyword.strip()
+                if not core:
+                    continue
+                left = _edge_boundary(keyword, core, False, short_token_len)
+                right = _edge_boundary(keyword, core, True, short_token_len)
+                patterns.setdefault((core, left, right), set()).add(skill_id)
+
+        self._build(patterns)
+
+    def _build(self, patterns: dict):
+        goto = [{}]
+        out = [[]]
+
+        for (core, left, right), skill_ids in patterns.items():
+            state = 0
+            for ch in core:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append((len(core), left, right, frozenset(skill_ids)))
+
+        # переходы по неудаче (BFS) и полная таблица переходов автомата
+        fail = [0] * len(goto)
+        delta = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = list(goto[0].values())
+
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+
+            out[state] = out[state] + out[fail[state]]
+            transitions = dict(delta[fail[state]])
+            transitions.update(goto[state])
+            delta[state] = transitions
+
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    def find_ids(self, text) -> set:
+        if not isinstance(text, str) or not text:
+            return set()
+
+        text = text.lower()
+        last = len(text) - 1
+        delta = self._delta
+        out = self._out
+        found = set()
+        state = 0
+
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for length, left, right, skill_ids in out[state]:
+                    if left and i >= length and text[i - length].isalnum():
+                        continue
+                    if right and i < last and text[i + 1].isalnum():
+                        continue
+                    found |= skill_ids
+
+        return found
+
+    def find(self, text) -> list:
+        return [self.skills[i] for i in sorted(self.find_ids(text))]
+
+    def find_many(self, texts) -> list:
+        return [self.find(text) for text in texts]
+
+
+@lru_cache(maxsize=1)
+def get_skill_matcher() -> SkillMatcher:
+    return SkillMatcher()
@@ -0,0 +1,202 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.path.join('data', 'processed', 'cleaned_vacancies')
+PARTITION_COLUMN = 'published_year_month'
+
+# колонки с небольшим числом уникальных значений хранятся со словарным кодированием
+CATEGORICAL_COLUMNS = [
+    'salary_currency',
+    'experience_id', 'experience_name',
+    'area_id', 'area_name',
+    'type_id', 'type_name',
+    'schedule_id', 'schedule_name',
+    'employment_id', 'employment_name',
+    'main_role_id', 'main_role_name',
+    'work_format_id', 'work_format_name',
+    'working_hours_name', 'work_schedule_name',
+    'employment_form_id', 'employment_form_name',
+]
+
+LIST_COLUMNS = ['skills_list']
+
+INDEX_FILE = '_index.parquet'
+
+# поля, которые меняются от выдачи к выдаче и не означают изменения вакансии
+VOLATILE_FIELDS = {
+    'sort_point_distance', 'relations', 'show_logo_in_search', 'is_adv_vacancy',
+    'adv_context', 'adv_response_url', 'branding', 'brand_snippet'
+}
+
+
+def store_exists(store_dir: str = DEFAULT_STORE_DIR) -> bool:
+    if not os.path.isdir(store_dir):
+        return False
+    for _, _, files in os.walk(store_dir):
+        if any(f.endswith('.parquet') for f in files):
+            return True
+    return False
+
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    df = df.copy()
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('string').astype('category')
+
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = [list(x) if isinstance(x, (list, tuple)) else [] for x in df[column]]
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # пустые колонки сохраняем строковыми, чтобы схемы партиций совпадали
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+
+    return table
+
+
+def save_cleaned_dataset(df: pd.DataFrame, store_dir: str = DEFAULT_STORE_DIR,
+                         partition_col: str = PARTITION_COLUMN) -> str:
+    """Сохраняет очищенные вакансии в Parquet с разбиением по месяцу публикации"""
+    os.makedirs(store_dir, exist_ok=True)
+    table = _to_table(df)
+
+    # месяцы из новой выгрузки перезаписываются целиком, остальные не трогаем
+    pq.write_to_dataset(
+        table,
+        root_path=store_dir,
+        partition_cols=[partition_col],
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet'
+    )
+    logger.info(f"Сохранено {len(df)} вакансий в {store_dir}")
+    return store_dir
+
+
+def _open_dataset(store_dir: str) -> ds.Dataset:
+    """Датасет хранилища со схемой, объединенной по всем партициям.
+
+    Без явной схемы pyarrow берет ее из первого файла, и колонки, появившиеся в более поздних
+    месяцах (например, duplicate_count), молча пропадают; в старых партициях они читаются как null.
+    """
+    dataset = ds.dataset(store_dir, format='parquet', partitioning='hive')
+    schemas = [dataset.schema] + [fragment.physical_schema for fragment in dataset.get_fragments()]
+    # permissive: int64 и double в разных месяцах сводятся к double, индексы словарей - к более широким
+    schema = pa.unify_schemas(schemas, promote_options='permissive')
+    return ds.dataset(store_dir, format='parquet', partitioning='hive', schema=schema)
+
+
+def load_cleaned_dataset(store_dir: str = DEFAULT_STORE_DIR, columns: list = None,
+                         filters=None) -> pd.DataFrame:
+    """Читает очищенные вакансии, загружая только нужные колонки"""
+    dataset = _open_dataset(store_dir)
+
+    if columns is not None:
+        available = set(dataset.schema.names)
+        missing = [c for c in columns if c not in available]
+        if missing:
+            logger.warning(f"В хранилище нет колонок: {missing}")
+        columns = [c for c in columns if c in available]
+
+    table = dataset.to_table(columns=columns, filter=filters)
+
+    list_columns = [c for c in LIST_COLUMNS if c in table.column_names]
+    df = table.drop(list_columns).to_pandas()
+    for column in list_columns:
+        df[column] = table.column(column).to_pylist()
+
+    if columns is not None:
+        df = df[columns]
+
+    return df
+
+
+def load_partitions(store_dir: str, months, partition_col: str = PARTITION_COLUMN) -> pd.DataFrame:
+    months = sorted(set(months))
+    if not months or not store_exists(store_dir):
+        return pd.DataFrame()
+    return load_cleaned_dataset(store_dir, filters=ds.field(partition_col).isin(months))
+
+
+def drop_partition(store_dir: str, month: str, partition_col: str = PARTITION_COLUMN):
+    path = os.path.join(store_dir, f"{partition_col}={month}")
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+
+def content_hash(record: dict) -> str:
+    """Хэш содержимого вакансии без служебных полей выдачи"""
+    payload = {k: v for k, v in record.items() if k not in VOLATILE_FIELDS}
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def load_index(store_dir: str = DEFAULT_STORE_DIR) -> pd.DataFrame:
+    """Индекс уже очищенных вакансий: id, content_hash и месяц партиции"""
+    path = os.path.join(store_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return pd.DataFrame({'id': pd.Series(dtype=str),
+                             'content_hash': pd.Series(dtype=str),
+                             PARTITION_COLUMN: pd.Series(dtype=str)})
+    return pq.read_table(path).to_pandas()
+
+
+def save_index(index: pd.DataFrame, store_dir: str = DEFAULT_STORE_DIR):
+    os.makedirs(store_dir, exist_ok=True)
+    table = pa.Table.from_pandas(index.reset_index(drop=True), preserve_index=False)
+    pq.write_table(table, os.path.join(store_dir, INDEX_FILE))
+
+
+def count_cleaned_rows(store_dir: str = DEFAULT_STORE_DIR) -> int:
+    """Число строк по метаданным Parquet, без чтения данных"""
+    return ds.dataset(store_dir, format='parquet', partitioning='hive').count_rows()
+
+
+def iter_cleaned_batches(store_dir: str = DEFAULT_STORE_DIR, columns: list = None,
+                         batch_size: int = 50000, filters=None):
+    """Потоково читает очищенные вакансии чанками по batch_size строк"""
+    dataset = _open_dataset(store_dir)
+    if columns is not None:
+        available = set(dataset.schema.names)
+        columns = [c for c in columns if c in available]
+
+    for batch in dataset.to_batches(columns=columns, filter=filters, batch_size=batch_size):
+        if batch.num_rows == 0:
+            continue
+        table = pa.Table.from_batches([batch])
+        list_columns = [c for c in LIST_COLUMNS if c in table.column_names]
+        df = table.drop(list_columns).to_pandas()
+        for column in list_columns:
+            df[column] = table.column(column).to_pylist()
+        yield df[[c for c in columns if c in df.columns]] if columns is not None else df
+
+
+def store_fingerprint(store_dir: str = DEFAULT_STORE_DIR) -> str:
+    """Отпечаток версии хранилища по путям, размерам и времени изменения файлов партиций"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for root, _, files in sorted(os.walk(store_dir)):
+        relroot = os.path.relpath(root, store_dir)
+        # служебные файлы и каталоги ('_index.parquet', '_rollups') не относятся к данным
+        if any(part.startswith('_') for part in relroot.split(os.sep)):
+            continue
+        for name in sorted(files):
+            if not name.endswith('.parquet') or name.startswith('_'):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            hasher.update(f"{os.path.relpath(path, store_dir)}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    return hasher.hexdigest()
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import pandas as pd
 
 @dataclass
@@ -16,6 +16,15 @@ class AggregationStats:
     total_vacancies: int
     yearly_change: str
 
+@dataclass
+class VacancyStats:
+    vacancies: int
+    with_salary: int
+    salary_mean: Optional[float]
+    salary_median: Optional[float]
+    salary_p25: Optional[float]
+    salary_p75: Optional[float]
+
 @dataclass
 class AggregationCharts:
     trend_chart: pd.DataFrame
@@ -52,4 +61,6 @@ class ClusteringResult:
     method_name: str
     n_clusters: int
     silhouette_score: float
-    clusters: List[ClusterEntity]
\ No newline at end of file
+    clusters: List[ClusterEntity]
+    # время обучения и оценки для каждого k, сек
+    k_timings: Dict[int, float] = field(default_factory=dict)
\ No newline at end of file
@@ -0,0 +1,172 @@
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.domain.models import HomeStats, AggregationStats, AggregationCharts
+from src.data_processing.rollups import (SALARY_BIN, SOURCE_COLUMNS, Rollups, build_rollups, load_rollups,
+                                         save_rollups)
+from src.data_processing.store import DEFAULT_STORE_DIR, PARTITION_COLUMN, load_cleaned_dataset, store_exists
+from src.services.query_engine import QueryEngine
+from src.utils.data_loader import load_vacancies_data
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_DAYS = 30
+
+
+def format_salary(value) -> str:
+    if value is None or pd.isna(value):
+        return "—"
+    return f"{int(round(value)):,}".replace(",", " ") + " ₽"
+
+
+def _mean_salary(groups: pd.DataFrame):
+    with_salary = groups['with_salary'].sum()
+    return groups['salary_sum'].sum() / with_salary if with_salary else None
+
+
+def _percent_change(current, previous) -> str:
+    if current is None or previous is None or not previous:
+        return "—"
+    return f"{(current / previous - 1) * 100:+.0f}%"
+
+
+def histogram_quantile(hist: pd.DataFrame, q: float) -> float:
+    """Квантиль по гистограмме salary_bin -> vacancies с линейной интерполяцией внутри корзины"""
+    counts = hist.groupby('salary_bin')['vacancies'].sum().sort_index()
+    total = counts.sum()
+    if total == 0:
+        return np.nan
+    cumulative = counts.cumsum().to_numpy()
+    target = q * total
+    pos = int(np.searchsorted(cumulative, target, side='left'))
+    before = cumulative[pos - 1] if pos > 0 else 0
+    return float(counts.index[pos] + SALARY_BIN * (target - before) / counts.iloc[pos])
+
+
+class AggregationService:
+    """Показатели дашборда по предагрегированным вакансиям.
+
+    Без фильтров ответы считаются по таблицам Rollups (группы месяц x опыт x регион x роль),
+    поэтому их стоимость зависит от числа групп, а не от числа вакансий. Запросы с фильтрами
+    (регион, период, опыт, работодатель) выполняет QueryEngine по отсортированным индексам.
+    """
+
+    def __init__(self, rollups: Rollups, engine: QueryEngine = None):
+        self.rollups = rollups
+        self.engine = engine
+
+    @classmethod
+    def open(cls, store_dir: str = DEFAULT_STORE_DIR, engine: bool = False) -> "AggregationService":
+        """Читает агрегаты хранилища; если их еще нет, строит по очищенным данным.
+
+        С engine=True дополнительно поднимает QueryEngine для запросов с фильтрами.
+        """
+        rollups = load_rollups(store_dir)
+        if rollups is None and store_exists(store_dir):
+            rollups = build_rollups(load_cleaned_dataset(store_dir, columns=SOURCE_COLUMNS))
+            try:
+                save_rollups(rollups, store_dir)
+            except OSError as e:
+                logger.warning(f"Не удалось сохранить агрегаты в {store_dir}: {e}")
+        elif rollups is None:
+            rollups = build_rollups(load_vacancies_data(columns=SOURCE_COLUMNS))
+        return cls(rollups, QueryEngine.open(store_dir) if engine else None)
+
+    def _filtered(self, filters: dict) -> dict:
+        """Непустые фильтры, если их есть кому выполнить; без движка запросов фильтры не применяются"""
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        return filters if self.engine is not None else {}
+
+    def _monthly(self) -> pd.DataFrame:
+        monthly = self.rollups.groups.groupby(PARTITION_COLUMN)[['vacancies', 'with_salary', 'salary_sum']].sum()
+        return monthly.sort_index()
+
+    def get_home_statistics(self) -> HomeStats:
+        groups = self.rollups.groups
+        with_salary = int(groups['with_salary'].sum())
+        avg_salary = groups['salary_sum'].sum() / with_salary if with_salary else 0
+
+        daily = self.rollups.daily
+        since = (datetime.now() - timedelta(days=ACTIVE_DAYS)).strftime('%Y-%m-%d')
+        active = int(daily.loc[daily['published_date'] >= since, 'vacancies'].sum())
+
+        built_at = self.rollups.built_at
+        last_updated = datetime.fromisoformat(built_at) if built_at else datetime.now()
+        return HomeStats(
+            total_vacancies=int(groups['vacancies'].sum()),
+            with_salary=with_salary,
+            avg_salary=int(round(avg_salary)),
+            active_vacancies=active,
+            last_updated=last_updated.strftime('%d.%m.%Y')
+        )
+
+    def get_aggregation_stats(self, filters: dict = None) -> AggregationStats:
+        filters = self._filtered(filters)
+        if filters:
+            stats = self.engine.stats(filters)
+            return AggregationStats(
+                avg_salary=format_salary(stats.salary_mean),
+                total_vacancies=stats.vacancies,
+                yearly_change=self._filtered_yearly_change(filters)
+            )
+
+        groups = self.rollups.groups
+        with_salary = groups['with_salary'].sum()
+        avg_salary = groups['salary_sum'].sum() / with_salary if with_salary else None
+        return AggregationStats(
+            avg_salary=format_salary(avg_salary),
+            total_vacancies=int(groups['vacancies'].sum()),
+            yearly_change=self._yearly_change()
+        )
+
+    def _yearly_change(self) -> str:
+        """Изменение средней зарплаты за последние 12 месяцев относительно предыдущих 12"""
+        monthly = self._monthly()
+        months = pd.PeriodIndex([m for m in monthly.index if m[:4].isdigit()], freq='M')
+        if len(months) == 0:
+            return "—"
+        monthly = monthly.loc[months.strftime('%Y-%m')]
+        last = months.max()
+        current = monthly[months > last - 12]
+        previous = monthly[(months <= last - 12) & (months > last - 24)]
+        return _percent_change(_mean_salary(current), _mean_salary(previous))
+
+    def _filtered_yearly_change(self, filters: dict) -> str:
+        # период из фильтров заменяется двумя годовыми окнами до последней публикации
+        last = self.engine.last_published
+        if last is None:
+            return "—"
+        base = {k: v for k, v in filters.items() if k not in ('published_from', 'published_to')}
+        end, year = last + pd.Timedelta(seconds=1), pd.Timedelta(days=365)
+        current = self.engine.stats({**base, 'published_from': end - year, 'published_to': end})
+        previous = self.engine.stats({**base, 'published_from': end - 2 * year, 'published_to': end - year})
+        return _percent_change(current.salary_mean, previous.salary_mean)
+
+    def get_aggregation_charts(self, top_skills: int = 10, filters: dict = None) -> AggregationCharts:
+        filters = self._filtered(filters)
+        if filters:
+            trend = self.engine.monthly_counts(filters, by='experience_id')
+        else:
+            trend = self.rollups.groups.pivot_table(index=PARTITION_COLUMN, columns='experience_name',
+                                                    values='vacancies', aggfunc='sum', fill_value=0).sort_index()
+            trend.columns.name = None
+
+        if filters:
+            skills = self.engine.top_skills(filters, top=top_skills)
+        else:
+            skills = self.rollups.skills.groupby('skill')['vacancies'].sum().nlargest(top_skills)
+        return AggregationCharts(
+            trend_chart=trend,
+            skills_chart=skills.to_frame("Вакансий")
+        )
+
+    def salary_summary(self, by: str) -> pd.DataFrame:
+        """Число вакансий, средняя и медианная зарплата в разрезе колонки групп by"""
+        summary = self.rollups.groups.groupby(by)[['vacancies', 'with_salary', 'salary_sum']].sum()
+        summary['salary_mean'] = summary['salary_sum'] / summary['with_salary'].replace(0, np.nan)
+        hist = self.rollups.salary_hist
+        summary['salary_median'] = pd.Series({key: histogram_quantile(part, 0.5) for key, part in hist.groupby(by)})
+        return summary.drop(columns='salary_sum').sort_values('vacancies', ascending=False)
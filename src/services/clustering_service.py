@@ -1,137 +1,239 @@
 import pandas as pd
 import numpy as np
-import gower
-import ast
-from collections import Counter
+import os
+import json
+import time
+import pickle
+import shutil
+import sqlite3
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from joblib import Parallel, delayed, dump, load
 from kmodes.kprototypes import KPrototypes
 from kmodes.kmodes import KModes
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.metrics import silhouette_score
 from sklearn.preprocessing import StandardScaler
 from src.domain.models import ClusterEntity, ClusteringResult
+from src.data_processing.skill_index import SkillIndex, load_skill_index, skill_index_for
+from src.data_processing.store import (DEFAULT_STORE_DIR, count_cleaned_rows, iter_cleaned_batches,
+                                       store_fingerprint)
+from src.services.distance import gower_prepare, gower_silhouette
+from src.services.feature_store import FeatureStore
+from src.utils.data_loader import simplify_job_name
+from src.utils.fingerprint import dataset_fingerprint
 
+logger = logging.getLogger(__name__)
 
-class ClusteringService:
-    def __init__(self, df: pd.DataFrame):
-        self.df = df
-        self.feature_map = {
-            "Зарплата": "salary_avg",
-            "Минимальный опыт": "min_experience_years",
-            "Название вакансии": "name",
-            "График работы": "schedule_name",
-            "Местность": "area_name"
-        }
+DEFAULT_RESULT_CACHE_PATH = os.path.join('data', 'cache', 'clustering_results.sqlite')
+# увеличивается при изменении ClusteringResult или алгоритма, чтобы не читать устаревшие записи
+RESULT_CACHE_VERSION = 2
 
-    def perform_clustering(self, selected_features: list, k_range: range) -> ClusteringResult:
-        if not selected_features:
-            raise ValueError("Не выбраны признаки")
+MINIBATCH_METHOD = "MiniBatch K-Means"
+NUMERIC_FEATURES = ['salary_avg', 'min_experience_years']
+# колонки, нужные для описания кластеров помимо признаков
+PROFILE_COLUMNS = ['name', 'salary_avg', 'schedule_name', 'skills_list']
+# вес one-hot: несовпадение категории дает квадрат расстояния 1, как одно стандартное отклонение числа
+ONEHOT_WEIGHT = 1 / np.sqrt(2)
 
-        target_cols = [self.feature_map[f] for f in selected_features]
-        num_cols = [c for c in target_cols if c in ['salary_avg', 'min_experience_years']]
-        cat_cols = [c for c in target_cols if c not in num_cols]
 
-        X = self.df[target_cols].dropna().copy()
+def stratified_sample(strata: np.ndarray, size: int, random_state: int = 42) -> np.ndarray:
+    """Индексы выборки размера ~size с пропорциональным представительством каждой страты"""
+    n = len(strata)
+    if size is None or n <= size:
+        return np.arange(n)
 
-        if X.empty:
-            raise ValueError("Нет данных после удаления пропусков")
+    rng = np.random.default_rng(random_state)
+    codes = pd.factorize(strata)[0]
+    counts = np.bincount(codes)
+    quota = np.minimum(counts, np.maximum(1, np.floor(counts * size / n).astype(int)))
 
-        X_proc = X.copy()
+    # перемешиваем, группируем по страте и берем первые quota элементов каждой группы
+    order = rng.permutation(n)
+    order = order[np.argsort(codes[order], kind="stable")]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(n) - starts[codes[order]]
+    return np.sort(order[rank < quota[codes[order]]])
 
-        if num_cols:
-            scaler = StandardScaler()
-            X_proc[num_cols] = scaler.fit_transform(X[num_cols])
 
-        if cat_cols:
-            X_proc[cat_cols] = X_proc[cat_cols].astype(str)
+class ResultCache:
+    """Кэш результатов кластеризации в SQLite, общий для сессий и перезапусков, с вытеснением LRU"""
 
-        if not cat_cols:
-            return self._run_kmeans(X, X_proc, num_cols, k_range)
-        elif not num_cols:
-            return self._run_kmodes(X, X_proc, cat_cols, k_range)
-        else:
-            return self._run_kprototypes(X, X_proc, num_cols, cat_cols, k_range)
-
-    def _run_kmeans(self, X_orig, X_proc, num_cols, k_range):
-        best_k, best_score = self._find_best_k(
-            k_range,
-            lambda k: KMeans(n_clusters=k, n_init=3, random_state=42),
-            X_proc,
-            metric='euclidean'
-        )
-        model = KMeans(n_clusters=best_k, n_init=10, random_state=42)
-        clusters = model.fit_predict(X_proc)
-        return self._build_result(X_orig, clusters, best_k, best_score, "K-Means", num_cols, [])
-
-    def _run_kmodes(self, X_orig, X_proc, cat_cols, k_range):
-        best_k, best_score = self._find_best_k(
-            k_range,
-            lambda k: KModes(n_clusters=k, init='Cao', n_init=1, verbose=0),
-            X_proc,
-            metric='hamming'
-        )
-        model = KModes(n_clusters=best_k, init='Cao', n_init=5, verbose=0)
-        clusters = model.fit_predict(X_proc)
-        return self._build_result(X_orig, clusters, best_k, best_score, "K-Modes", [], cat_cols)
-
-    def _run_kprototypes(self, X_orig, X_proc, num_cols, cat_cols, k_range):
-        cat_indices = [X_proc.columns.get_loc(c) for c in cat_cols]
-        dist_matrix = gower.gower_matrix(X_proc)
-
-        best_k, best_score = self._find_best_k(
-            k_range,
-            lambda k: KPrototypes(n_clusters=k, init='Cao', n_init=1, verbose=0, random_state=42),
-            X_proc.values,
-            metric='precomputed',
-            X_score=dist_matrix,
-            fit_params={'categorical': cat_indices}
-        )
+    def __init__(self, path: str = DEFAULT_RESULT_CACHE_PATH, max_entries: int = 200):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
 
-        final_model = KPrototypes(n_clusters=best_k, init='Cao', n_init=3, verbose=0, random_state=42)
-        clusters = final_model.fit_predict(X_proc.values, categorical=cat_indices)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
 
-        return self._build_result(X_orig, clusters, best_k, best_score, "K-Prototypes", num_cols, cat_cols)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at)")
+        self._conn.commit()
 
-    def _find_best_k(self, k_range, model_factory, X_train, metric, X_score=None, fit_params=None):
-        best_score = -1
-        best_k = k_range.start
-        if X_score is None: X_score = X_train
-        if fit_params is None: fit_params = {}
-
-        for k in k_range:
-            try:
-                model = model_factory(k)
-                labels = model.fit_predict(X_train, **fit_params)
-                if len(set(labels)) < 2 or len(set(labels)) >= len(labels): continue
-                score = silhouette_score(X_score, labels, metric=metric)
-                if score > best_score:
-                    best_score = score
-                    best_k = k
-            except Exception:
-                continue
-        return best_k, max(best_score, 0)
+    @staticmethod
+    def make_key(fingerprint: str, selected_features, k_range: range, algorithm: str, sample_size=None) -> str:
+        return json.dumps([RESULT_CACHE_VERSION, fingerprint, list(selected_features),
+                           [k_range.start, k_range.stop, k_range.step], algorithm, sample_size],
+                          ensure_ascii=False)
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        try:
+            return pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать результат из кэша: {e}")
+            return None
+
+    def put(self, key: str, result: ClusteringResult):
+        body = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, body, now, now))
+            self._conn.execute("""
+                DELETE FROM results WHERE key IN (
+                    SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _value_counts_by_cluster(frame: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Частоты значений column в каждом кластере по убыванию; равные - в порядке первого появления"""
+    counts = frame.groupby(['cluster', column], sort=False, observed=True).size().reset_index(name='count')
+    counts['order'] = np.arange(len(counts))
+    counts = counts.sort_values(['cluster', 'count', 'order'], ascending=[True, False, True], kind='stable')
+    return counts.drop(columns='order')
+
+
+class ClusterProfiler:
+    """Накапливает статистики кластеров по частям данных и собирает из них ClusterEntity.
+
+    update можно вызывать для каждого чанка: частоты и суммы складываются, а зарплаты
+    сохраняются целиком (одна колонка), чтобы медианы и квантили были точными.
+    """
+
+    def __init__(self, num_cols, cat_cols):
+        self.num_cols = list(num_cols)
+        self.cat_cols = list(cat_cols)
+        self._sizes = []
+        self._salaries = []
+        self._names = []
+        self._remote = []
+        self._skills = []
+        self._modes = {col: [] for col in self.cat_cols}
+        self._num_sums = []
+
+    def update(self, df: pd.DataFrame, labels, skills: SkillIndex = None):
+        """df - строки чанка, labels - их кластеры, skills - индекс навыков по строкам df (в том же порядке)"""
+        df = df.assign(cluster=np.asarray(labels))
+        grouped = df.groupby('cluster')
+        self._sizes.append(grouped.size())
 
+        salary = df[['cluster', 'salary_avg']].dropna()
+        self._salaries.append(salary)
 
-    def _build_result(self, X_orig, clusters, k, score, method_name, num_cols, cat_cols):
-        df_result = self.df.loc[X_orig.index].copy()
-        df_result['cluster'] = clusters
+        if 'name' in df.columns:
+            self._names.append(_value_counts_by_cluster(df, 'name'))
 
-        all_salaries = df_result['salary_avg'].dropna()
+        if 'schedule_name' in df.columns:
+            is_remote = df['schedule_name'].astype(str).str.contains('удален', case=False)
+            self._remote.append(is_remote.groupby(df['cluster']).sum())
+
+        if skills is not None:
+            counts = skills.counts_by_group(df['cluster'].to_numpy())
+            self._skills.append(counts.rename(columns={'group': 'cluster'}))
+
+        for col in self.cat_cols:
+            self._modes[col].append(df.groupby(['cluster', col], observed=True).size().reset_index(name='count'))
+
+        if self.num_cols:
+            self._num_sums.append(grouped[self.num_cols].agg(['sum', 'count']))
+
+    @staticmethod
+    def _merge_counts(parts, column):
+        # суммирование частот чанков с сохранением порядка первого появления значения
+        counts = pd.concat(parts, ignore_index=True)
+        counts = counts.groupby(['cluster', column], sort=False, observed=True)['count'].sum().reset_index()
+        counts['order'] = np.arange(len(counts))
+        counts = counts.sort_values(['cluster', 'count', 'order'], ascending=[True, False, True], kind='stable')
+        return counts.drop(columns='order')
+
+    def build(self, k, score, method_name) -> ClusteringResult:
+        cluster_ids = pd.RangeIndex(k)
+        counts = pd.concat(self._sizes).groupby(level=0).sum().reindex(cluster_ids, fill_value=0)
+
+        salaries = pd.concat(self._salaries)
+        all_salaries = salaries['salary_avg']
         q30 = all_salaries.quantile(0.3) if not all_salaries.empty else 0
         q70 = all_salaries.quantile(0.7) if not all_salaries.empty else 0
+        salary = salaries.groupby('cluster')['salary_avg'].agg(['mean', 'median']).reindex(cluster_ids)
+
+        titles = {}
+        if self._names:
+            names = self._merge_counts(self._names, 'name')
+            names = names[names['count'] / counts.reindex(names['cluster']).to_numpy() >= 0.30]
+            titles = names.groupby('cluster')['name'].agg(list).to_dict()
+
+        remote = pd.Series(0.0, index=cluster_ids)
+        if self._remote:
+            remote_count = pd.concat(self._remote).groupby(level=0).sum().reindex(cluster_ids, fill_value=0)
+            remote = (remote_count / counts.where(counts > 0) * 100).fillna(0.0)
+
+        top_skills = {}
+        if self._skills:
+            skill_counts = self._merge_counts(self._skills, 'skill')
+            top_skills = skill_counts.groupby('cluster').head(5).groupby('cluster')['skill'].agg(list).to_dict()
+
+        # мода: самое частое значение, при равенстве - наименьшее, как у Series.mode()
+        modes = {}
+        for col in self.cat_cols:
+            col_counts = pd.concat(self._modes[col], ignore_index=True)
+            col_counts = col_counts.groupby(['cluster', col], observed=True)['count'].sum().reset_index()
+            col_counts = col_counts.sort_values(['cluster', 'count', col], ascending=[True, False, True])
+            modes[col] = col_counts.drop_duplicates('cluster').set_index('cluster')[col].to_dict()
+
+        num_means = None
+        if self.num_cols:
+            sums = pd.concat(self._num_sums).groupby(level=0).sum().reindex(cluster_ids)
+            num_means = pd.DataFrame({col: sums[(col, 'sum')] / sums[(col, 'count')] for col in self.num_cols})
 
         cluster_entities = []
         for i in range(k):
-            cluster_data = df_result[df_result['cluster'] == i]
-            title_parts = []
-            if 'name' in cluster_data.columns:
-                total_count = len(cluster_data)
-                for name, count in cluster_data['name'].value_counts().items():
-                    if (count / total_count) >= 0.30:
-                        title_parts.append(name)
-
+            title_parts = titles.get(i, [])
             title_base = " / ".join(title_parts) if title_parts else f"Группа #{i + 1}"
 
-            cluster_median = cluster_data['salary_avg'].median()
+            cluster_median = salary.at[i, 'median']
             salary_tag = ""
             if pd.notnull(cluster_median) and q70 > 0:
                 if cluster_median > q70:
@@ -142,36 +244,16 @@ class ClusteringService:
                     salary_tag = "📉 Маленькая ЗП"
 
             final_title = f"{title_base} ({salary_tag})" if salary_tag else title_base
-            top_skills = []
-            if 'skills_list' in cluster_data.columns:
-                all_skills = []
-                for val in cluster_data['skills_list'].dropna():
-                    try:
-                        if isinstance(val, str):
-                            parsed = ast.literal_eval(val)
-                            if isinstance(parsed, list):
-                                all_skills.extend(parsed)
-                        elif isinstance(val, list):
-                            all_skills.extend(val)
-                    except:
-                        continue
-                if all_skills:
-                    top_skills = [skill for skill, count in Counter(all_skills).most_common(5)]
-            remote_percentage = 0.0
-            if 'schedule_name' in cluster_data.columns:
-                total_vacs = len(cluster_data)
-                if total_vacs > 0:
-                    remote_count = cluster_data['schedule_name'].astype(str).str.contains('удален', case=False).sum()
-                    remote_percentage = (remote_count / total_vacs) * 100
-            avg_sal = cluster_data['salary_avg'].mean()
+
+            avg_sal = salary.at[i, 'mean']
             avg_sal_str = f"{int(avg_sal):,} ₽".replace(",", " ") if pd.notnull(avg_sal) else "Не указана"
 
             desc_parts = []
-            for col in cat_cols:
-                if not cluster_data[col].mode().empty:
-                    desc_parts.append(str(cluster_data[col].mode()[0]))
-            for col in num_cols:
-                mean_val = cluster_data[col].mean()
+            for col in self.cat_cols:
+                if i in modes[col]:
+                    desc_parts.append(str(modes[col][i]))
+            for col in self.num_cols:
+                mean_val = num_means.at[i, col]
                 if col == 'min_experience_years':
                     desc_parts.append(f"Опыт ~{mean_val:.1f} г.")
 
@@ -181,10 +263,10 @@ class ClusteringService:
                 id=i + 1,
                 title=final_title,
                 description=description,
-                vacancies_count=len(cluster_data),
+                vacancies_count=int(counts.at[i]),
                 avg_salary=avg_sal_str,
-                skills=top_skills,
-                remote_rate=remote_percentage
+                skills=top_skills.get(i, []),
+                remote_rate=float(remote.at[i])
             )
             cluster_entities.append(entity)
 
@@ -193,4 +275,420 @@ class ClusteringService:
             n_clusters=k,
             silhouette_score=score,
             clusters=cluster_entities
-        )
\ No newline at end of file
+        )
+
+
+class ChunkEncoder:
+    """Одинаково кодирует чанки данных для mini-batch кластеризации.
+
+    Числа стандартизуются (среднее и дисперсия накапливаются по чанкам), категории
+    кодируются one-hot; значения за пределами max_categories самых частых попадают в общую колонку.
+    """
+
+    def __init__(self, num_cols, cat_cols, max_categories: int = 50):
+        self.num_cols = list(num_cols)
+        self.cat_cols = list(cat_cols)
+        self.max_categories = max_categories
+        self.scaler = StandardScaler() if self.num_cols else None
+        self.counts = {col: pd.Series(dtype=np.float64) for col in self.cat_cols}
+        self.categories = {}
+
+    def partial_fit(self, chunk: pd.DataFrame):
+        if self.scaler is not None:
+            self.scaler.partial_fit(chunk[self.num_cols].to_numpy(dtype=np.float64))
+        for col in self.cat_cols:
+            self.counts[col] = self.counts[col].add(chunk[col].astype(str).value_counts(), fill_value=0)
+        return self
+
+    def finalize(self):
+        for col in self.cat_cols:
+            top = self.counts[col].sort_values(ascending=False, kind='stable').index[:self.max_categories]
+            self.categories[col] = pd.Index(sorted(top))
+        return self
+
+    def transform(self, chunk: pd.DataFrame) -> np.ndarray:
+        parts = []
+        if self.scaler is not None:
+            parts.append(self.scaler.transform(chunk[self.num_cols].to_numpy(dtype=np.float64)))
+        for col in self.cat_cols:
+            categories = self.categories[col]
+            codes = categories.get_indexer(chunk[col].astype(str))
+            codes[codes < 0] = len(categories)
+            onehot = np.zeros((len(chunk), len(categories) + 1))
+            onehot[np.arange(len(chunk)), codes] = ONEHOT_WEIGHT
+            parts.append(onehot)
+        return np.hstack(parts)
+
+
+def _iter_minibatches(arrays, batch_size: int):
+    """Нарезает поток массивов на батчи ровно по batch_size строк (кроме последнего)"""
+    buffer, size = [], 0
+    for X in arrays:
+        start = 0
+        while start < len(X):
+            take = min(batch_size - size, len(X) - start)
+            buffer.append(X[start:start + take])
+            size += take
+            start += take
+            if size == batch_size:
+                yield np.vstack(buffer)
+                buffer, size = [], 0
+    if buffer:
+        yield np.vstack(buffer)
+
+
+def _make_model(method_name: str, k: int):
+    if method_name == "K-Means":
+        return KMeans(n_clusters=k, n_init=3, random_state=42)
+    if method_name == "K-Modes":
+        return KModes(n_clusters=k, init='Cao', n_init=1, verbose=0)
+    return KPrototypes(n_clusters=k, init='Cao', n_init=1, verbose=0, random_state=42)
+
+
+def _silhouette(method_name: str, score_data, labels) -> float:
+    if method_name == "K-Means":
+        return silhouette_score(score_data, labels, metric='euclidean')
+    if method_name == "K-Modes":
+        return silhouette_score(score_data, labels, metric='hamming')
+    num, cat = score_data
+    return gower_silhouette(num, cat, labels)
+
+
+def _evaluate_k(method_name, k, X_train, categorical, sample_idx, score_data):
+    """Обучает модель с k кластерами и считает силуэт по выборке: (k, метки, силуэт, секунды).
+
+    Функция модульного уровня, чтобы ее можно было запускать в процессах joblib.
+    """
+    start = time.perf_counter()
+    try:
+        model = _make_model(method_name, k)
+        if categorical:
+            labels = model.fit_predict(X_train, categorical=categorical)
+        else:
+            labels = model.fit_predict(X_train)
+    except Exception:
+        return k, None, None, time.perf_counter() - start
+
+    score = None
+    sample_labels = labels[sample_idx]
+    n_labels = len(np.unique(sample_labels))
+    if 2 <= n_labels < len(sample_labels):
+        try:
+            score = _silhouette(method_name, score_data, sample_labels)
+        except Exception:
+            score = None
+    return k, labels, score, time.perf_counter() - start
+
+
+class ClusteringService:
+    def __init__(self, df: pd.DataFrame, sample_size: int = 5000, cache_size: int = 32, n_jobs: int = 1,
+                 result_cache: ResultCache = None, store_dir: str = DEFAULT_STORE_DIR,
+                 chunk_size: int = 50000, batch_size: int = 2048, n_epochs: int = 3,
+                 feature_dir: str = None):
+        self.df = df
+        # силуэт считается по выборке из sample_size строк (None - по всем данным)
+        self.sample_size = sample_size
+        self.cache_size = cache_size
+        # n_jobs > 1 (или -1 - все ядра) - значения k перебираются параллельно в процессах
+        self.n_jobs = n_jobs
+        # result_cache хранит результаты на диске; _results - быстрый LRU в памяти процесса
+        self.result_cache = result_cache
+        # streaming-режим: MiniBatchKMeans по чанкам всего хранилища store_dir
+        self.store_dir = store_dir
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        # признаки готовятся один раз на версию датасета; feature_dir - где хранить их между запусками
+        self.feature_dir = feature_dir
+        self._features = None
+        self.fingerprint = dataset_fingerprint(df)
+        self._results = OrderedDict()
+        self._skills = None
+        self._stored_skills = None
+        self.feature_map = {
+            "Зарплата": "salary_avg",
+            "Минимальный опыт": "min_experience_years",
+            "Название вакансии": "name",
+            "График работы": "schedule_name",
+            "Местность": "area_name"
+        }
+
+    def _cache_key(self, selected_features: list, k_range: range, streaming: bool) -> str:
+        target_cols = [self.feature_map[f] for f in selected_features]
+        if streaming:
+            fingerprint, method_name = store_fingerprint(self.store_dir), MINIBATCH_METHOD
+        else:
+            fingerprint, method_name = self.fingerprint, self._method_name(target_cols)
+        return ResultCache.make_key(fingerprint, selected_features, k_range, method_name, self.sample_size)
+
+    def lookup(self, selected_features: list, k_range: range, streaming: bool = False):
+        """Готовый результат из кэша в памяти или на диске, без вычислений; None, если его нет"""
+        if not selected_features:
+            return None
+        key = self._cache_key(selected_features, k_range, streaming)
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key]
+
+        result = self.result_cache.get(key) if self.result_cache is not None else None
+        if result is not None:
+            self._remember(key, result)
+        return result
+
+    def _remember(self, key: str, result: ClusteringResult):
+        self._results[key] = result
+        if len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+
+    def perform_clustering(self, selected_features: list, k_range: range, streaming: bool = False,
+                           progress=None, check_cancel=None) -> ClusteringResult:
+        """Кластеризует вакансии, подбирая k по силуэту.
+
+        streaming=True обучает MiniBatchKMeans по чанкам всей истории из store_dir,
+        не загружая ее в память; результат имеет тот же вид ClusteringResult.
+        progress(k, seconds) вызывается после оценки каждого k; исключение из него прерывает расчет.
+        check_cancel() в потоковом режиме вызывается после каждого мини-батча, исключение из него
+        тоже прерывает расчет.
+        """
+        if not selected_features:
+            raise ValueError("Не выбраны признаки")
+
+        result = self.lookup(selected_features, k_range, streaming)
+        if result is not None:
+            return result
+
+        if streaming:
+            result = self._cluster_streaming(selected_features, k_range, progress, check_cancel)
+        else:
+            result = self._cluster(selected_features, k_range, progress)
+
+        key = self._cache_key(selected_features, k_range, streaming)
+        if self.result_cache is not None:
+            self.result_cache.put(key, result)
+        self._remember(key, result)
+        return result
+
+    @staticmethod
+    def _split_columns(target_cols):
+        num_cols = [c for c in target_cols if c in NUMERIC_FEATURES]
+        cat_cols = [c for c in target_cols if c not in num_cols]
+        return num_cols, cat_cols
+
+    def _method_name(self, target_cols) -> str:
+        num_cols, cat_cols = self._split_columns(target_cols)
+        if not cat_cols:
+            return "K-Means"
+        if not num_cols:
+            return "K-Modes"
+        return "K-Prototypes"
+
+    def _cluster(self, selected_features: list, k_range: range, progress=None) -> ClusteringResult:
+        target_cols = [self.feature_map[f] for f in selected_features]
+        num_cols, cat_cols = self._split_columns(target_cols)
+        method_name = self._method_name(target_cols)
+
+        features = self._feature_store()
+        rows = np.flatnonzero(features.valid_mask(target_cols))
+
+        if len(rows) == 0:
+            raise ValueError("Нет данных после удаления пропусков")
+
+        # категории уже закодированы числами в порядке сортировки строк (так же их упорядочивает kmodes),
+        # поэтому матрица чисто числовая и ее можно отдать процессам через memmap
+        dtype = np.int64 if method_name == "K-Modes" else np.float64
+        X_proc = pd.DataFrame(features.matrix(target_cols, rows, dtype=dtype), columns=target_cols)
+
+        sample_idx = stratified_sample(self._strata(X_proc, num_cols, cat_cols), self.sample_size)
+
+        X_train = X_proc.to_numpy()
+        if method_name in ("K-Means", "K-Modes"):
+            score_data, categorical = X_train[sample_idx], None
+        else:
+            categorical = [X_proc.columns.get_loc(c) for c in cat_cols]
+            # расстояния Гауэра считаются блоками в float32, полная матрица n x n не строится
+            num, cat = gower_prepare(X_proc, num_cols, cat_cols)
+            score_data = (num[sample_idx], cat[sample_idx])
+
+        best_k, best_score, clusters, k_timings = self._find_best_k(
+            method_name, k_range, X_train, categorical, sample_idx, score_data, progress
+        )
+
+        result = self._build_result(self.df.index[rows], clusters, best_k, best_score, method_name,
+                                    num_cols, cat_cols)
+        result.k_timings = k_timings
+        return result
+
+    def _iter_chunks(self, columns, target_cols):
+        for chunk in iter_cleaned_batches(self.store_dir, columns, batch_size=self.chunk_size):
+            # та же подготовка, что в load_vacancies_data
+            if 'name' in chunk.columns:
+                chunk['name'] = chunk['name'].map(simplify_job_name)
+            for col in chunk.columns:
+                if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                    chunk[col] = chunk[col].astype(object)
+            chunk = chunk.dropna(subset=target_cols)
+            if len(chunk):
+                yield chunk.reset_index(drop=True)
+
+    def _cluster_streaming(self, selected_features: list, k_range: range, progress=None,
+                           check_cancel=None) -> ClusteringResult:
+        target_cols = [self.feature_map[f] for f in selected_features]
+        num_cols, cat_cols = self._split_columns(target_cols)
+        columns = list(dict.fromkeys(target_cols + PROFILE_COLUMNS))
+        if self._stored_skill_index() is not None:
+            # навыки берутся из сохраненного индекса по id, списки навыков не читаются
+            columns = [c for c in columns if c != 'skills_list'] + ['id']
+        rng = np.random.default_rng(42)
+
+        # проход 1: статистики кодировщика и случайная выборка для силуэта
+        total = count_cleaned_rows(self.store_dir)
+        p = 1.0 if self.sample_size is None else min(1.0, self.sample_size / max(total, 1))
+        encoder = ChunkEncoder(num_cols, cat_cols)
+        sample_parts = []
+        for chunk in self._iter_chunks(columns, target_cols):
+            encoder.partial_fit(chunk)
+            sample_parts.append(chunk.loc[rng.random(len(chunk)) < p, target_cols])
+
+        if not sample_parts:
+            raise ValueError("Нет данных после удаления пропусков")
+        encoder.finalize()
+
+        # проходы 2..n_epochs+1: partial_fit всех моделей по одним и тем же батчам
+        models = {k: MiniBatchKMeans(n_clusters=k, batch_size=self.batch_size, n_init=3, random_state=42)
+                  for k in k_range}
+        k_timings = {k: 0.0 for k in k_range}
+        for _ in range(self.n_epochs):
+            chunks = (encoder.transform(chunk) for chunk in self._iter_chunks(columns, target_cols))
+            for batch in _iter_minibatches((X[rng.permutation(len(X))] for X in chunks), self.batch_size):
+                if check_cancel is not None: check_cancel()
+                for k, model in list(models.items()):
+                    start = time.perf_counter()
+                    try:
+                        model.partial_fit(batch)
+                    except ValueError:
+                        del models[k]
+                    k_timings[k] += time.perf_counter() - start
+
+        # силуэт по выборке
+        X_sample = encoder.transform(pd.concat(sample_parts, ignore_index=True))
+        best_score = -1
+        best_k = None
+        for k, model in models.items():
+            start = time.perf_counter()
+            labels = model.predict(X_sample)
+            n_labels = len(np.unique(labels))
+            if best_k is None: best_k = k
+            if 2 <= n_labels < len(labels):
+                score = silhouette_score(X_sample, labels, metric='euclidean')
+                if score > best_score:
+                    best_score = score
+                    best_k = k
+            k_timings[k] += time.perf_counter() - start
+            if progress is not None: progress(k, k_timings[k])
+
+        if best_k is None:
+            raise ValueError("Не удалось построить ни одной модели")
+
+        # последний проход: метки лучшей модели и профили кластеров
+        best_model = models[best_k]
+        profiler = ClusterProfiler(num_cols, cat_cols)
+        for chunk in self._iter_chunks(columns, target_cols):
+            labels = best_model.predict(encoder.transform(chunk))
+            skills = skill_index_for(chunk, self._stored_skill_index())
+            profiler.update(chunk, labels, skills)
+
+        result = profiler.build(best_k, max(best_score, 0), MINIBATCH_METHOD)
+        result.k_timings = k_timings
+        return result
+
+    @staticmethod
+    def _strata(X, num_cols, cat_cols) -> np.ndarray:
+        # страты - сочетания категорий, а для чисто числовых признаков - децили
+        if cat_cols:
+            keys = X[cat_cols]
+        else:
+            keys = pd.DataFrame({c: pd.qcut(X[c].rank(method='first'), 10, labels=False) for c in num_cols})
+        return keys.groupby(list(keys.columns), sort=False).ngroup().to_numpy()
+
+    def _evaluate_range(self, method_name, k_range, X_train, categorical, sample_idx, score_data):
+        """Результаты _evaluate_k по каждому k в порядке k_range, по мере готовности"""
+        if self.n_jobs == 1 or len(k_range) < 2:
+            for k in k_range:
+                yield _evaluate_k(method_name, k, X_train, categorical, sample_idx, score_data)
+            return
+
+        # матрица пишется на диск один раз, процессы открывают ее через memmap, а не получают копию
+        temp_dir = tempfile.mkdtemp(prefix="clustering_")
+        try:
+            path = os.path.join(temp_dir, "X_train.joblib")
+            dump(X_train, path)
+            X_shared = load(path, mmap_mode='r')
+            yield from Parallel(n_jobs=self.n_jobs, max_nbytes=None, return_as='generator')(
+                delayed(_evaluate_k)(method_name, k, X_shared, categorical, sample_idx, score_data)
+                for k in k_range
+            )
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _find_best_k(self, method_name, k_range, X_train, categorical, sample_idx, score_data, progress=None):
+        """Перебирает k и возвращает (k, силуэт, метки лучшей модели, время по каждому k).
+
+        Метки лучшей модели используются как итоговые, без повторного обучения.
+        """
+        best_score = -1
+        best_k = k_range.start
+        best_labels = None
+        k_timings = {}
+
+        results = self._evaluate_range(method_name, k_range, X_train, categorical, sample_idx, score_data)
+        try:
+            for k, labels, score, seconds in results:
+                k_timings[k] = seconds
+                if progress is not None: progress(k, seconds)
+                if labels is None: continue
+                if best_labels is None: best_labels, best_k = labels, k
+                if score is not None and score > best_score:
+                    best_score = score
+                    best_k = k
+                    best_labels = labels
+        finally:
+            # при отмене останавливает оставшиеся задачи и удаляет memmap
+            results.close()
+
+        if best_labels is None:
+            raise ValueError("Не удалось построить ни одной модели")
+        return best_k, max(best_score, 0), best_labels, k_timings
+
+
+    def _stored_skill_index(self):
+        """Индекс навыков, сохраненный при очистке в store_dir (None, если его нет); читается один раз"""
+        if self._stored_skills is None:
+            self._stored_skills = load_skill_index(self.store_dir) or False
+        return self._stored_skills or None
+
+    def _skill_index(self) -> SkillIndex:
+        """Инвертированный индекс навыков по строкам df: сохраненный индекс, выровненный по id,
+        или (данные из CSV) построенный по skills_list"""
+        if self._skills is None:
+            self._skills = skill_index_for(self.df, self._stored_skill_index())
+        return self._skills
+
+    def _feature_store(self) -> FeatureStore:
+        if self._features is None:
+            num_cols, cat_cols = self._split_columns(list(self.feature_map.values()))
+            if self.feature_dir is None:
+                self._features = FeatureStore.build(self.df, num_cols, cat_cols)
+            else:
+                self._features = FeatureStore.open(self.df, self.fingerprint, num_cols, cat_cols,
+                                                   root=self.feature_dir)
+        return self._features
+
+    def _build_result(self, index, clusters, k, score, method_name, num_cols, cat_cols):
+        df_result = self.df.loc[index]
+        skills = None
+        if 'skills_list' in df_result.columns or self._stored_skill_index() is not None:
+            skills = self._skill_index().subset(self.df.index.get_indexer(index))
+
+        profiler = ClusterProfiler(num_cols, cat_cols)
+        profiler.update(df_result, clusters, skills)
+        return profiler.build(k, score, method_name)
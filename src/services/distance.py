@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+
+def gower_prepare(X: pd.DataFrame, num_cols: list, cat_cols: list):
+    """Готовит данные для расстояния Гауэра.
+
+    Числовые признаки делятся на размах (float32), категориальные кодируются целыми числами.
+    Размах считается по всем строкам X, поэтому подвыборки этих массивов дают те же расстояния.
+    """
+    num = X[num_cols].to_numpy(dtype=np.float64) if num_cols else np.empty((len(X), 0))
+    if num_cols:
+        ranges = num.max(axis=0) - num.min(axis=0)
+        # признак с нулевым размахом не вносит вклада в расстояние
+        num = np.divide(num - num.min(axis=0), ranges, out=np.zeros_like(num), where=ranges != 0)
+    num = num.astype(np.float32)
+
+    cat = np.empty((len(X), len(cat_cols)), dtype=np.int32)
+    for j, col in enumerate(cat_cols):
+        cat[:, j] = pd.factorize(X[col])[0]
+
+    return num, cat
+
+
+def gower_block(num, cat, rows, cols=None) -> np.ndarray:
+    """Расстояния Гауэра между строками rows и cols (по умолчанию всеми) в float32"""
+    cols = slice(None) if cols is None else cols
+    num_r, num_c = num[rows], num[cols]
+    cat_r, cat_c = cat[rows], cat[cols]
+
+    out = np.zeros((len(num_r), len(num_c)), dtype=np.float32)
+    # по одному признаку за раз: память не больше одного блока rows x cols
+    for j in range(num.shape[1]):
+        out += np.abs(num_r[:, j, None] - num_c[None, :, j])
+    for j in range(cat.shape[1]):
+        out += cat_r[:, j, None] != cat_c[None, :, j]
+
+    n_features = num.shape[1] + cat.shape[1]
+    if n_features:
+        out /= n_features
+    return out
+
+
+def iter_gower_tiles(num, cat, max_tile_mb: float = 64):
+    """Построчные блоки полной матрицы Гауэра: (start, stop, tile) с tile размера (stop-start) x n"""
+    n = len(num)
+    block_size = max(1, int(max_tile_mb * 1024 * 1024 // (4 * max(n, 1))))
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        yield start, stop, gower_block(num, cat, slice(start, stop))
+
+
+def silhouette_from_tiles(tiles, labels) -> float:
+    """Средний силуэт по построчным блокам матрицы расстояний, без полной матрицы в памяти.
+
+    Совпадает с sklearn.metrics.silhouette_score(metric='precomputed'): для объектов
+    из одноэлементных кластеров силуэт равен 0.
+    """
+    labels = pd.factorize(np.asarray(labels))[0]
+    n_clusters = labels.max() + 1
+    counts = np.bincount(labels, minlength=n_clusters).astype(np.float64)
+    onehot = np.zeros((len(labels), n_clusters), dtype=np.float32)
+    onehot[np.arange(len(labels)), labels] = 1
+
+    total = 0.0
+    for start, stop, tile in tiles:
+        # суммы расстояний от каждой строки блока до каждого кластера
+        sums = (tile @ onehot).astype(np.float64)
+        own = labels[start:stop]
+        rows = np.arange(stop - start)
+
+        own_count = counts[own]
+        a = np.divide(sums[rows, own], own_count - 1, out=np.zeros(len(rows)), where=own_count > 1)
+
+        means = sums / counts
+        means[rows, own] = np.inf
+        b = means.min(axis=1)
+
+        denom = np.maximum(a, b)
+        s = np.divide(b - a, denom, out=np.zeros(len(rows)), where=denom > 0)
+        s[own_count <= 1] = 0
+        total += s.sum()
+
+    return float(total / len(labels))
+
+
+def gower_silhouette(num, cat, labels, max_tile_mb: float = 64) -> float:
+    return silhouette_from_tiles(iter_gower_tiles(num, cat, max_tile_mb), labels)
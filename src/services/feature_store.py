@@ -0,0 +1,119 @@
+import os
+import json
+import shutil
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEATURE_DIR = os.path.join('data', 'cache', 'features')
+CATEGORIES_FILE = 'categories.json'
+
+
+class FeatureStore:
+    """Предвычисленные признаки кластеризации для одной версии датасета.
+
+    Числовые колонки хранятся стандартизованными (float64, NaN - пропуск), категориальные -
+    целочисленными кодами (int32, -1 - пропуск) в порядке сортировки строковых значений.
+    На диске каждая колонка - отдельный .npy, который открывается через memmap.
+    """
+
+    def __init__(self, arrays: dict, categories: dict):
+        self.arrays = arrays
+        self.categories = categories
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, num_cols: list, cat_cols: list) -> "FeatureStore":
+        arrays, categories = {}, {}
+        for col in num_cols:
+            if col not in df.columns:
+                continue
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+            valid = ~np.isnan(values)
+            if valid.any():
+                std = values[valid].std()
+                values = (values - values[valid].mean()) / (std if std > 0 else 1.0)
+            arrays[col] = values
+        for col in cat_cols:
+            if col not in df.columns:
+                continue
+            column = df[col]
+            strings = column.astype(str).where(column.notna())
+            codes, uniques = pd.factorize(strings, sort=True)
+            arrays[col] = codes.astype(np.int32)
+            categories[col] = [str(u) for u in uniques]
+        return cls(arrays, categories)
+
+    def save(self, directory: str):
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for col, values in self.arrays.items():
+            np.save(os.path.join(tmp_dir, f"{col}.npy"), values)
+        with open(os.path.join(tmp_dir, CATEGORIES_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.categories, f, ensure_ascii=False)
+        # каталог версии появляется целиком или не появляется совсем
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "FeatureStore":
+        with open(os.path.join(directory, CATEGORIES_FILE), 'r', encoding='utf-8') as f:
+            categories = json.load(f)
+        arrays = {}
+        for name in os.listdir(directory):
+            if name.endswith('.npy'):
+                arrays[name[:-4]] = np.load(os.path.join(directory, name), mmap_mode='r' if mmap else None)
+        return cls(arrays, categories)
+
+    @classmethod
+    def open(cls, df: pd.DataFrame, fingerprint: str, num_cols: list, cat_cols: list,
+             root: str = DEFAULT_FEATURE_DIR, keep_versions: int = 3) -> "FeatureStore":
+        """Загружает признаки версии fingerprint или строит и сохраняет их, удаляя старые версии"""
+        directory = os.path.join(root, fingerprint)
+        if os.path.exists(os.path.join(directory, CATEGORIES_FILE)):
+            try:
+                return cls.load(directory)
+            except Exception as e:
+                logger.warning(f"Не удалось прочитать признаки {directory}: {e}")
+
+        store = cls.build(df, num_cols, cat_cols)
+        try:
+            store.save(directory)
+            cls._prune(root, keep_versions)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить признаки {directory}: {e}")
+        return store
+
+    @staticmethod
+    def _prune(root: str, keep_versions: int):
+        versions = [os.path.join(root, name) for name in os.listdir(root)
+                    if os.path.isdir(os.path.join(root, name)) and not name.endswith('.tmp')]
+        versions.sort(key=os.path.getmtime, reverse=True)
+        for directory in versions[keep_versions:]:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def valid_mask(self, cols: list) -> np.ndarray:
+        mask = None
+        for col in cols:
+            values = self.arrays[col]
+            valid = values >= 0 if col in self.categories else ~np.isnan(values)
+            mask = valid if mask is None else mask & valid
+        return mask
+
+    def matrix(self, cols: list, rows: np.ndarray, dtype=np.float64) -> np.ndarray:
+        """Матрица признаков cols для строк rows.
+
+        Числовые колонки заново стандартизуются по выбранным строкам, как StandardScaler
+        на данных после удаления пропусков.
+        """
+        out = np.empty((len(rows), len(cols)), dtype=dtype)
+        for j, col in enumerate(cols):
+            values = self.arrays[col][rows]
+            if col not in self.categories:
+                std = values.std()
+                values = (values - values.mean()) / (std if std > 0 else 1.0)
+            out[:, j] = values
+        return out
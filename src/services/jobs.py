@@ -0,0 +1,191 @@
+import time
+import uuid
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from src.domain.models import ClusteringResult
+from src.services.clustering_service import ClusteringService, ResultCache
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = {DONE, FAILED, CANCELLED}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass
+class ClusteringJob:
+    id: str
+    selected_features: List[str]
+    k_values: List[int]
+    streaming: bool
+    status: str = PENDING
+    # k -> секунды на обучение и оценку
+    progress: Dict[int, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ClusteringResult] = None
+
+    @property
+    def fraction(self) -> float:
+        return len(self.progress) / len(self.k_values) if self.k_values else 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+
+# состояние процесса-исполнителя: сервис создается один раз на процесс
+_worker_service = None
+_worker_jobs = None
+_worker_cancel = None
+
+
+def _init_worker(df, service_kwargs, result_cache_path, jobs, cancel):
+    global _worker_service, _worker_jobs, _worker_cancel
+    result_cache = ResultCache(result_cache_path) if result_cache_path else None
+    _worker_service = ClusteringService(df, result_cache=result_cache, **service_kwargs)
+    _worker_jobs = jobs
+    _worker_cancel = cancel
+
+
+def _update_job(jobs, job_id, **fields):
+    # прокси Manager не отслеживает изменения вложенных словарей, запись обновляется целиком
+    record = jobs.get(job_id)
+    if record is None:
+        return
+    record.update(fields)
+    jobs[job_id] = record
+
+
+def _run_job(job_id, selected_features, k_range, streaming):
+    _update_job(_worker_jobs, job_id, status=RUNNING, started_at=time.time())
+    progress = {}
+
+    def check_cancel():
+        if _worker_cancel.get(job_id):
+            raise JobCancelled(job_id)
+
+    def on_progress(k, seconds):
+        progress[k] = seconds
+        _update_job(_worker_jobs, job_id, progress=dict(progress))
+        check_cancel()
+
+    check_cancel()
+    return _worker_service.perform_clustering(selected_features, k_range, streaming=streaming,
+                                              progress=on_progress, check_cancel=check_cancel)
+
+
+class ClusteringJobRunner:
+    """Фоновое выполнение кластеризации в пуле процессов.
+
+    Таблица задач (статус, прогресс по k) и флаги отмены лежат в Manager, чтобы их видели
+    и процессы-исполнители, и Streamlit. Результаты сохраняются в общий ResultCache на диске,
+    поэтому их находит и ClusteringService.lookup в процессе приложения.
+    """
+
+    def __init__(self, df: pd.DataFrame, max_workers: int = 2, result_cache_path: str = None,
+                 max_finished: int = 100, **service_kwargs):
+        self.max_finished = max_finished
+        self._manager = multiprocessing.Manager()
+        self._jobs = self._manager.dict()
+        self._cancel = self._manager.dict()
+        self._results = {}
+        self._futures = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(df, service_kwargs, result_cache_path, self._jobs, self._cancel)
+        )
+
+    def submit(self, selected_features: list, k_range: range, streaming: bool = False) -> str:
+        """Ставит расчет в очередь; одинаковый незавершенный запрос возвращает id уже запущенной задачи"""
+        request = (tuple(selected_features), (k_range.start, k_range.stop, k_range.step), streaming)
+        with self._lock:
+            job_id = self._active.get(request)
+            if job_id is not None:
+                return job_id
+
+            job_id = uuid.uuid4().hex
+            job = ClusteringJob(id=job_id, selected_features=list(selected_features),
+                                k_values=list(k_range), streaming=streaming)
+            record = dict(job.__dict__)
+            record.pop('result')
+            self._jobs[job_id] = record
+            self._active[request] = job_id
+
+            future = self._executor.submit(_run_job, job_id, list(selected_features), k_range, streaming)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._on_done(job_id, request, f))
+        return job_id
+
+    def _on_done(self, job_id, request, future):
+        fields = {'finished_at': time.time()}
+        try:
+            self._results[job_id] = future.result()
+            fields['status'] = DONE
+        except (CancelledError, JobCancelled):
+            fields['status'] = CANCELLED
+        except Exception as e:
+            fields['status'] = FAILED
+            fields['error'] = str(e)
+            logger.error(f"Задача кластеризации {job_id} завершилась ошибкой: {e}")
+
+        with self._lock:
+            _update_job(self._jobs, job_id, **fields)
+            self._cancel.pop(job_id, None)
+            self._futures.pop(job_id, None)
+            if self._active.get(request) == job_id:
+                del self._active[request]
+            self._prune()
+
+    def _prune(self):
+        finished = [(record['finished_at'], job_id) for job_id, record in self._jobs.items()
+                    if record['status'] in FINISHED_STATUSES]
+        for _, job_id in sorted(finished)[:-self.max_finished or None]:
+            self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[ClusteringJob]:
+        record = self._jobs.get(job_id)
+        if record is None:
+            return None
+        return ClusteringJob(result=self._results.get(job_id), **record)
+
+    def jobs(self) -> List[ClusteringJob]:
+        return sorted((self.get(job_id) for job_id in self._jobs.keys()), key=lambda job: job.created_at)
+
+    def cancel(self, job_id: str) -> bool:
+        """Отменяет задачу: ожидающая снимается сразу, выполняющаяся - после ближайшего k
+        (в потоковом режиме - после ближайшего мини-батча)"""
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is None:
+                return False
+            self._cancel[job_id] = True
+        future.cancel()
+        return True
+
+    def shutdown(self, wait: bool = True):
+        for job_id in list(self._futures):
+            self.cancel(job_id)
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._manager.shutdown()
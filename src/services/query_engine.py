@@ -0,0 +1,238 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.domain.models import VacancyStats
+from src.data_processing.rollups import id_strings
+from src.data_processing.skill_index import SkillIndex, load_skill_index
+from src.data_processing.store import DEFAULT_STORE_DIR, load_cleaned_dataset, store_exists
+from src.utils.data_loader import load_vacancies_data
+
+logger = logging.getLogger(__name__)
+
+# колонки с отсортированным индексом: строки с одним значением лежат в индексе подряд
+INDEX_COLUMNS = ['area_id', 'experience_id', 'employer_id']
+LABEL_COLUMNS = {'area_id': 'area_name', 'experience_id': 'experience_name', 'employer_id': 'employer_name'}
+SOURCE_COLUMNS = ['id', 'published_at', 'salary_avg'] + INDEX_COLUMNS + list(LABEL_COLUMNS.values())
+NAT = np.iinfo(np.int64).min
+
+
+class QueryEngine:
+    """Фильтрованные агрегаты по очищенным вакансиям без пересканирования таблицы.
+
+    По published_at и по колонкам INDEX_COLUMNS строятся отсортированные перестановки строк:
+    фильтр по значению - срез перестановки, по диапазону дат - два бинарных поиска.
+    Запрос берет строки самого селективного фильтра и проверяет по ним остальные условия.
+    Результаты запоминаются по нормализованному набору фильтров.
+
+    Фильтры - словарь: published_from / published_to (pd.Timestamp), а для колонок индекса -
+    значение или список значений.
+
+    Спрос на навыки по срезу считает SkillIndex: сохраненный при очистке (строки сопоставляются
+    по id) или построенный по колонке skills_list.
+    """
+
+    def __init__(self, df: pd.DataFrame, cache_size: int = 256, skills: SkillIndex = None):
+        self.n_rows = len(df)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.salary = pd.to_numeric(df['salary_avg'], errors='coerce').to_numpy(dtype=np.float64)
+
+        published = pd.to_datetime(df['published_at'], utc=True, errors='coerce')
+        self.published = published.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        self._published_order = np.argsort(self.published, kind='stable')
+        self._published_sorted = self.published[self._published_order]
+        months = published.dt.tz_localize(None).dt.to_period('M')
+        self.month_codes, months = pd.factorize(months, sort=True)
+        self.months = [str(m) for m in months]
+
+        self.codes, self.values, self.labels = {}, {}, {}
+        self._order, self._offsets = {}, {}
+        for col in INDEX_COLUMNS:
+            values = id_strings(df[col]) if col in df.columns else pd.Series(pd.NA, index=df.index, dtype='string')
+            codes, uniques = pd.factorize(values, sort=True)
+            codes = codes.astype(np.int32)
+            self.codes[col] = codes
+            self.values[col] = {value: i for i, value in enumerate(uniques)}
+            label_col = LABEL_COLUMNS[col]
+            if label_col in df.columns:
+                labels = pd.Series(df[label_col].to_numpy()).groupby(codes).first()
+                self.labels[col] = labels.reindex(range(len(uniques))).fillna(pd.Series(list(uniques))).tolist()
+            else:
+                self.labels[col] = list(uniques)
+
+            # строки без значения (-1) уходят в начало перестановки и в срезы не попадают
+            order = np.argsort(codes, kind='stable')
+            self._order[col] = order
+            self._offsets[col] = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+        # позиция строки в индексе навыков (-1 - вакансии в индексе нет)
+        self.skills, self._skill_rows = skills, None
+        if skills is not None:
+            self._skill_rows = pd.Index(skills.ids).get_indexer(df['id'].astype(str))
+        elif 'skills_list' in df.columns:
+            self.skills = SkillIndex.from_lists(df['skills_list'])
+
+    @classmethod
+    def open(cls, store_dir: str = DEFAULT_STORE_DIR, **kwargs) -> "QueryEngine":
+        if not store_exists(store_dir):
+            return cls(load_vacancies_data(columns=SOURCE_COLUMNS + ['skills_list']), **kwargs)
+
+        skills = load_skill_index(store_dir)
+        if skills is not None and not pd.Index(skills.ids).is_unique:
+            logger.warning("В индексе навыков повторяются id, он будет построен заново")
+            skills = None
+        columns = SOURCE_COLUMNS if skills is not None else SOURCE_COLUMNS + ['skills_list']
+        return cls(load_cleaned_dataset(store_dir, columns=columns), skills=skills, **kwargs)
+
+    def options(self, col: str, top: int = None) -> pd.Series:
+        """Значения колонки индекса с подписями по убыванию числа вакансий: id -> название"""
+        counts = np.diff(self._offsets[col])
+        order = np.argsort(-counts, kind='stable')[:top]
+        ids = list(self.values[col])
+        return pd.Series({ids[i]: self.labels[col][i] for i in order if counts[i] > 0}, dtype=object)
+
+    @staticmethod
+    def _key(filters: dict):
+        key = []
+        for name, value in sorted((filters or {}).items()):
+            if value is None:
+                continue
+            if name in ('published_from', 'published_to'):
+                value = pd.Timestamp(value)
+                value = value.tz_localize('UTC') if value.tzinfo is None else value.tz_convert('UTC')
+            elif isinstance(value, (list, tuple, set)):
+                value = tuple(sorted(map(str, value)))
+            else:
+                value = (str(value),)
+            key.append((name, value))
+        return tuple(key)
+
+    def _candidates(self, key):
+        """Для каждого условия: (число строк, строки из индекса, проверка условия по позициям)"""
+        conditions = []
+        bounds = dict(key)
+        if 'published_from' in bounds or 'published_to' in bounds:
+            # NaT хранится как минимальное int64 и всегда отсекается нижней границей
+            lo = bounds['published_from'].value if 'published_from' in bounds else NAT + 1
+            hi = bounds['published_to'].value if 'published_to' in bounds else np.iinfo(np.int64).max
+            start, stop = np.searchsorted(self._published_sorted, [lo, hi], side='left')
+
+            def check(rows, lo=lo, hi=hi):
+                values = self.published[rows]
+                return (values >= lo) & (values < hi)
+
+            conditions.append((max(stop - start, 0), lambda s=start, e=stop: self._published_order[s:e], check))
+
+        for col in INDEX_COLUMNS:
+            if col not in bounds:
+                continue
+            codes = [self.values[col][v] for v in bounds[col] if v in self.values[col]]
+            offsets = self._offsets[col]
+            size = int(sum(offsets[c + 1] - offsets[c] for c in codes))
+
+            def rows(col=col, codes=codes, offsets=offsets):
+                order = self._order[col]
+                return np.concatenate([order[offsets[c]:offsets[c + 1]] for c in codes]) if codes \
+                    else np.empty(0, dtype=np.int64)
+
+            # таблица допустимых кодов; последний элемент ложный и соответствует пропуску (-1)
+            allowed = np.zeros(len(offsets), dtype=bool)
+            allowed[codes] = True
+
+            def check(positions, col=col, allowed=allowed):
+                return allowed[self.codes[col][positions]]
+
+            conditions.append((size, rows, check))
+        return conditions
+
+    def rows(self, filters: dict = None):
+        """Позиции строк, прошедших фильтры; None - все строки"""
+        conditions = self._candidates(self._key(filters))
+        if not conditions:
+            return None
+        conditions.sort(key=lambda c: c[0])
+        _, seek, _ = conditions[0]
+        rows = seek()
+        for _, _, check in conditions[1:]:
+            if len(rows) == 0:
+                break
+            rows = rows[check(rows)]
+        return np.sort(rows)
+
+    def _memo(self, key, compute):
+        # движок общий для всех сессий Streamlit
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = compute()
+        with self._lock:
+            self._cache[key] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def stats(self, filters: dict = None) -> VacancyStats:
+        """Число вакансий и статистики зарплат по срезу"""
+        key = self._key(filters)
+        return self._memo(('stats', key), lambda: self._stats(filters))
+
+    def _stats(self, filters) -> VacancyStats:
+        rows = self.rows(filters)
+        salary = self.salary if rows is None else self.salary[rows]
+        paid = salary[~np.isnan(salary)]
+        if len(paid):
+            p25, median, p75 = np.percentile(paid, [25, 50, 75])
+            mean = float(paid.mean())
+        else:
+            p25 = median = p75 = mean = None
+        return VacancyStats(
+            vacancies=self.n_rows if rows is None else len(rows),
+            with_salary=len(paid),
+            salary_mean=mean,
+            salary_median=None if median is None else float(median),
+            salary_p25=None if p25 is None else float(p25),
+            salary_p75=None if p75 is None else float(p75)
+        )
+
+    def monthly_counts(self, filters: dict = None, by: str = 'experience_id') -> pd.DataFrame:
+        """Число вакансий по месяцам публикации в разрезе колонки индекса by"""
+        key = self._key(filters)
+        return self._memo(('monthly', by, key), lambda: self._monthly_counts(filters, by))
+
+    def _monthly_counts(self, filters, by) -> pd.DataFrame:
+        rows = self.rows(filters)
+        months = self.month_codes if rows is None else self.month_codes[rows]
+        groups = self.codes[by] if rows is None else self.codes[by][rows]
+        valid = (months >= 0) & (groups >= 0)
+        n_groups = len(self.labels[by])
+        counts = np.bincount(months[valid] * n_groups + groups[valid], minlength=len(self.months) * n_groups)
+        table = pd.DataFrame(counts.reshape(len(self.months), n_groups), index=self.months,
+                             columns=[str(label) for label in self.labels[by]])
+        table = table.loc[:, table.sum() > 0]
+        return table[(table.sum(axis=1) > 0)]
+
+    def top_skills(self, filters: dict = None, top: int = 10) -> pd.Series:
+        """Самые востребованные навыки среза: навык -> число вакансий"""
+        key = self._key(filters)
+        return self._memo(('skills', top, key), lambda: self._top_skills(filters, top))
+
+    def _top_skills(self, filters, top) -> pd.Series:
+        if self.skills is None:
+            return pd.Series(dtype=np.int64)
+        rows = self.rows(filters)
+        if self._skill_rows is not None:
+            rows = self._skill_rows if rows is None else self._skill_rows[rows]
+            rows = rows[rows >= 0]
+        return self.skills.top(top, rows=rows)
+
+    @property
+    def last_published(self):
+        valid = self._published_sorted[self._published_sorted != NAT]
+        return pd.Timestamp(valid[-1], tz='UTC') if len(valid) else None
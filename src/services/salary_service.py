@@ -0,0 +1,261 @@
+import os
+import json
+import shutil
+import logging
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from catboost import CatBoostRegressor, Pool
+
+from src.domain.models import SalaryPredictionResult
+from src.data_processing.cleaner import EXPERIENCE_AVG_YEARS, EXPERIENCE_MIN_YEARS
+from src.data_processing.flattener import parse_list
+from src.data_processing.skill_index import SkillIndex, load_skill_index, skill_index_for
+from src.data_processing.store import DEFAULT_STORE_DIR
+from src.utils.data_loader import load_vacancies_data, simplify_job_name
+from src.utils.fingerprint import dataset_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.join('data', 'models', 'salary')
+MODEL_FILE = 'model.cbm'
+META_FILE = 'meta.json'
+
+# нижняя граница интервала, медиана и верхняя граница - одной моделью MultiQuantile
+QUANTILES = (0.1, 0.5, 0.9)
+CAT_FEATURES = ['name', 'area_name', 'schedule_name']
+MISSING = 'Не указано'
+REMOTE_SCHEDULE = 'Удаленная работа'
+REMOTE_LOCATION = 'Удаленно'
+# входные колонки predict_batch - те же параметры, что у predict_salary
+BATCH_COLUMNS = ['job_title', 'exp', 'skills']
+SALARY_BINS = 20
+# роли с меньшим числом зарплат сравниваются со всем рынком
+MIN_MARKET_SIZE = 20
+# модель обучена на серединах корзин опыта hh.ru (avg_experience_years): стаж в годах переводится в них
+_EXPERIENCE_BUCKETS = sorted(EXPERIENCE_MIN_YEARS, key=EXPERIENCE_MIN_YEARS.get)
+_EXPERIENCE_STARTS = np.array([EXPERIENCE_MIN_YEARS[b] for b in _EXPERIENCE_BUCKETS], dtype=np.float64)
+_EXPERIENCE_MIDPOINTS = np.array([EXPERIENCE_AVG_YEARS[b] for b in _EXPERIENCE_BUCKETS], dtype=np.float64)
+
+
+class SalaryPredictionService:
+    """Прогноз зарплаты по опыту, роли, региону, графику и навыкам.
+
+    Модель - CatBoost с функцией потерь MultiQuantile: за один проход она дает медиану
+    и границы интервала. Навыки кодируются разреженной multi-hot матрицей SkillIndex
+    по словарю из частых навыков выборки.
+    """
+
+    def __init__(self, model: CatBoostRegressor, meta: dict):
+        self.model = model
+        self.meta = meta
+        self.skills = meta['skills']
+        self._skill_pos = {skill: i for i, skill in enumerate(self.skills)}
+        self._edges = np.asarray(meta['salary_edges'], dtype=np.float64)
+
+    @classmethod
+    def train(cls, df: pd.DataFrame, max_skills: int = 100, min_skill_count: int = 5,
+              iterations: int = 500, random_state: int = 42, skills: SkillIndex = None) -> "SalaryPredictionService":
+        """skills - индекс навыков, сохраненный при очистке (строки сопоставляются по id);
+        без него или для данных из CSV матрица навыков строится по skills_list"""
+        data = df[df['salary_avg'].notna()].reset_index(drop=True)
+        if data.empty:
+            raise ValueError("Нет вакансий с указанной зарплатой для обучения модели")
+        # необязательные поля (график, регион) могут отсутствовать в выгрузке
+        data = data.assign(**{column: None for column in CAT_FEATURES if column not in data.columns})
+
+        skill_index = skill_index_for(data, skills)
+        vocabulary = skill_index.vocabulary(top=max_skills, min_count=min_skill_count)
+
+        salary = data['salary_avg'].to_numpy(dtype=np.float64)
+        edges = np.unique(np.round(np.quantile(salary, np.linspace(0, 0.99, SALARY_BINS + 1)), -3))
+        # выбросы за 99-м перцентилем попадают в крайнюю корзину
+        clipped = data['salary_avg'].clip(edges[0], edges[-1])
+        market = {role: np.histogram(group, bins=edges)[0].tolist()
+                  for role, group in clipped.groupby(data['name']) if len(group) >= MIN_MARKET_SIZE}
+        market[MISSING] = np.histogram(clipped, bins=edges)[0].tolist()
+
+        schedule = data['schedule_name'].mode()
+        meta = {
+            'skills': vocabulary,
+            'quantiles': list(QUANTILES),
+            'salary_edges': edges.tolist(),
+            'market': market,
+            'default_schedule': schedule.iloc[0] if not schedule.empty else MISSING,
+            'areas': sorted(data['area_name'].dropna().unique().tolist()),
+            'fingerprint': dataset_fingerprint(df),
+            'n_train': len(data),
+        }
+
+        service = cls(None, meta)
+        X = service._frame(data['name'], data['area_name'], data['schedule_name'],
+                           data['avg_experience_years'], skill_index.matrix(vocabulary))
+        alpha = ",".join(map(str, QUANTILES))
+        model = CatBoostRegressor(loss_function=f'MultiQuantile:alpha={alpha}', iterations=iterations,
+                                  depth=6, learning_rate=0.05, random_seed=random_state,
+                                  verbose=False, allow_writing_files=False, thread_count=-1)
+        model.fit(Pool(X, salary, cat_features=CAT_FEATURES))
+        service.model = model
+        logger.info(f"Модель зарплат обучена на {len(data)} вакансиях, навыков в словаре: {len(vocabulary)}")
+        return service
+
+    def save(self, directory: str = DEFAULT_MODEL_DIR):
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        self.model.save_model(os.path.join(tmp_dir, MODEL_FILE))
+        with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load(cls, directory: str = DEFAULT_MODEL_DIR) -> "SalaryPredictionService":
+        with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        model = CatBoostRegressor()
+        model.load_model(os.path.join(directory, MODEL_FILE))
+        return cls(model, meta)
+
+    @classmethod
+    def open(cls, df: pd.DataFrame, directory: str = DEFAULT_MODEL_DIR, **train_kwargs) -> "SalaryPredictionService":
+        """Загружает сохраненную модель, если она обучена на этой же версии данных, иначе переобучает"""
+        fingerprint = dataset_fingerprint(df)
+        if os.path.exists(os.path.join(directory, META_FILE)):
+            try:
+                service = cls.load(directory)
+                if service.meta.get('fingerprint') == fingerprint:
+                    return service
+            except Exception as e:
+                logger.warning(f"Не удалось прочитать модель {directory}: {e}")
+
+        service = cls.train(df, **train_kwargs)
+        try:
+            service.save(directory)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить модель {directory}: {e}")
+        return service
+
+    def skill_matrix(self, skills_lists) -> sp.csr_matrix:
+        """Multi-hot навыков по словарю модели в разреженной матрице; неизвестные навыки пропускаются"""
+        return SkillIndex.from_lists(skills_lists).matrix(self.skills)
+
+    def _frame(self, names, areas, schedules, experience, skills: sp.csr_matrix) -> pd.DataFrame:
+        X = pd.DataFrame({
+            'avg_experience_years': pd.to_numeric(pd.Series(list(experience)), errors='coerce').astype(np.float64),
+            'name': [MISSING if pd.isna(v) else str(v) for v in names],
+            'area_name': [MISSING if pd.isna(v) else str(v) for v in areas],
+            'schedule_name': [MISSING if pd.isna(v) else str(v) for v in schedules],
+        })
+        # колонки навыков остаются разреженными: CatBoost принимает SparseArray без уплотнения
+        skills = pd.DataFrame.sparse.from_spmatrix(skills, columns=self.skill_columns)
+        return pd.concat([X, skills], axis=1)
+
+    @property
+    def skill_columns(self) -> List[str]:
+        return [f"skill:{skill}" for skill in self.skills]
+
+    def _location(self, location: str):
+        """Местоположение из формы -> (area_name, schedule_name) в терминах обучающих данных"""
+        if location == REMOTE_LOCATION:
+            return MISSING, REMOTE_SCHEDULE
+        if location in self.meta['areas']:
+            return location, self.meta['default_schedule']
+        return MISSING, self.meta['default_schedule']
+
+    def _row(self, job_title: str, exp: float, skills: List[str], location: str = None) -> list:
+        area, schedule = self._location(location)
+        onehot = [0.0] * len(self.skills)
+        for skill in skills:
+            pos = self._skill_pos.get(skill)
+            if pos is not None:
+                onehot[pos] = 1.0
+        return [float(experience_midpoint([exp])[0]), simplify_job_name(job_title), area, schedule] + onehot
+
+    def _predict_quantiles(self, data) -> np.ndarray:
+        # квантили предсказываются независимо и могут пересекаться, сортировка восстанавливает порядок
+        return np.sort(np.atleast_2d(self.model.predict(data)), axis=1)
+
+    def market_chart(self, role: str, salary: float) -> pd.DataFrame:
+        """Распределение зарплат роли по корзинам; корзина прогноза вынесена в отдельную колонку"""
+        counts = np.asarray(self.meta['market'].get(role, self.meta['market'][MISSING]))
+        labels = [f"{int(lo) // 1000}–{int(hi) // 1000}K" for lo, hi in zip(self._edges[:-1], self._edges[1:])]
+        own = np.zeros(len(counts), dtype=int)
+        pos = int(np.clip(np.searchsorted(self._edges, salary, side='right') - 1, 0, len(counts) - 1))
+        own[pos], counts = counts[pos], counts.copy()
+        counts[pos] = 0
+        return pd.DataFrame({"Рынок": counts, "Ваш прогноз": own}, index=pd.Index(labels, name="salary"))
+
+    def predict_salary(self, job_title: str, exp: int, skills: List[str],
+                       location: str = None) -> SalaryPredictionResult:
+        row = self._row(job_title, exp, skills, location)
+        low, mid, high = _round_salary(self._predict_quantiles([row]))[0].tolist()
+        return SalaryPredictionResult(
+            predicted_salary=mid,
+            currency="₽",
+            confidence_interval=(low, high),
+            market_comparison_chart=self.market_chart(row[1], mid)
+        )
+
+    def predict_batch(self, profiles: pd.DataFrame, batch_size: int = 100000) -> pd.DataFrame:
+        """Прогноз для таблицы профилей с колонками job_title, exp, skills и необязательной location.
+
+        Навыки - список или строка через запятую. Профили кодируются и оцениваются пачками
+        по batch_size строк, результат - те же округленные значения, что у predict_salary.
+        """
+        missing = [col for col in BATCH_COLUMNS if col not in profiles.columns]
+        if missing:
+            raise ValueError(f"В профилях нет колонок: {', '.join(missing)}")
+
+        parts = []
+        for start in range(0, len(profiles), batch_size):
+            batch = profiles.iloc[start:start + batch_size]
+            locations = batch['location'] if 'location' in batch.columns else [None] * len(batch)
+            areas, schedules = zip(*map(self._location, locations)) if len(batch) else ((), ())
+            X = self._frame(batch['job_title'].map(simplify_job_name), areas, schedules,
+                            experience_midpoint(batch['exp']), self.skill_matrix(batch['skills'].map(split_skills)))
+            parts.append(_round_salary(self._predict_quantiles(Pool(X, cat_features=CAT_FEATURES))))
+
+        values = np.vstack(parts) if parts else np.empty((0, len(QUANTILES)), dtype=np.int64)
+        return pd.DataFrame(values[:, [1, 0, 2]], index=profiles.index,
+                            columns=['predicted_salary', 'salary_low', 'salary_high'])
+
+
+def _round_salary(values: np.ndarray) -> np.ndarray:
+    # до тысяч рублей; np.round округляет половины к четному, как и round()
+    return np.round(values, -3).astype(np.int64)
+
+
+def experience_midpoint(years) -> np.ndarray:
+    """Стаж в годах -> середина корзины опыта hh.ru: 0 -> 0, 1-2 -> 2, 3-5 -> 4, от 6 -> 8"""
+    years = pd.to_numeric(pd.Series(list(years), dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    pos = np.clip(np.searchsorted(_EXPERIENCE_STARTS, years, side='right') - 1, 0, len(_EXPERIENCE_STARTS) - 1)
+    return np.where(np.isnan(years), np.nan, _EXPERIENCE_MIDPOINTS[pos])
+
+
+def split_skills(value) -> list:
+    """Навыки профиля: список, строка со списком из CSV или перечисление через запятую/точку с запятой"""
+    if isinstance(value, str):
+        if value.lstrip().startswith('['):
+            return parse_list(value)
+        return [skill.strip() for skill in value.replace(';', ',').split(',') if skill.strip()]
+    return parse_list(value)
+
+
+def train_salary_model(directory: str = DEFAULT_MODEL_DIR, store_dir: str = None) -> SalaryPredictionService:
+    """Обучает модель по очищенным вакансиям, если они изменились; вызывается после очистки, не из приложения"""
+    df = load_vacancies_data(store_dir=store_dir)
+    if df.empty:
+        raise ValueError("Нет очищенных вакансий для обучения модели зарплат")
+    return SalaryPredictionService.open(df, directory, skills=load_skill_index(store_dir or DEFAULT_STORE_DIR))
+
+
+@lru_cache(maxsize=None)
+def get_salary_service(directory: str = DEFAULT_MODEL_DIR) -> SalaryPredictionService:
+    """Готовая модель загружается один раз на процесс; приложение ее не обучает"""
+    if not os.path.exists(os.path.join(directory, META_FILE)):
+        raise FileNotFoundError(f"Модель зарплат не обучена ({directory}): запустите python scripts/clean_data.py")
+    return SalaryPredictionService.load(directory)
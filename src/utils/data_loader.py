@@ -4,6 +4,8 @@ import glob
 import pandas as pd
 import logging
 
+from src.data_processing.store import store_exists, load_cleaned_dataset
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,7 +32,7 @@ def simplify_job_name(name):
 
     return 'Other'
 
-def load_vacancies_data():
+def load_vacancies_data(columns: list = None, simplify_names: bool = True, store_dir: str = None):
     if getattr(sys, 'frozen', False):
         base_dir = sys._MEIPASS
     else:
@@ -40,6 +42,31 @@ def load_vacancies_data():
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     data_dir = os.path.join(base_dir, 'data', 'processed')
 
+    useful_cols = columns or [
+        'id',
+        'name',
+        'salary_avg',
+        'avg_experience_years',
+        'min_experience_years',
+        'requirement',
+        'responsibility',
+        'schedule_name',
+        'employment_name',
+        'employer_name',
+        'area_name',
+        'skills_list'
+    ]
+
+    store_dir = store_dir or os.path.join(data_dir, 'cleaned_vacancies')
+    if store_exists(store_dir):
+        try:
+            df_ml = load_cleaned_dataset(store_dir, columns=useful_cols)
+            if simplify_names and 'name' in df_ml.columns:
+                df_ml['name'] = df_ml['name'].apply(simplify_job_name)
+            return df_ml
+        except Exception as e:
+            logger.error(f"Error loading dataset {store_dir}: {e}")
+
     search_pattern = os.path.join(data_dir, "new_cleaned_vacancies*.csv")
     files = glob.glob(search_pattern)
 
@@ -50,26 +77,12 @@ def load_vacancies_data():
     latest_file = max(files, key=os.path.getmtime)
 
     try:
-        df = pd.read_csv(latest_file)
-
-        useful_cols = [
-            'id',
-            'name',
-            'salary_avg',
-            'avg_experience_years',
-            'min_experience_years',
-            'requirement',
-            'responsibility',
-            'schedule_name',
-            'employment_name',
-            'employer_name',
-            'area_name',
-            'skills_list'
-        ]
+        df = pd.read_csv(latest_file, usecols=lambda c: c in useful_cols)
 
         df_ml = df[useful_cols].copy()
 
-        df_ml['name'] = df_ml['name'].apply(simplify_job_name)
+        if simplify_names and 'name' in df_ml.columns:
+            df_ml['name'] = df_ml['name'].apply(simplify_job_name)
 
         return df_ml
 
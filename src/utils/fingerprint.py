@@ -0,0 +1,16 @@
+import hashlib
+
+import pandas as pd
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """Отпечаток содержимого датафрейма: меняется при любом изменении строк или колонок"""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(",".join(map(str, df.columns)).encode("utf-8"))
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object:
+            # списки (skills_list) не хэшируются pandas, приводим их к строкам
+            values = values.map(lambda x: "|".join(map(str, x)) if isinstance(x, (list, tuple)) else x)
+        hasher.update(pd.util.hash_pandas_object(values, index=True).to_numpy().tobytes())
+    return hasher.hexdigest()
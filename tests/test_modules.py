@@ -1,16 +1,44 @@
 import sys
 import os
 import unittest
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 import pandas as pd
 import numpy as np
+from sklearn.preprocessing import StandardScaler
 
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.data_collection.hh_parser import HHParser
+from src.data_collection.http_cache import ResponseCache
+from src.data_collection.sink import JsonlSink
 from src.data_collection.filters import remove_duplicates 
 from src.data_collection.filters import filter_data_analyst_vacancies
+from src.data_collection.filters import VacancyFilter
+from src.data_collection.near_duplicates import find_near_duplicates
 from src.data_processing.cleaner import DataCleaner
+from src.data_processing.flattener import flatten_records
+from src.data_processing.reader import iter_records, iter_record_batches
+from src.data_processing.store import save_cleaned_dataset, load_cleaned_dataset, iter_cleaned_batches
+from src.services.clustering_service import ClusteringService, ClusterProfiler, ResultCache, stratified_sample
+from src.services.distance import gower_prepare, gower_block, gower_silhouette
+from src.services.feature_store import FeatureStore
+from src.services.jobs import ClusteringJobRunner, DONE, CANCELLED
+from src.data_processing.rollups import SOURCE_COLUMNS, build_rollups, load_rollups
+from src.data_processing.skill_index import SkillIndex, load_skill_index, refresh_skill_index, save_skill_index, skill_index_for
+from src.data_processing.search_index import SearchIndex, stem
+from src.services.aggregation_service import AggregationService
+from src.services.query_engine import QueryEngine
+from src.services.salary_service import SalaryPredictionService, experience_midpoint, get_salary_service, split_skills
+from scripts.clean_data import clean_and_save
+from scripts.dedupe_data import dedupe_and_save
+from scripts.predict_salaries import predict_file
         
 
 class TestHHParser(unittest.TestCase): 
@@ -19,6 +47,12 @@ class TestHHParser(unittest.TestCase):
         
         parser = HHParser(delay=0.1)
         self.assertEqual(parser.delay, 0.1)
+
+        # потоки ролей получают один и тот же пул
+        with ThreadPoolExecutor(max_workers=8) as roles:
+            executors = set(map(id, roles.map(lambda _: parser._get_executor(), range(8))))
+        self.assertEqual(len(executors), 1)
+        parser.close()
         print("HHParser инициализируется корректно")
     
     def test_is_analyst_by_role(self):
@@ -32,6 +66,124 @@ class TestHHParser(unittest.TestCase):
         
         print("Фильтрация по ролям работает")
 
+    def test_fetch_vacancies_concurrent(self):
+        requests_log = []
+
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                page = int(query["page"][0])
+                requests_log.append(page)
+
+                if page == 2 and requests_log.count(2) == 1:
+                    self.send_response(429)
+                    self.end_headers()
+                    return
+
+                items = [
+                    {"id": f"{page}-{i}", "professional_roles": [{"id": "156"}]}
+                    for i in range(3)
+                ]
+                body = json.dumps({"items": items, "pages": 5}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        try:
+            parser = HHParser(
+                delay=0, max_workers=4, backoff=0.01,
+                base_url=f"http://127.0.0.1:{server.server_port}/vacancies"
+            )
+            vacancies = parser.fetch_vacancies(pages=10)
+            parser.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual([v["id"] for v in vacancies], [f"{p}-{i}" for p in range(5) for i in range(3)])
+        self.assertEqual(requests_log.count(2), 2)
+
+        print("Параллельная загрузка страниц работает")
+
+    def test_response_cache_revalidation(self):
+        statuses = []
+
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.headers.get("If-None-Match") == '"v1"':
+                    statuses.append(304)
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+
+                statuses.append(200)
+                body = json.dumps({"items": [{"id": "1", "professional_roles": [{"id": "10"}]}], "pages": 1})
+                self.send_response(200)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                self.wfile.write(body.encode("utf-8"))
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}/vacancies"
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            try:
+                stale_cache = ResponseCache(os.path.join(tmp_dir, "cache.sqlite"), ttl=0)
+                parser = HHParser(delay=0, base_url=base_url, cache=stale_cache)
+                first = parser.fetch_vacancies(pages=1)
+                second = parser.fetch_vacancies(pages=1)
+                stale_cache.close()
+
+                fresh_cache = ResponseCache(os.path.join(tmp_dir, "cache.sqlite"), ttl=3600)
+                parser = HHParser(delay=0, base_url=base_url, cache=fresh_cache)
+                third = parser.fetch_vacancies(pages=1)
+                fresh_cache.close()
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, third)
+        self.assertEqual(statuses, [200, 304])
+
+        print("Кэш ответов API работает")
+
+    def test_jsonl_sink_resume(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for filename in ["raw.jsonl", "raw.jsonl.gz"]:
+                path = os.path.join(tmp_dir, filename)
+
+                sink = JsonlSink(path)
+                sink.write([{"id": "1"}, {"id": "2"}], key="156", page=0)
+                sink.write([{"id": "2"}, {"id": "3"}], key="156", page=1)
+                sink.close()
+
+                # сбой посреди записи следующей страницы
+                with open(path, "ab") as f:
+                    f.write(b'{"id": "4", "na')
+
+                sink = JsonlSink(path)
+                self.assertEqual(sink.done_pages("156"), {0, 1})
+                self.assertEqual(sink.write([{"id": "3"}, {"id": "4"}], key="10", page=0), 1)
+                sink.close()
+
+                self.assertEqual([v["id"] for v in sink], ["1", "2", "3", "4"])
+                self.assertEqual(len(sink), 4)
+
+        print("Потоковая запись сырых данных работает")
+
 class TestFilters(unittest.TestCase): 
     
     def test_filter_analyst(self):
@@ -76,6 +228,75 @@ class TestFilters(unittest.TestCase):
         self.assertEqual(unique_ids, {1, 2, 3})
         print("Удаление дубликатов работает")
 
+    def test_filter_pipeline(self):
+        vacancies = [
+            {"id": 1, "name": "Аналитик данных", "experience": {"id": "between1And3"},
+             "salary": {"from": 150000, "to": None, "currency": "RUR"},
+             "snippet": {"requirement": "Знание SQL и Python"}},
+            {"id": 2, "name": "Менеджер, аналитик данных", "experience": {"id": "between1And3"},
+             "salary": {"from": 150000, "currency": "RUR"}, "snippet": {"requirement": "SQL"}},
+            {"id": 3, "name": "Data Analyst", "experience": {"id": "noExperience"},
+             "salary": {"from": 90000, "currency": "RUR"}, "snippet": {"requirement": "SQL, Excel"}},
+            {"id": 4, "name": "BI-аналитик", "experience": None,
+             "salary": None, "snippet": {"requirement": None}},
+            {"id": 1, "name": "Аналитик данных", "experience": {"id": "between1And3"},
+             "salary": {"from": 150000, "currency": "RUR"}, "snippet": {"requirement": "SQL"}},
+        ]
+
+        pipeline = VacancyFilter().analyst_names().salary(min_salary=100000).skills(["sql"], ["excel"]).unique()
+        result = pipeline(iter(vacancies))
+
+        self.assertFalse(isinstance(result, list))
+        self.assertEqual([v["id"] for v in result], [1])
+        self.assertEqual([v["id"] for v in VacancyFilter().analyst_names()(vacancies)], [1, 3, 4, 1])
+        self.assertEqual([v["id"] for v in VacancyFilter().experience(["noExperience"])(vacancies)], [3])
+        self.assertTrue(VacancyFilter().matches(vacancies[1]))
+        print("Конвейер фильтров работает за один проход")
+
+    def test_near_duplicates(self):
+        requirement = "Опыт работы с <highlighttext>SQL</highlighttext> и Python от 2 лет, знание статистики и A/B тестов"
+        responsibility = "Построение отчетов и дашбордов в Power BI для продуктовых команд"
+
+        def vacancy(vac_id, employer_id, name="Аналитик данных", req=requirement, area="Москва"):
+            return {"id": vac_id, "name": name, "employer": {"id": employer_id}, "area": {"name": area},
+                    "snippet": {"requirement": req, "responsibility": responsibility}}
+
+        vacancies = [
+            vacancy("1", "10"),
+            vacancy("2", "10", area="Казань"),
+            vacancy("3", "10", name="Аналитик данных!", req=requirement.replace("2 лет", "3 лет")),
+            vacancy("4", "20"),
+            vacancy("5", "10", name="Системный аналитик", req="Описание бизнес-процессов в BPMN, UML, REST API"),
+            {"id": "6", "name": None, "snippet": None},
+            {"id": "7", "name": None, "snippet": None},
+        ]
+        groups = find_near_duplicates(vacancies, batch_size=3)
+        # другой работодатель и вакансии без текста дубликатами не считаются
+        self.assertEqual(groups.tolist(), [0, 0, 0, 3, 4, 5, 6])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_file = os.path.join(tmp_dir, "filtered.jsonl")
+            with JsonlSink(input_file, resume=False) as sink:
+                sink.write(vacancies)
+            store_dir = os.path.join(tmp_dir, "store")
+            deduped, _ = dedupe_and_save(input_file, os.path.join(tmp_dir, "deduped.jsonl"), store_dir=store_dir)
+            records = list(deduped)
+
+            # на следующий день: перепубликация 1 под новым id, обновленная 5 и новая вакансия
+            next_file = os.path.join(tmp_dir, "filtered_next.jsonl")
+            with JsonlSink(next_file, resume=False) as sink:
+                sink.write([vacancy("8", "10", area="Самара"), vacancies[4],
+                            vacancy("9", "30", name="Продуктовый аналитик", req="Метрики и эксперименты")])
+            next_deduped, _ = dedupe_and_save(next_file, os.path.join(tmp_dir, "deduped_next.jsonl"),
+                                              keep_duplicates=True, store_dir=store_dir)
+            next_records = list(next_deduped)
+
+        self.assertEqual([v["id"] for v in records], ["1", "4", "5", "6", "7"])
+        self.assertEqual((records[0]["duplicate_group"], records[0]["duplicate_count"]), ("1", 3))
+        self.assertEqual(records[1]["duplicate_count"], 1)
+        self.assertEqual([(v["id"], v["duplicate_group"]) for v in next_records], [("8", "1"), ("5", "5"), ("9", "9")])
+        print("Почти дубликаты находятся по MinHash/LSH")
+
 class TestCleaner(unittest.TestCase):
     def test_calculate_avg_salary(self):
         cleaner = DataCleaner()
@@ -113,6 +334,726 @@ class TestCleaner(unittest.TestCase):
         
         print("Очистка опыта работает корректно")
 
+    def test_flatten_records(self):
+        records = [
+            {
+                "id": "1",
+                "name": "Аналитик данных",
+                "employer": {"id": "10", "name": "Яндекс"},
+                "professional_roles": [{"id": "156", "name": "BI-аналитик"}],
+                "key_skills": [{"name": "SQL"}, {"name": "Python"}],
+                "salary": "{'from': 100000, 'to': None, 'currency': 'RUR'}"
+            },
+            {
+                "id": "2",
+                "name": "Data Analyst",
+                "employer": None,
+                "professional_roles": [],
+                "key_skills": None,
+                "salary": None,
+                "archived": False
+            }
+        ]
+
+        df = flatten_records(records)
+
+        self.assertEqual(list(df["employer_name"]), ["Яндекс", None])
+        self.assertEqual(list(df["main_role_id"]), ["156", None])
+        self.assertEqual(list(df["skills_list"]), [["SQL", "Python"], []])
+        self.assertEqual(df.loc[0, "salary_from"], 100000)
+        self.assertNotIn("employer", df.columns)
+        self.assertIsNone(df.loc[0, "archived"])
+
+        print("Разворачивание вложенных полей работает корректно")
+
+    def test_iter_records(self):
+        records = [{"id": str(i), "name": f"Вакансия {i}", "salary": {"from": i}} for i in range(50)]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            array_file = os.path.join(tmp_dir, "vacancies.json")
+            with open(array_file, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+
+            lines_file = os.path.join(tmp_dir, "vacancies.jsonl")
+            with open(lines_file, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+            self.assertEqual(list(iter_records(array_file, chunk_size=16)), records)
+            self.assertEqual(list(iter_records(lines_file, chunk_size=16)), records)
+
+            batches = list(iter_record_batches(array_file, batch_size=20))
+            self.assertEqual([len(b) for b in batches], [20, 20, 10])
+
+        print("Потоковое чтение JSON работает корректно")
+
+    def test_extract_skills_from_text(self):
+        cleaner = DataCleaner()
+        df = pd.DataFrame({
+            "skills_list": [["Excel"], []],
+            "requirement": ["Знание SQL и Python (pandas), опыт с Power BI", "Верстка html, mlops"],
+            "responsibility": ["Построение моделей в R, работа с git", None]
+        })
+
+        result = cleaner.extract_skills_from_text(df)
+
+        self.assertEqual(
+            set(result.loc[0, "skills_list"]),
+            {"Excel", "SQL", "Python", "Power BI", "R", "Git"}
+        )
+        self.assertNotIn("Машинное обучение", result.loc[1, "skills_list"])
+
+        print("Извлечение навыков из текста работает корректно")
+
+    def test_cleaned_dataset_store(self):
+        df = pd.DataFrame({
+            "id": ["1", "2", "3"],
+            "name": ["Аналитик данных", "BI-аналитик", "Data Analyst"],
+            "salary_avg": [100000.0, None, 150000.0],
+            "area_name": ["Москва", "Москва", "Казань"],
+            "skills_list": [["SQL", "Python"], [], ["Excel"]],
+            "published_year_month": ["2026-01", "2026-01", "2026-02"]
+        })
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_cleaned_dataset(df, tmp_dir)
+            loaded = load_cleaned_dataset(tmp_dir, columns=["id", "area_name", "skills_list"])
+
+        loaded = loaded.sort_values("id").reset_index(drop=True)
+        self.assertEqual(list(loaded.columns), ["id", "area_name", "skills_list"])
+        self.assertEqual(loaded["skills_list"].tolist(), [["SQL", "Python"], [], ["Excel"]])
+        self.assertEqual(str(loaded["area_name"].dtype), "category")
+
+
+        # колонка, которой нет в первом месяце, не теряется при чтении
+        later = pd.DataFrame({"id": ["4"], "salary_avg": [120000], "duplicate_count": [3],
+                              "published_year_month": ["2026-03"]})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_cleaned_dataset(df, tmp_dir)
+            save_cleaned_dataset(later, tmp_dir)
+            full = load_cleaned_dataset(tmp_dir).sort_values("id")
+            selected = load_cleaned_dataset(tmp_dir, columns=["id", "duplicate_count"]).sort_values("id")
+            batches = pd.concat(iter_cleaned_batches(tmp_dir, columns=["id", "duplicate_count"]))
+
+        self.assertEqual(full["duplicate_count"].fillna(0).tolist(), [0, 0, 0, 3])
+        self.assertEqual(full["salary_avg"].fillna(0).tolist(), [100000.0, 0, 150000.0, 120000.0])
+        self.assertEqual(selected["duplicate_count"].fillna(0).tolist(), [0, 0, 0, 3])
+        self.assertEqual(batches["duplicate_count"].sum(), 3)
+
+        print("Хранилище Parquet работает корректно")
+
+    def test_incremental_clean(self):
+        cleaner = DataCleaner()
+
+        def vacancy(vac_id, name):
+            return {
+                "id": vac_id,
+                "name": name,
+                "published_at": "2026-01-28T11:17:36+0300",
+                "salary": {"from": 100000 + 10000 * int(vac_id), "to": None, "currency": "RUR"},
+                "experience": {"id": "between1And3", "name": "От 1 года до 3 лет"},
+                "key_skills": [{"name": "SQL"}],
+                "snippet": {"requirement": "Python", "responsibility": None}
+            }
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store_dir = os.path.join(tmp_dir, "store")
+            first_file = os.path.join(tmp_dir, "first.json")
+            second_file = os.path.join(tmp_dir, "second.json")
+
+            with open(first_file, "w", encoding="utf-8") as f:
+                json.dump([vacancy("1", "Аналитик"), vacancy("2", "BI-аналитик")], f)
+            with open(second_file, "w", encoding="utf-8") as f:
+                json.dump([vacancy("1", "Аналитик"), vacancy("2", "Старший BI-аналитик"),
+                           vacancy("3", "Data Analyst")], f)
+
+            cleaner.run_incremental_clean(first_file, store_dir)
+            processed = cleaner.run_incremental_clean(second_file, store_dir)
+            stored = load_cleaned_dataset(store_dir).sort_values("id")
+            # этап конвейера при существующем хранилище тоже очищает только изменения
+            # после очистки обучается модель зарплат, приложение ее только загружает
+            model_dir = os.path.join(tmp_dir, "salary")
+            unchanged, _ = clean_and_save(second_file, store_dir, model_dir=model_dir)
+            get_salary_service.cache_clear()
+            self.assertEqual(get_salary_service(model_dir).meta["n_train"], 3)
+            get_salary_service.cache_clear()
+            with self.assertRaises(FileNotFoundError):
+                get_salary_service(os.path.join(tmp_dir, "missing"))
+
+        self.assertTrue(unchanged.empty)
+
+        self.assertEqual(sorted(processed["id"]), ["2", "3"])
+        self.assertEqual(stored["id"].tolist(), ["1", "2", "3"])
+        self.assertEqual(stored["name"].tolist(), ["Аналитик", "Старший BI-аналитик", "Data Analyst"])
+        # навыки из текста сниппета по умолчанию не подмешиваются к key_skills
+        self.assertEqual([list(skills) for skills in stored["skills_list"]], [["SQL"]] * 3)
+
+        print("Инкрементальная очистка работает корректно")
+
+class TestClusteringService(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 600
+        self.df = pd.DataFrame({
+            "id": [str(i) for i in range(n)],
+            "name": rng.choice(["Data Analyst", "BI Analyst", "System Analyst"], n),
+            "salary_avg": np.concatenate([rng.normal(80000, 5000, n // 2), rng.normal(250000, 10000, n // 2)]),
+            "min_experience_years": rng.choice([0, 1, 3, 6], n).astype(float),
+            "schedule_name": rng.choice(["Полный день", "Удаленная работа"], n),
+            "area_name": rng.choice(["Москва", "Казань"], n),
+            "skills_list": [["SQL", "Python"] if i % 2 else ["Excel"] for i in range(n)],
+        })
+
+    def test_stratified_sample(self):
+        strata = np.array([0] * 900 + [1] * 90 + [2] * 10)
+        idx = stratified_sample(strata, 100)
+
+        self.assertEqual(len(idx), len(set(idx)))
+        self.assertEqual(np.bincount(strata[idx]).tolist(), [90, 9, 1])
+        self.assertEqual(len(stratified_sample(strata, 5000)), 1000)
+        print("Стратифицированная выборка работает")
+
+    def test_gower_silhouette(self):
+        from sklearn.metrics import silhouette_score
+
+        X = self.df[["salary_avg", "name", "area_name"]]
+        num, cat = gower_prepare(X, ["salary_avg"], ["name", "area_name"])
+        full = gower_block(num, cat, slice(None))
+        labels = np.arange(len(X)) % 4
+        labels[0] = 9
+
+        self.assertEqual(full.dtype, np.float32)
+        self.assertAlmostEqual(float(full[0, 1]), (abs(num[0, 0] - num[1, 0])
+                                                   + (cat[0] != cat[1]).sum()) / 3, places=6)
+        self.assertAlmostEqual(gower_silhouette(num, cat, labels, max_tile_mb=0.1),
+                               silhouette_score(full, labels, metric="precomputed"), places=5)
+        print("Блочный силуэт по Гауэру совпадает с полной матрицей")
+
+    def test_perform_clustering_cached(self):
+        service = ClusteringService(self.df, sample_size=200)
+        result = service.perform_clustering(["Зарплата"], range(2, 5))
+
+        self.assertEqual(result.method_name, "K-Means")
+        self.assertEqual(result.n_clusters, 2)
+        self.assertGreater(result.silhouette_score, 0.5)
+        self.assertEqual(sum(c.vacancies_count for c in result.clusters), len(self.df))
+        self.assertIs(service.perform_clustering(["Зарплата"], range(2, 5)), result)
+
+        mixed = service.perform_clustering(["Зарплата", "Название вакансии"], range(2, 4))
+        self.assertEqual(mixed.method_name, "K-Prototypes")
+        self.assertEqual(sum(c.vacancies_count for c in mixed.clusters), len(self.df))
+        print("Кластеризация с выборкой и кэшем работает")
+
+    def test_parallel_k_search(self):
+        features = ["Зарплата", "Местность"]
+        serial = ClusteringService(self.df, sample_size=200).perform_clustering(features, range(2, 5))
+        parallel = ClusteringService(self.df, sample_size=200, n_jobs=2).perform_clustering(features, range(2, 5))
+
+        self.assertEqual(sorted(parallel.k_timings), [2, 3, 4])
+        self.assertEqual(parallel.n_clusters, serial.n_clusters)
+        self.assertAlmostEqual(parallel.silhouette_score, serial.silhouette_score)
+        self.assertEqual([c.vacancies_count for c in parallel.clusters],
+                         [c.vacancies_count for c in serial.clusters])
+        print("Параллельный перебор k совпадает с последовательным")
+
+    def test_build_result_profiles(self):
+        df = pd.DataFrame({
+            "name": ["Data Analyst", "Data Analyst", "BI Analyst", "System Analyst", "System Analyst"],
+            "salary_avg": [100000.0, 120000.0, 110000.0, 300000.0, None],
+            "schedule_name": ["Удаленная работа", "Полный день", "Удаленная работа", "Полный день", "Полный день"],
+            "area_name": ["Москва", "Казань", "Казань", "Москва", "Москва"],
+            "skills_list": ["['SQL', 'Python']", "['SQL']", ["Excel", "SQL"], ["Java"], []],
+        })
+        service = ClusteringService(df)
+        X = df[["name", "area_name"]]
+        result = service._build_result(X.index, np.array([0, 0, 0, 1, 1]), 3, 0.5, "K-Modes", [],
+                                        ["name", "area_name"])
+
+        first, second, empty = result.clusters
+        self.assertEqual(first.title, "Data Analyst / BI Analyst (💵 Нормальная ЗП)")
+        self.assertEqual(first.description, "Data Analyst, Казань")
+        self.assertEqual(first.skills, ["SQL", "Python", "Excel"])
+        self.assertAlmostEqual(first.remote_rate, 200 / 3)
+        self.assertEqual(first.avg_salary, "110 000 ₽")
+        self.assertEqual(second.title, "System Analyst (🤑 Высокая ЗП)")
+        self.assertEqual(second.remote_rate, 0.0)
+        self.assertEqual((empty.vacancies_count, empty.title, empty.skills), (0, "Группа #3", []))
+        print("Профили кластеров считаются за один проход")
+
+    def test_profiler_chunks(self):
+        labels = np.arange(len(self.df)) % 3
+        cols = (["min_experience_years"], ["name", "area_name"])
+
+        whole = ClusterProfiler(*cols)
+        whole.update(self.df, labels, SkillIndex.from_lists(self.df["skills_list"]))
+        chunked = ClusterProfiler(*cols)
+        for start in range(0, len(self.df), 250):
+            part = self.df.iloc[start:start + 250]
+            chunked.update(part, labels[start:start + 250], SkillIndex.from_lists(part["skills_list"]))
+
+        self.assertEqual(chunked.build(3, 0.5, "test"), whole.build(3, 0.5, "test"))
+        print("Профили кластеров собираются по чанкам")
+
+    def test_streaming_clustering(self):
+        df = self.df.assign(published_year_month=np.where(np.arange(len(self.df)) % 2, "2026-01", "2025-12"))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_cleaned_dataset(df, tmp_dir)
+            service = ClusteringService(self.df.iloc[:0], store_dir=tmp_dir, chunk_size=128, batch_size=64,
+                                        sample_size=300)
+            result = service.perform_clustering(["Зарплата", "Название вакансии"], range(2, 5), streaming=True)
+
+            # отмена срабатывает между мини-батчами, до оценки первого k
+            calls, scored = [], []
+
+            def check_cancel():
+                calls.append(1)
+                if len(calls) > 2:
+                    raise InterruptedError
+
+            with self.assertRaises(InterruptedError):
+                service.perform_clustering(["Зарплата"], range(2, 5), streaming=True,
+                                           progress=lambda k, seconds: scored.append(k), check_cancel=check_cancel)
+            self.assertEqual(scored, [])
+
+        self.assertEqual(result.method_name, "MiniBatch K-Means")
+        self.assertEqual(sum(c.vacancies_count for c in result.clusters), len(df))
+        self.assertEqual(sorted(result.k_timings), [2, 3, 4])
+        self.assertGreater(result.silhouette_score, 0)
+
+        # навыки кластеров берутся из сохраненного при очистке индекса, а не из skills_list
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_cleaned_dataset(df, tmp_dir)
+            save_skill_index(SkillIndex.from_frame(df.assign(skills_list=[["Java"]] * len(df))), tmp_dir)
+            service = ClusteringService(self.df.iloc[:0], store_dir=tmp_dir, chunk_size=128, batch_size=64,
+                                        sample_size=300)
+            result = service.perform_clustering(["Зарплата"], range(2, 3), streaming=True)
+        self.assertEqual({tuple(c.skills) for c in result.clusters}, {("Java",)})
+        print("Mini-batch кластеризация по хранилищу работает")
+
+    def test_feature_store(self):
+        df = self.df.copy()
+        df.loc[0, "salary_avg"] = np.nan
+        df.loc[1, "area_name"] = None
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = FeatureStore.open(df, "v1", ["salary_avg"], ["name", "area_name"], root=tmp_dir)
+            loaded = FeatureStore.open(df, "v1", ["salary_avg"], ["name", "area_name"], root=tmp_dir)
+
+            self.assertIsInstance(loaded.arrays["area_name"], np.memmap)
+            self.assertEqual(loaded.arrays["area_name"].dtype, np.int32)
+            self.assertEqual(loaded.categories["area_name"], ["Казань", "Москва"])
+            self.assertEqual(loaded.valid_mask(["salary_avg", "area_name"]).sum(), len(df) - 2)
+
+            rows = np.flatnonzero(loaded.valid_mask(["salary_avg"]))
+            expected = StandardScaler().fit_transform(df[["salary_avg"]].dropna())[:, 0]
+            np.testing.assert_allclose(loaded.matrix(["salary_avg"], rows)[:, 0], expected)
+            np.testing.assert_array_equal(store.arrays["name"], loaded.arrays["name"])
+
+            service = ClusteringService(df, sample_size=200, feature_dir=tmp_dir)
+            cached = service.perform_clustering(["Зарплата", "Местность"], range(2, 4))
+            plain = ClusteringService(df, sample_size=200).perform_clustering(["Зарплата", "Местность"], range(2, 4))
+            self.assertEqual(cached.clusters, plain.clusters)
+            self.assertTrue(os.path.isdir(os.path.join(tmp_dir, service.fingerprint)))
+        print("Хранилище признаков работает")
+
+    def test_job_runner(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_path = os.path.join(tmp_dir, "results.sqlite")
+            runner = ClusteringJobRunner(self.df, max_workers=1, result_cache_path=cache_path, sample_size=200)
+            try:
+                job_id = runner.submit(["Зарплата"], range(2, 5))
+                self.assertEqual(runner.submit(["Зарплата"], range(2, 5)), job_id)
+                other_id = runner.submit(["Местность"], range(2, 5))
+                runner.cancel(other_id)
+
+                deadline = time.time() + 60
+                while not (runner.get(job_id).finished and runner.get(other_id).finished):
+                    self.assertLess(time.time(), deadline)
+                    time.sleep(0.1)
+
+                job = runner.get(job_id)
+                self.assertEqual(job.status, DONE)
+                self.assertEqual(sorted(job.progress), [2, 3, 4])
+                self.assertEqual(runner.get(other_id).status, CANCELLED)
+
+                # результат лежит в общем кэше и виден сервису в другом процессе
+                service = ClusteringService(self.df, sample_size=200, result_cache=ResultCache(cache_path))
+                self.assertEqual(service.lookup(["Зарплата"], range(2, 5)).clusters, job.result.clusters)
+                service.result_cache.close()
+            finally:
+                runner.shutdown()
+        print("Фоновые задачи кластеризации работают")
+
+    def test_result_cache_persistent(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "results.sqlite")
+            cache = ResultCache(path, max_entries=2)
+            first = ClusteringService(self.df, sample_size=200, result_cache=cache)
+            result = first.perform_clustering(["Зарплата"], range(2, 4))
+            cache.close()
+
+            # новый процесс: данные те же, результат читается с диска без пересчета
+            cache = ResultCache(path, max_entries=2)
+            second = ClusteringService(self.df, sample_size=200, result_cache=cache)
+            second._cluster = lambda *args: self.fail("результат должен браться из кэша")
+            cached = second.perform_clustering(["Зарплата"], range(2, 4))
+            self.assertEqual(cached, result)
+
+            # другой датасет - другой отпечаток
+            changed = self.df.assign(salary_avg=self.df["salary_avg"] + 1)
+            self.assertNotEqual(ClusteringService(changed).fingerprint, second.fingerprint)
+
+            second._cluster = lambda *args: result
+            second.perform_clustering(["Зарплата"], range(2, 5))
+            second.perform_clustering(["Зарплата"], range(2, 6))
+            self.assertEqual(len(cache), 2)
+            cache.close()
+        print("Кэш результатов кластеризации сохраняется на диске")
+
+
+class TestSalaryService(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 400
+        exp = rng.choice([0, 1, 3, 6], n)
+        python = rng.random(n) < 0.5
+        self.df = pd.DataFrame({
+            "name": rng.choice(["Data Analyst", "System Analyst"], n),
+            "salary_avg": 60000 + exp * 20000 + python * 40000 + rng.normal(0, 5000, n),
+            "avg_experience_years": exp,
+            "schedule_name": rng.choice(["Полный день", "Удаленная работа"], n),
+            "area_name": rng.choice(["Москва", "Казань"], n),
+            "skills_list": [["Python", "SQL"] if p else ["Excel"] for p in python],
+        })
+
+    def test_predict_salary(self):
+        service = SalaryPredictionService.train(self.df, iterations=200)
+        self.assertEqual(sorted(service.skills), ["Excel", "Python", "SQL"])
+
+        junior = service.predict_salary("Аналитик данных", 0, ["Excel"], "Москва")
+        senior = service.predict_salary("Аналитик данных", 6, ["Python", "SQL"], "Москва")
+        self.assertLess(junior.predicted_salary, senior.predicted_salary)
+        low, high = senior.confidence_interval
+        self.assertLessEqual(low, senior.predicted_salary)
+        self.assertLessEqual(senior.predicted_salary, high)
+        self.assertEqual(senior.market_comparison_chart["Ваш прогноз"].astype(bool).sum(), 1)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_dir = os.path.join(tmp_dir, "salary")
+            SalaryPredictionService.open(self.df, model_dir, iterations=200)
+            loaded = SalaryPredictionService.open(self.df, model_dir, iterations=200)
+            reloaded = loaded.predict_salary("Аналитик данных", 6, ["Python", "SQL"], "Москва")
+            self.assertEqual(reloaded.predicted_salary, senior.predicted_salary)
+            self.assertEqual(reloaded.confidence_interval, senior.confidence_interval)
+
+        # словарь навыков берется из сохраненного индекса, строки сопоставляются по id
+        df = self.df.assign(id=[str(i) for i in range(len(self.df))])
+        stored = SkillIndex.from_frame(df.assign(skills_list=df["skills_list"].map(lambda s: s + ["Git"])).iloc[::-1])
+        service = SalaryPredictionService.train(df, iterations=10, skills=stored)
+        self.assertEqual(sorted(service.skills), ["Excel", "Git", "Python", "SQL"])
+        print("Прогноз зарплаты работает")
+
+    def test_predict_batch(self):
+        service = SalaryPredictionService.train(self.df, iterations=200)
+        profiles = pd.DataFrame({
+            "job_title": ["Аналитик данных", "Системный аналитик", "Стажер"],
+            "exp": [0, 6, 1],
+            "skills": ["Excel", "Python; SQL", "['SQL', 'Docker']"],
+            "location": ["Москва", "Удаленно", None],
+        })
+        result = service.predict_batch(profiles, batch_size=2)
+
+        self.assertEqual(list(result.columns), ["predicted_salary", "salary_low", "salary_high"])
+        for (_, profile), (_, row) in zip(profiles.iterrows(), result.iterrows()):
+            single = service.predict_salary(profile["job_title"], profile["exp"],
+                                            split_skills(profile["skills"]), profile["location"])
+            self.assertEqual(row["predicted_salary"], single.predicted_salary)
+            self.assertEqual((row["salary_low"], row["salary_high"]), single.confidence_interval)
+
+        self.assertEqual(service.skill_matrix([["SQL", "SQL", "Docker"], []]).nnz, 1)
+        # стаж в годах переводится в середины корзин опыта, на которых обучена модель
+        self.assertEqual(experience_midpoint([0, 1, 2, 3, 5, 6, 10, None]).tolist()[:7], [0, 2, 2, 4, 4, 8, 8])
+        same_bucket = service.predict_batch(profiles.assign(exp=[0, 7, 2]))
+        self.assertEqual(same_bucket["predicted_salary"].tolist(), result["predicted_salary"].tolist())
+        with self.assertRaises(ValueError):
+            service.predict_batch(profiles.drop(columns="skills"))
+
+        # во втором чанке location пустая: схема Parquet не должна от этого меняться
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_dir = os.path.join(tmp_dir, "salary")
+            service.save(model_dir)
+            input_file = os.path.join(tmp_dir, "profiles.csv")
+            output_file = os.path.join(tmp_dir, "result.parquet")
+            profiles.iloc[[0, 1, 2, 2]].to_csv(input_file, index=False)
+            total = predict_file(input_file, output_file, batch_size=2, model_dir=model_dir)
+            saved = pd.read_parquet(output_file)
+
+        self.assertEqual(total, 4)
+        self.assertEqual(saved["predicted_salary"].tolist()[:3], result["predicted_salary"].tolist())
+        print("Пакетный прогноз зарплат работает")
+
+class TestAggregationService(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "published_at": ["2025-01-10T10:00:00+0300", "2026-01-10T10:00:00+0300",
+                             "2026-01-15T10:00:00+0300", "2026-02-01T10:00:00+0300"],
+            "published_year_month": ["2025-01", "2026-01", "2026-01", "2026-02"],
+            "experience_id": ["noExperience", "between1And3", "between1And3", "noExperience"],
+            "experience_name": ["Нет опыта", "От 1 года до 3 лет", "От 1 года до 3 лет", "Нет опыта"],
+            "area_id": ["1", "1", "88", "1"],
+            "area_name": ["Москва", "Москва", "Казань", "Москва"],
+            "name": ["Аналитик данных", "Системный аналитик", "Data Analyst", "BI Analyst"],
+            "salary_avg": [100000.0, 200000.0, None, 120000.0],
+            "skills_list": [["SQL"], ["SQL", "UML"], "['SQL', 'Python']", []],
+        })
+
+    def test_dashboard_from_rollups(self):
+        service = AggregationService(build_rollups(self.df))
+
+        home = service.get_home_statistics()
+        self.assertEqual((home.total_vacancies, home.with_salary, home.avg_salary), (4, 3, 140000))
+
+        stats = service.get_aggregation_stats()
+        self.assertEqual(stats.avg_salary, "140 000 ₽")
+        # 2025-03..2026-02 против 2024-03..2025-02: 160000 / 100000
+        self.assertEqual(stats.yearly_change, "+60%")
+
+        charts = service.get_aggregation_charts(top_skills=2)
+        self.assertEqual(charts.trend_chart.loc["2026-01", "От 1 года до 3 лет"], 2)
+        self.assertEqual(charts.skills_chart["Вакансий"].to_dict(), {"SQL": 3, "Python": 1})
+
+        by_role = service.salary_summary("role")
+        self.assertEqual(by_role.loc["System Analyst", "salary_mean"], 200000)
+        self.assertEqual(by_role.loc["Data Analyst", ["vacancies", "with_salary"]].tolist(), [2, 1])
+        # медиана по гистограмме - с точностью до корзины в 5000
+        self.assertEqual(by_role.loc["Data Analyst", "salary_median"], 102500)
+        print("Агрегаты дашборда считаются по предагрегированной таблице")
+
+    def test_query_engine(self):
+        rng = np.random.default_rng(0)
+        n = 5000
+        df = pd.DataFrame({
+            "published_at": pd.Timestamp("2025-01-01", tz="UTC") + pd.to_timedelta(rng.integers(0, 400, n), unit="D"),
+            "salary_avg": np.where(rng.random(n) < 0.4, rng.normal(150000, 40000, n), np.nan),
+            "area_id": rng.choice([1, 2, 88], n, p=[0.6, 0.2, 0.2]),
+            "area_name": "",
+            "experience_id": rng.choice(["noExperience", "between1And3", "moreThan6"], n),
+            "employer_id": np.where(rng.random(n) < 0.05, np.nan, rng.integers(0, 50, n)),
+        })
+        df["area_name"] = df["area_id"].map({1: "Москва", 2: "Санкт-Петербург", 88: "Казань"})
+        df.loc[::100, "published_at"] = pd.NaT
+        engine = QueryEngine(df)
+
+        queries = [
+            {},
+            {"area_id": "1"},
+            {"area_id": [2, 88], "experience_id": "moreThan6"},
+            {"published_from": "2025-06-01", "published_to": "2025-09-01", "employer_id": "7"},
+            {"employer_id": "404"},
+        ]
+        for filters in queries:
+            mask = pd.Series(True, index=df.index)
+            if "area_id" in filters:
+                values = filters["area_id"] if isinstance(filters["area_id"], list) else [filters["area_id"]]
+                mask &= df["area_id"].astype(str).isin([str(v) for v in values])
+            if "experience_id" in filters:
+                mask &= df["experience_id"] == filters["experience_id"]
+            if "employer_id" in filters:
+                mask &= df["employer_id"].astype("Int64").astype(str) == filters["employer_id"]
+            if "published_from" in filters:
+                mask &= df["published_at"] >= pd.Timestamp(filters["published_from"], tz="UTC")
+                mask &= df["published_at"] < pd.Timestamp(filters["published_to"], tz="UTC")
+
+            stats = engine.stats(filters)
+            salary = df.loc[mask, "salary_avg"].dropna()
+            self.assertEqual(stats.vacancies, mask.sum())
+            self.assertEqual(stats.with_salary, len(salary))
+            if len(salary):
+                self.assertAlmostEqual(stats.salary_median, salary.median())
+            self.assertEqual(engine.monthly_counts(filters).to_numpy().sum(), (mask & df["published_at"].notna()).sum())
+
+        # одинаковый набор фильтров в другом порядке берется из кэша
+        self.assertIs(engine.stats({"experience_id": "moreThan6", "area_id": [88, 2]}), engine.stats(queries[2]))
+        self.assertEqual(engine.options("area_id").iloc[0], "Москва")
+
+        service = AggregationService(build_rollups(self.df), engine=QueryEngine(self.df))
+        self.assertEqual(service.get_aggregation_stats({"area_id": "88"}).total_vacancies, 1)
+        self.assertEqual(service.get_aggregation_stats({"area_id": None}).total_vacancies, 4)
+        self.assertEqual(service.get_aggregation_charts(filters={"area_id": "88"}).skills_chart.index.tolist(),
+                         ["SQL", "Python"])
+        print("Движок запросов с фильтрами работает")
+
+    def test_rollups_incremental(self):
+        cleaner = DataCleaner()
+
+        def vacancy(vac_id, published_at, salary):
+            return {
+                "id": vac_id,
+                "name": "Аналитик данных",
+                "published_at": published_at,
+                "salary": {"from": salary, "to": None, "currency": "RUR"},
+                "experience": {"id": "between1And3", "name": "От 1 года до 3 лет"},
+                "area": {"id": "1", "name": "Москва"},
+                "key_skills": [{"name": "SQL"}],
+                "snippet": {"requirement": None, "responsibility": None}
+            }
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store_dir = os.path.join(tmp_dir, "store")
+            first_file = os.path.join(tmp_dir, "first.json")
+            second_file = os.path.join(tmp_dir, "second.json")
+            with open(first_file, "w", encoding="utf-8") as f:
+                json.dump([vacancy("1", "2026-01-10T10:00:00+0300", 100000),
+                           vacancy("2", "2026-02-10T10:00:00+0300", 150000)], f)
+            with open(second_file, "w", encoding="utf-8") as f:
+                json.dump([vacancy("2", "2026-02-10T10:00:00+0300", 180000),
+                           vacancy("3", "2026-03-10T10:00:00+0300", 200000)], f)
+
+            cleaner.run_incremental_clean(first_file, store_dir)
+            cleaner.run_incremental_clean(second_file, store_dir)
+
+            stored = load_rollups(store_dir)
+            full = build_rollups(load_cleaned_dataset(store_dir, columns=SOURCE_COLUMNS))
+            home = AggregationService.open(store_dir).get_home_statistics()
+
+        columns = ["published_year_month", "vacancies", "with_salary", "salary_sum"]
+        self.assertEqual(stored.groups[columns].sort_values("published_year_month").values.tolist(),
+                         full.groups[columns].sort_values("published_year_month").values.tolist())
+        self.assertEqual((home.total_vacancies, home.avg_salary), (3, 160000))
+        print("Агрегаты обновляются при инкрементальной очистке")
+
+class TestSkillIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        pool = np.array(["SQL", "Python", "Excel", "Airflow", "Tableau", "Spark"])
+        n = 3000
+        self.df = pd.DataFrame({
+            "id": [str(i) for i in range(n)],
+            "published_year_month": rng.choice(["2025-12", "2026-01"], n),
+            "area_id": rng.choice(["1", "2"], n),
+            "area_name": "",
+            "experience_id": rng.choice(["noExperience", "between1And3"], n),
+            "salary_avg": np.where(rng.random(n) < 0.6, rng.normal(150000, 30000, n), np.nan),
+            "skills_list": [list(rng.choice(pool, rng.integers(0, 4), replace=False)) for _ in range(n)],
+        })
+        self.df["area_name"] = self.df["area_id"].map({"1": "Москва", "2": "Казань"})
+
+    def test_queries(self):
+        index = SkillIndex.from_frame(self.df)
+        has = {skill: self.df["skills_list"].map(lambda s, skill=skill: skill in s) for skill in index.skills}
+
+        # медианная зарплата для SQL и Airflow без Excel в Москве
+        rows = index.rows(all_of=["SQL", "Airflow"], none_of=["Excel"], within=index.where(area_name="Москва"))
+        mask = has["SQL"] & has["Airflow"] & ~has["Excel"] & (self.df["area_name"] == "Москва")
+        self.assertEqual(rows.tolist(), np.flatnonzero(mask).tolist())
+        salary = self.df.loc[mask, "salary_avg"].dropna()
+        self.assertAlmostEqual(index.salary_stats(rows).salary_median, salary.median())
+
+        rows = index.rows(any_of=["Spark", "Tableau"])
+        self.assertEqual(rows.tolist(), np.flatnonzero(has["Spark"] | has["Tableau"]).tolist())
+
+        top = index.top(3, rows=index.where(experience_id="noExperience"))
+        expected = self.df.loc[self.df["experience_id"] == "noExperience", "skills_list"].explode().value_counts()
+        self.assertEqual(top.to_dict(), expected.head(3).to_dict())
+
+        matrix = index.cooccurrence(["SQL", "Python"])
+        self.assertEqual(matrix.loc["SQL", "Python"], (has["SQL"] & has["Python"]).sum())
+        self.assertEqual(matrix.loc["SQL", "SQL"], has["SQL"].sum())
+        self.assertEqual(index.rows(all_of=["Java"]).tolist(), [])
+        print("Запросы по индексу навыков совпадают с перебором")
+
+    def test_matrix(self):
+        index = SkillIndex.from_frame(self.df)
+        matrix = index.matrix(["Python", "Java", "SQL"])
+        self.assertEqual(matrix.shape, (len(self.df), 3))
+        expected = [[int("Python" in s), 0, int("SQL" in s)] for s in self.df["skills_list"]]
+        self.assertEqual(matrix.toarray().astype(int).tolist(), expected)
+        self.assertEqual(index.matrix().sum(), self.df["skills_list"].str.len().sum())
+        self.assertEqual(index.vocabulary(top=2), index.top(2).index.tolist())
+        print("Multi-hot матрица навыков строится по индексу")
+
+    def test_persisted_by_month(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_cleaned_dataset(self.df, tmp_dir)
+            refresh_skill_index(tmp_dir, SkillIndex.from_frame(self.df), {"2025-12", "2026-01"})
+
+            changed = self.df[self.df["published_year_month"] == "2026-01"].head(100)
+            changed = changed.assign(skills_list=[["Java"]] * len(changed))
+            refresh_skill_index(tmp_dir, SkillIndex.from_frame(changed), {"2026-01"})
+            index = load_skill_index(tmp_dir)
+
+        self.assertEqual(index.n_docs, (self.df["published_year_month"] == "2025-12").sum() + 100)
+        self.assertEqual(sorted(index.ids[index.rows(all_of=["Java"])]), sorted(changed["id"]))
+        december = self.df[self.df["published_year_month"] == "2025-12"]
+        self.assertEqual(index.top(10).drop("Java").to_dict(),
+                         december["skills_list"].explode().value_counts().to_dict())
+        print("Индекс навыков хранится по месяцам и обновляется частично")
+
+    def test_align(self):
+        index = SkillIndex.from_frame(self.df)
+        rows = self.df.sample(100, random_state=0)
+        aligned = skill_index_for(rows, index)
+        self.assertEqual(aligned.ids.tolist(), rows["id"].tolist())
+        self.assertEqual(aligned.matrix(["SQL"]).toarray()[:, 0].astype(bool).tolist(),
+                         rows["skills_list"].map(lambda s: "SQL" in s).tolist())
+
+        # строк нет в индексе (данные из CSV) - индекс строится по skills_list
+        unknown = rows.assign(id="new", skills_list=[["Java"]] * len(rows))
+        self.assertEqual(skill_index_for(unknown, index).top(1).to_dict(), {"Java": len(rows)})
+        self.assertEqual(skill_index_for(unknown.drop(columns="id")).n_docs, len(rows))
+        print("Сохраненный индекс навыков выравнивается по id")
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "id": ["1", "2", "3"],
+            "published_year_month": ["2026-01", "2026-01", "2026-02"],
+            "name": ["Аналитик данных", "Системный аналитик", "Продуктовый аналитик"],
+            "employer_name": ["Банк", "Ритейл", None],
+            "area_name": ["Москва", "Казань", "Москва"],
+            "salary_avg": [150000.0, None, 200000.0],
+            "published_at": pd.to_datetime(["2026-01-10", "2026-01-20", "2026-02-01"], utc=True),
+            "requirement": ["Знание <highlighttext>SQL</highlighttext> и Python", "Опыт работы с данными",
+                            "Аналитика продуктовых данных"],
+            "responsibility": ["Построение дашбордов", None, "A/B тесты"],
+        })
+
+    def test_search(self):
+        self.assertEqual(stem("аналитика"), stem("аналитиков"))
+        index = SearchIndex()
+        index.update(self.df)
+
+        result = index.search("данные")
+        # совпадение в названии весит больше, чем в требованиях
+        self.assertEqual(result["id"].iloc[0], "1")
+        self.assertEqual(sorted(result["id"]), ["1", "2", "3"])
+        self.assertEqual(index.search("аналитика sql")["id"].tolist(), ["1"])
+        self.assertEqual(index.search("дашборд")["requirement"].tolist(), ["Знание SQL и Python"])
+        self.assertEqual(index.search("аналитик", area_name="Казань")["id"].tolist(), ["2"])
+        self.assertTrue(index.search("java").empty)
+        self.assertTrue(index.search("  ").empty)
+        print("Полнотекстовый поиск учитывает словоформы и ранжирует по bm25")
+
+    def test_incremental_update(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "_search.sqlite")
+            index = SearchIndex(path)
+            index.update(self.df)
+            changed = self.df.iloc[[0]].assign(name="Data Engineer", requirement="Airflow")
+            index.update(changed)
+            self.assertEqual(len(index), 3)
+            self.assertTrue(index.search("sql").empty)
+            self.assertEqual(index.search("airflow")["name"].tolist(), ["Data Engineer"])
+
+            index.update(self.df.iloc[[2]], replaced_months={"2026-01", "2026-02"})
+            index.close()
+            reopened = SearchIndex(path)
+            self.assertEqual(len(reopened), 1)
+            reopened.close()
+        print("Поисковый индекс обновляется инкрементально")
+
 def run_tests():
 
     loader = unittest.TestLoader()
@@ -120,6 +1061,11 @@ def run_tests():
     test_suite.addTests(loader.loadTestsFromTestCase(TestHHParser))
     test_suite.addTests(loader.loadTestsFromTestCase(TestFilters))
     test_suite.addTests(loader.loadTestsFromTestCase(TestCleaner))
+    test_suite.addTests(loader.loadTestsFromTestCase(TestClusteringService))
+    test_suite.addTests(loader.loadTestsFromTestCase(TestSalaryService))
+    test_suite.addTests(loader.loadTestsFromTestCase(TestAggregationService))
+    test_suite.addTests(loader.loadTestsFromTestCase(TestSkillIndex))
+    test_suite.addTests(loader.loadTestsFromTestCase(TestSearchIndex))
     
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(test_suite)
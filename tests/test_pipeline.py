@@ -10,7 +10,8 @@ sys.path.insert(0, project_root)
 
 from scripts.collect_data import collect_raw_data
 from scripts.filter_data import filter_and_save
-from src.data_processing.cleaner import DataCleaner
+from scripts.dedupe_data import dedupe_and_save
+from scripts.clean_data import clean_and_save
     
 
 def test_full_pipeline(pages=10):
@@ -63,15 +64,34 @@ def test_full_pipeline(pages=10):
     
     print()
     
+    print("Поиск почти дубликатов")
+
+    try:
+        start = time.time()
+        deduped_vacancies, deduped_filename = dedupe_and_save(filtered_filename)
+        dedupe_time = time.time() - start
+
+        print(f"Осталось {len(deduped_vacancies)} вакансий без перепубликаций")
+        print(f"{dedupe_time:.1f} сек")
+        print(f"Файл: {deduped_filename}")
+
+    except Exception as e:
+        print(f"Ошибка поиска дубликатов: {e}")
+        traceback.print_exc()
+        return False
+
+    print()
+
     print("Очистка данных")
     
     try:
-        cleaner = DataCleaner()
         start = time.time()
-        cleaned_df = cleaner.run_full_clean(filtered_filename)
+        # при существующем хранилище очищаются только новые и изменившиеся вакансии
+        cleaned_df, store_dir = clean_and_save(deduped_filename)
         clean_time = time.time() - start
         
         print(f"Очищено {len(cleaned_df)} строк")
+        print(f"{clean_time:.1f} сек")
             
     except Exception as e:
         print(f"Ошибка очистки: {e}")